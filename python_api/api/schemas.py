@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, confloat
 
 
 class HealthResponse(BaseModel):
@@ -35,3 +35,16 @@ class ForecastRequest(BaseModel):
     potassiumK: Optional[float] = Field(default=None, description="K (sensor reading)")
 
 
+
+
+class ForecastBandsRequest(ForecastRequest):
+    samples: int = Field(default=200, ge=1, le=2000, description="Monte Carlo sample paths")
+    percentiles: List[confloat(ge=0, le=100)] = Field(default=[5, 25, 50, 75, 95], min_length=1, max_length=9)
+    noise: float = Field(default=1.0, ge=0, le=5, description="Seed-window noise, in day-to-day std units")
+    npkSigma: float = Field(default=0.1, ge=0, le=1, description="Relative std of the N/P/K perturbation")
+    seed: int = Field(default=0, description="Same seed, same bands")
+
+
+class PriceDemandIngestRequest(BaseModel):
+    # One object per day and region, with every column of the price/demand CSV (Date as YYYY-MM-DD).
+    rows: List[Dict[str, Any]] = Field(..., min_length=1, max_length=10_000)
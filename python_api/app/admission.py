@@ -0,0 +1,201 @@
+"""Admission control for the HTTP endpoints.
+
+Each endpoint class (expensive forecasts, medium recommendations, cheap
+lookups) gets its own concurrency limit and bounded wait queue, so a burst of
+long forecasts can't take the threadpool away from /predict or /api/health.
+Waiting requests are admitted cheapest-first, with every second of waiting
+taking `aging` off a request's cost so expensive ones can't starve. When a
+queue is full the most expensive request (the newcomer or a waiter) is
+rejected with 429 and a Retry-After estimate. Background threads (the
+forecast store) queue for the same slots through thread_slot().
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Tuple
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, limiter: str, retry_after: int) -> None:
+        super().__init__(f"Too many '{limiter}' requests queued; retry in {retry_after}s")
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+
+class PriorityLimiter:
+    """Async concurrency limit with a bounded, cost-ordered wait queue.
+
+    A waiter's priority is cost - aging * seconds waited; since every waiter
+    ages at the same rate, the heap key cost + aging * enqueue time orders
+    them the same way at any moment.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, aging: float = 10.0) -> None:
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.aging = max(0.0, aging)
+
+        self._active = 0
+        # (key, seq, future); entries whose future is done are stale and skipped.
+        self._heap: List[Tuple[float, int, "asyncio.Future[None]"]] = []
+        self._seq = itertools.count()
+        self._queued = 0  # Live (not done) entries of _heap.
+
+        self.admitted = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.peak_queued = 0
+        self._waits_ms: Deque[float] = deque(maxlen=1024)
+        self._service_s: Deque[float] = deque(maxlen=256)
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    async def acquire(self, cost: float = 0.0) -> None:
+        started = time.perf_counter()
+        if self._active < self.concurrency and not self._queued:
+            self._active += 1
+            self._admit(started)
+            return
+
+        key = cost + self.aging * time.monotonic()
+        if self._queued >= self.queue_size:
+            worst = max((e for e in self._heap if not e[2].done()), default=None)
+            if worst is None or worst[0] <= key:
+                self.rejected += 1
+                raise AdmissionRejected(self.name, self.retry_after())
+            # The newcomer is cheaper than the most expensive waiter: that one gives up its place.
+            self._queued -= 1
+            self.rejected += 1
+            self.evicted += 1
+            worst[2].set_exception(AdmissionRejected(self.name, self.retry_after()))
+
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (key, next(self._seq), fut))
+        self._queued += 1
+        self.peak_queued = max(self.peak_queued, self._queued)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.cancelled():
+                self._queued -= 1  # Left the queue; its heap entry is now stale.
+                self._compact()
+            elif fut.done() and fut.exception() is None:
+                self.release()  # Slot was handed over just as the client went away.
+            raise
+        self._admit(started)
+
+    def release(self) -> None:
+        # Hand the slot straight to the highest-priority live waiter, if any.
+        while self._heap:
+            _, _, fut = heapq.heappop(self._heap)
+            if not fut.done():
+                self._queued -= 1
+                fut.set_result(None)
+                return
+        self._active -= 1
+
+    def _compact(self) -> None:
+        if len(self._heap) > 2 * self._queued + 64:
+            self._heap = [e for e in self._heap if not e[2].done()]
+            heapq.heapify(self._heap)
+
+    @asynccontextmanager
+    async def slot(self, cost: float = 0.0) -> AsyncIterator[None]:
+        await self.acquire(cost)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._finish(started)
+
+    def _finish(self, started: float) -> None:
+        self._service_s.append(time.perf_counter() - started)
+        self.release()
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained (at least 1)."""
+        service = sum(self._service_s) / len(self._service_s) if self._service_s else 1.0
+        return max(1, math.ceil(service * (self.queued / self.concurrency + 1)))
+
+    def _admit(self, started: float) -> None:
+        self.admitted += 1
+        self._waits_ms.append((time.perf_counter() - started) * 1000.0)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits_ms)
+        service = sorted(self._service_s)
+        return {
+            "concurrency": self.concurrency,
+            "queueSize": self.queue_size,
+            "active": self._active,
+            "queued": self.queued,
+            "peakQueued": self.peak_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "aging": self.aging,
+            "queueWaitMs": {
+                "p50": round(waits[len(waits) // 2], 3) if waits else None,
+                "p95": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else None,
+                "max": round(waits[-1], 3) if waits else None,
+            },
+            "meanServiceMs": round(1000.0 * sum(service) / len(service), 3) if service else None,
+        }
+
+
+def _limiter_from_env(name: str, concurrency: int, queue_size: int, aging: float = 10.0) -> PriorityLimiter:
+    prefix = f"ADMISSION_{name.upper()}"
+    return PriorityLimiter(
+        name,
+        int(os.environ.get(f"{prefix}_CONCURRENCY", str(concurrency))),
+        int(os.environ.get(f"{prefix}_QUEUE", str(queue_size))),
+        # Cost units per second waited; forecasts cost their horizon in days.
+        float(os.environ.get(f"{prefix}_AGING", str(aging))),
+    )
+
+
+LIMITERS: Dict[str, PriorityLimiter] = {
+    "expensive": _limiter_from_env("expensive", 2, 16),
+    "medium": _limiter_from_env("medium", 8, 64),
+    "cheap": _limiter_from_env("cheap", 32, 256),
+}
+
+
+def admit(limiter: str):
+    """FastAPI dependency holding a slot of `limiter` for the whole request."""
+
+    async def dependency() -> AsyncIterator[None]:
+        async with LIMITERS[limiter].slot():
+            yield
+
+    return dependency
+
+
+@contextmanager
+def thread_slot(limiter: str, loop: asyncio.AbstractEventLoop, cost: float = 0.0) -> Iterator[None]:
+    """slot() for a thread outside `loop`: queues with the requests and blocks until admitted.
+
+    Raises AdmissionRejected like a request would when the queue is full.
+    """
+    target = LIMITERS[limiter]
+    asyncio.run_coroutine_threadsafe(target.acquire(cost), loop).result()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        loop.call_soon_threadsafe(target._finish, started)
+
+
+def admission_metrics() -> Dict[str, Any]:
+    return {name: limiter.stats() for name, limiter in LIMITERS.items()}
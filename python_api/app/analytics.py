@@ -0,0 +1,516 @@
+"""Aggregate cube behind the dashboard endpoints (/api/overview, /api/optimization, /api/reports).
+
+Dataset.csv (agronomy) and paddy_price_demand_dataset.csv (market) are
+reduced once into group-by cells of [row count, sum of each measure], one
+dict per grouping the dashboard asks for. Counts and sums are additive, so
+rows appended to either file are folded into the existing cells without
+re-reading the rest of the file; a file that was rewritten in place is
+rebuilt from scratch. Every dashboard query reads a handful of cells, so its
+cost depends on the size of the answer, not of the datasets.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.csv_tail import AppendOnlyCsv
+from app.model_loader import MASTER_DATA
+from app.pricedemand_service import price_demand_dataset_path
+
+GROWTH_STAGES = ["Seedling", "Tillering", "Panicle Initiation", "Flowering", "Harvest"]
+SOIL_MOISTURE_TARGET = (40.0, 65.0)
+
+AGRONOMY_MEASURES = ["Predicted_Yield_ton_per_ha", "Cost_LKR_per_ha", "Quantity_kg_per_acre", "Soil_Moisture (%)"]
+MARKET_MEASURES = ["Paddy_Price_LKR_per_kg", "Demand_Tons", "Rainfall_mm"]
+
+# view -> (source, grouping columns); () is the grand total.
+VIEWS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "agronomy": ("agronomy", ()),
+    "agronomy_month": ("agronomy", ("month",)),
+    "stage_fertilizer": ("agronomy", ("Paddy_Growth_Stage", "Recommended_Fertilizer")),
+    "month_stage_fertilizer": ("agronomy", ("month", "Paddy_Growth_Stage", "Recommended_Fertilizer")),
+    "market": ("market", ()),
+    "market_day": ("market", ("Date",)),
+    "market_month": ("market", ("month",)),
+    "market_region": ("market", ("Region",)),
+    "market_month_region": ("market", ("month", "Region")),
+}
+MEASURES = {"agronomy": AGRONOMY_MEASURES, "market": MARKET_MEASURES}
+
+Cell = np.ndarray  # [count, sum(measure_0), sum(measure_1), ...]
+
+
+def _agronomy_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    dates = pd.to_datetime(frame["Date"], format="%d/%m/%Y", errors="coerce")
+    return frame.assign(month=dates.dt.strftime("%Y-%m")).dropna(subset=["month"])
+
+
+def _market_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.assign(Date=frame["Date"].astype(str))
+    return frame.assign(month=frame["Date"].str.slice(0, 7))
+
+
+class AggregateCube:
+    def __init__(self, agronomy_path: str = MASTER_DATA, market_path: Optional[str] = None) -> None:
+        self.sources = {
+            "agronomy": AppendOnlyCsv(agronomy_path),
+            "market": AppendOnlyCsv(market_path or price_demand_dataset_path()),
+        }
+        self._prepare = {"agronomy": _agronomy_rows, "market": _market_rows}
+        self._views: Dict[str, Dict[Tuple, Cell]] = {name: {} for name in VIEWS}
+        # Sorted keys of the time views, for "latest N" queries.
+        self._days: List[str] = []
+        self._months: Dict[str, List[str]] = {"agronomy": [], "market": []}
+        self._lock = threading.RLock()
+        self.version = 0
+        self.rebuilds = 0
+        self.appends = 0
+        self.last_update: Optional[Dict[str, Any]] = None
+
+    # --- Maintenance ---
+
+    def refresh(self) -> bool:
+        """Folds new rows into the cube (or rebuilds a rewritten source); True if anything changed."""
+        with self._lock:
+            changed = False
+            for source, reader in self.sources.items():
+                if not reader.changed():
+                    continue
+                started = time.perf_counter()
+                reset, rows = reader.read()
+                if reset:
+                    self._clear(source)
+                    self.rebuilds += 1
+                else:
+                    self.appends += 1
+                if rows is not None and len(rows):
+                    self._add(source, self._prepare[source](rows))
+                changed = True
+                self.last_update = {
+                    "source": source,
+                    "mode": "rebuild" if reset else "append",
+                    "rows": 0 if rows is None else len(rows),
+                    "seconds": round(time.perf_counter() - started, 4),
+                    "at": time.time(),
+                }
+            if changed:
+                self.version += 1
+            return changed
+
+    def _clear(self, source: str) -> None:
+        for name, (src, _) in VIEWS.items():
+            if src == source:
+                self._views[name] = {}
+        if source == "market":
+            self._days = []
+        self._months[source] = []
+
+    def _add(self, source: str, frame: pd.DataFrame) -> None:
+        measures = MEASURES[source]
+        values = frame[measures].astype(np.float64).assign(_n=1.0)[["_n", *measures]]
+        for name, (src, keys) in VIEWS.items():
+            if src != source:
+                continue
+            cells = self._views[name]
+            if not keys:
+                partial = {(): values.sum().to_numpy()}
+            else:
+                sums = values.groupby([frame[k] for k in keys], sort=False, observed=True).sum()
+                partial = {
+                    (key if isinstance(key, tuple) else (key,)): row
+                    for key, row in zip(sums.index, sums.to_numpy())
+                }
+            for key, row in partial.items():
+                cell = cells.get(key)
+                cells[key] = row.copy() if cell is None else cell + row
+        for month in frame["month"].unique():
+            self._insert_sorted(self._months[source], str(month))
+        if source == "market":
+            for day in frame["Date"].unique():
+                self._insert_sorted(self._days, str(day))
+
+    @staticmethod
+    def _insert_sorted(keys: List[str], key: str) -> None:
+        i = bisect.bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            keys.insert(i, key)
+
+    # --- Queries ---
+
+    def cell(self, view: str, *key: Any) -> Optional[Cell]:
+        return self._views[view].get(tuple(key))
+
+    def count(self, view: str, *key: Any) -> int:
+        cell = self.cell(view, *key)
+        return 0 if cell is None else int(cell[0])
+
+    def mean(self, view: str, measure: str, *key: Any) -> Optional[float]:
+        cell = self.cell(view, *key)
+        if cell is None or not cell[0]:
+            return None
+        return float(cell[1 + MEASURES[VIEWS[view][0]].index(measure)] / cell[0])
+
+    def mean_over(self, view: str, measure: str, keys: List[Tuple]) -> Optional[float]:
+        """Row-weighted mean of `measure` across several cells of one view."""
+        idx = 1 + MEASURES[VIEWS[view][0]].index(measure)
+        cells = [c for c in (self._views[view].get(k) for k in keys) if c is not None]
+        n = sum(c[0] for c in cells)
+        return float(sum(c[idx] for c in cells) / n) if n else None
+
+    def days(self, last: int) -> List[str]:
+        return self._days[-last:]
+
+    def months(self, source: str, last: int) -> List[str]:
+        return self._months[source][-last:]
+
+    def regions(self) -> List[str]:
+        return sorted(k[0] for k in self._views["market_region"])
+
+    def fertilizers(self, stage: str, month: Optional[str] = None) -> List[str]:
+        if month is None:
+            return [f for s, f in self._views["stage_fertilizer"] if s == stage]
+        return [f for m, s, f in self._views["month_stage_fertilizer"] if m == month and s == stage]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "rebuilds": self.rebuilds,
+                "appends": self.appends,
+                "cells": {name: len(cells) for name, cells in self._views.items()},
+                "lastUpdate": self.last_update,
+            }
+
+
+cube = AggregateCube()
+
+
+# --- Dashboard payloads (same shapes as src/data/*.js) ---
+
+
+def _pct(new: Optional[float], old: Optional[float]) -> Optional[float]:
+    if new is None or not old:
+        return None
+    return (new - old) / old * 100.0
+
+
+def _rainfall_ratio(c: AggregateCube, days: int = 10) -> Tuple[Optional[float], Optional[float]]:
+    recent = c.mean_over("market_day", "Rainfall_mm", [(d,) for d in c.days(days)])
+    overall = c.mean("market", "Rainfall_mm")
+    return recent, (recent / overall if recent is not None and overall else None)
+
+
+def _price_trend(c: AggregateCube, days: int) -> Optional[float]:
+    window = c.days(days + 1)
+    if len(window) < 2:
+        return None
+    return _pct(c.mean("market_day", "Paddy_Price_LKR_per_kg", window[-1]), c.mean("market_day", "Paddy_Price_LKR_per_kg", window[0]))
+
+
+def _best_fertilizer(c: AggregateCube, stage: str) -> Optional[Tuple[str, float]]:
+    ranked = [(f, c.mean("stage_fertilizer", "Predicted_Yield_ton_per_ha", stage, f)) for f in c.fertilizers(stage)]
+    ranked = [(f, y) for f, y in ranked if y is not None]
+    return max(ranked, key=lambda fy: fy[1]) if ranked else None
+
+
+def _confidence(rows: int) -> float:
+    # More supporting records, more confidence; never certain.
+    return round(min(0.95, rows / (rows + 20.0)), 2)
+
+
+def _weather_kpi(c: AggregateCube) -> Dict[str, Any]:
+    recent, ratio = _rainfall_ratio(c)
+    if ratio is None:
+        value, status = "Unknown", "No rainfall data"
+    else:
+        value = "High" if ratio > 1.5 or ratio < 0.5 else "Medium" if ratio > 1.15 or ratio < 0.75 else "Low"
+        status = f"{recent:.0f} mm/day vs {c.mean('market', 'Rainfall_mm'):.0f} avg"
+    return {"key": "weatherRisk", "label": "Weather Risk", "value": value, "helper": "Last 10 days rainfall", "status": status}
+
+
+def _soil_kpi(c: AggregateCube, month: Optional[str]) -> Dict[str, Any]:
+    moisture = c.mean("agronomy_month", "Soil_Moisture (%)", month) if month else None
+    low, high = SOIL_MOISTURE_TARGET
+    if moisture is None:
+        value, status = "Unknown", "No soil data"
+    else:
+        value = f"{moisture:.0f}% moisture"
+        status = "Below target band" if moisture < low else "Above target band" if moisture > high else "Within target band"
+    return {"key": "soilHealth", "label": "Soil Health", "value": value, "helper": f"Mean soil moisture, {month or '-'}", "status": status}
+
+
+def _yield_kpi(c: AggregateCube) -> Dict[str, Any]:
+    months = c.months("agronomy", 2)
+    current = c.mean("agronomy_month", "Predicted_Yield_ton_per_ha", months[-1]) if months else None
+    previous = c.mean("agronomy_month", "Predicted_Yield_ton_per_ha", months[0]) if len(months) == 2 else None
+    change = _pct(current, previous)
+    return {
+        "key": "expectedYield",
+        "label": "Expected Yield",
+        "value": f"{current:.1f} t/ha" if current is not None else "Unknown",
+        "helper": f"Model estimate, {months[-1]}" if months else "Model estimate",
+        "status": "On track" if change is None or change >= -2.0 else "Below trend",
+    }
+
+
+def _price_kpi(c: AggregateCube) -> Dict[str, Any]:
+    trend = _price_trend(c, 30)
+    return {
+        "key": "marketPrice",
+        "label": "Market Price Trend",
+        "value": f"{trend:+.1f}%" if trend is not None else "Unknown",
+        "helper": "30-day trend",
+        "status": "Unknown" if trend is None else "Bullish" if trend > 1.0 else "Bearish" if trend < -1.0 else "Flat",
+    }
+
+
+def _alerts(c: AggregateCube) -> List[Dict[str, Any]]:
+    days = c.days(1)
+    if not days:
+        return []
+    today = days[-1]
+    alerts = []
+    recent, ratio = _rainfall_ratio(c)
+    if ratio is not None and ratio > 1.15:
+        alerts.append({
+            "id": "a-rain",
+            "title": "Above-average rainfall",
+            "category": "Weather",
+            "date": today,
+            "severity": "High" if ratio > 1.5 else "Medium",
+            "details": f"Last 10 days averaged {recent:.0f} mm/day; check drainage in low-lying fields.",
+        })
+    elif ratio is not None and ratio < 0.75:
+        alerts.append({
+            "id": "a-dry",
+            "title": "Dry spell",
+            "category": "Weather",
+            "date": today,
+            "severity": "High" if ratio < 0.5 else "Medium",
+            "details": f"Last 10 days averaged {recent:.0f} mm/day; review the irrigation schedule.",
+        })
+    weekly = _price_trend(c, 7)
+    if weekly is not None and abs(weekly) > 5.0:
+        alerts.append({
+            "id": "a-price",
+            "title": f"Paddy price {'up' if weekly > 0 else 'down'} {abs(weekly):.1f}% in a week",
+            "category": "Market",
+            "date": today,
+            "severity": "Medium" if abs(weekly) > 10.0 else "Low",
+            "details": "Consider staggered selling and monitor demand indicators.",
+        })
+    month = c.months("agronomy", 1)
+    moisture = c.mean("agronomy_month", "Soil_Moisture (%)", month[-1]) if month else None
+    if moisture is not None and not SOIL_MOISTURE_TARGET[0] <= moisture <= SOIL_MOISTURE_TARGET[1]:
+        alerts.append({
+            "id": "a-soil",
+            "title": "Soil moisture outside target band",
+            "category": "Operations",
+            "date": today,
+            "severity": "Medium",
+            "details": f"Mean soil moisture {moisture:.0f}% in {month[-1]} (target {SOIL_MOISTURE_TARGET[0]:.0f}-{SOIL_MOISTURE_TARGET[1]:.0f}%).",
+        })
+    return alerts
+
+
+def overview(c: AggregateCube = cube) -> Dict[str, Any]:
+    c.refresh()
+    with c._lock:
+        days = c.days(7)
+        month = c.months("agronomy", 1)
+        return {
+            "kpis": [_weather_kpi(c), _soil_kpi(c, month[-1] if month else None), _yield_kpi(c), _price_kpi(c)],
+            # Latest observed national means (the model forecast is /api/forecasting).
+            "priceForecast": [
+                {"day": f"D{i}", "date": d, "price": round(c.mean("market_day", "Paddy_Price_LKR_per_kg", d), 1)}
+                for i, d in enumerate(days, start=1)
+            ],
+            "demandForecast": [
+                {"day": f"D{i}", "date": d, "demand": round(c.mean("market_day", "Demand_Tons", d), 1)}
+                for i, d in enumerate(days, start=1)
+            ],
+            "recentAlerts": _alerts(c),
+            "asOf": days[-1] if days else None,
+            "cubeVersion": c.version,
+        }
+
+
+def optimization(c: AggregateCube = cube) -> Dict[str, Any]:
+    c.refresh()
+    with c._lock:
+        crop_plan = []
+        recommendations = []
+        for i, stage in enumerate(GROWTH_STAGES, start=1):
+            best = _best_fertilizer(c, stage)
+            if best is None:
+                continue
+            fert, best_yield = best
+            crop_plan.append({
+                "id": f"s{i}",
+                "day": stage,
+                "action": f"Apply {fert}",
+                "detail": (
+                    f"{c.mean('stage_fertilizer', 'Quantity_kg_per_acre', stage, fert):.1f} kg/acre; "
+                    f"mean yield {best_yield:.2f} t/ha at "
+                    f"{c.mean('stage_fertilizer', 'Cost_LKR_per_ha', stage, fert):,.0f} LKR/ha "
+                    f"({c.count('stage_fertilizer', stage, fert)} records)."
+                ),
+            })
+            # Cheapest fertilizer whose mean yield is within 1% of the best one.
+            best_cost = c.mean("stage_fertilizer", "Cost_LKR_per_ha", stage, fert)
+            close = [
+                (f, c.mean("stage_fertilizer", "Cost_LKR_per_ha", stage, f), y)
+                for f in c.fertilizers(stage)
+                for y in [c.mean("stage_fertilizer", "Predicted_Yield_ton_per_ha", stage, f)]
+                if y is not None and y >= best_yield * 0.99
+            ]
+            cheap_fert, cheap_cost, cheap_yield = min(close, key=lambda fcy: fcy[1])
+            if cheap_fert != fert and best_cost:
+                saving = (best_cost - cheap_cost) / best_cost * 100.0
+                recommendations.append({
+                    "id": f"r{i}",
+                    "action": f"Use {cheap_fert} instead of {fert} during {stage}",
+                    "reason": f"Mean yield {cheap_yield:.2f} vs {best_yield:.2f} t/ha at {saving:.0f}% lower cost.",
+                    "confidence": _confidence(c.count("stage_fertilizer", stage, cheap_fert)),
+                    "_saving": saving,
+                })
+        recommendations.sort(key=lambda r: r.pop("_saving"), reverse=True)
+
+        recent, ratio = _rainfall_ratio(c, 30)
+        window = [c.mean("market_day", "Paddy_Price_LKR_per_kg", d) for d in c.days(30)]
+        spread = (max(window) - min(window)) / (sum(window) / len(window)) * 100.0 if window else None
+        risks = []
+        if ratio is not None:
+            risks.append({
+                "id": "k1",
+                "type": "Drought",
+                "severity": "High" if ratio < 0.5 else "Medium" if ratio < 0.75 else "Low",
+                "note": f"30-day rainfall {recent:.0f} mm/day ({ratio * 100:.0f}% of normal).",
+            })
+            risks.append({
+                "id": "k2",
+                "type": "Flood",
+                "severity": "High" if ratio > 1.5 else "Medium" if ratio > 1.15 else "Low",
+                "note": f"30-day rainfall {recent:.0f} mm/day ({ratio * 100:.0f}% of normal).",
+            })
+        if spread is not None:
+            risks.append({
+                "id": "k3",
+                "type": "Market",
+                "severity": "High" if spread > 15.0 else "Medium" if spread > 8.0 else "Low",
+                "note": f"Paddy price moved within a {spread:.1f}% band over the last 30 days.",
+            })
+        return {
+            "cropPlan": crop_plan,
+            "resourceRecommendations": recommendations[:3],
+            "risks": risks,
+            "cubeVersion": c.version,
+        }
+
+
+def reports(c: AggregateCube = cube) -> Dict[str, Any]:
+    c.refresh()
+    with c._lock:
+        week = c.days(8)
+        months = c.months("agronomy", 2)
+        market_months = c.months("market", 2)
+
+        regions = []
+        for region in c.regions():
+            price = c.mean("market_month_region", "Paddy_Price_LKR_per_kg", market_months[-1], region) if market_months else None
+            previous = (
+                c.mean("market_month_region", "Paddy_Price_LKR_per_kg", market_months[0], region)
+                if len(market_months) == 2
+                else None
+            )
+            change = _pct(price, previous)
+            regions.append({
+                "region": region,
+                "priceLkrPerKg": round(price, 2) if price is not None else None,
+                "demandTons": (
+                    round(c.mean("market_month_region", "Demand_Tons", market_months[-1], region), 1)
+                    if price is not None
+                    else None
+                ),
+                "priceChangePct": round(change, 1) if change is not None else None,
+            })
+
+        monthly = [
+            {
+                "month": m,
+                "yieldTonPerHa": round(c.mean("agronomy_month", "Predicted_Yield_ton_per_ha", m), 2),
+                "costLkrPerHa": round(c.mean("agronomy_month", "Cost_LKR_per_ha", m), 0),
+                "records": c.count("agronomy_month", m),
+            }
+            for m in c.months("agronomy", 12)
+        ]
+
+        weekly_price = _price_trend(c, 7)
+        weekly_demand = (
+            _pct(c.mean("market_day", "Demand_Tons", week[-1]), c.mean("market_day", "Demand_Tons", week[0]))
+            if len(week) > 1
+            else None
+        )
+        yield_now = monthly[-1]["yieldTonPerHa"] if monthly else None
+        cost_now = monthly[-1]["costLkrPerHa"] if monthly else None
+        priced = [r for r in regions if r["priceLkrPerKg"] is not None]
+        top = max(priced, key=lambda r: r["priceLkrPerKg"]) if priced else None
+        bottom = min(priced, key=lambda r: r["priceLkrPerKg"]) if priced else None
+
+        def fmt(value: Optional[float], spec: str) -> str:
+            return "n/a" if value is None else format(value, spec)
+
+        cards = [
+            {
+                "id": "rep1",
+                "title": "Weekly Report",
+                "subtitle": "Market summary",
+                "description": (
+                    f"Week to {week[-1] if week else 'n/a'}: price {fmt(weekly_price, '+.1f')}%, "
+                    f"demand {fmt(weekly_demand, '+.1f')}%."
+                ),
+            },
+            {
+                "id": "rep2",
+                "title": "Monthly Report",
+                "subtitle": "Yield & cost overview",
+                "description": (
+                    f"{months[-1] if months else 'n/a'}: mean yield {fmt(yield_now, '.2f')} t/ha "
+                    f"at {fmt(cost_now, ',.0f')} LKR/ha."
+                ),
+            },
+            {
+                "id": "rep3",
+                "title": "Region Summary",
+                "subtitle": "Comparative insights",
+                "description": (
+                    f"Highest price {top['region']} ({top['priceLkrPerKg']:.2f} LKR/kg), "
+                    f"lowest {bottom['region']} ({bottom['priceLkrPerKg']:.2f} LKR/kg)."
+                    if top and bottom
+                    else "No market data."
+                ),
+            },
+        ]
+
+        lines = ["Highlights:"]
+        lines += [f"- {card['title']}: {card['description']}" for card in cards]
+        if regions:
+            lines += ["", f"Regions ({market_months[-1]}):"]
+            lines += [
+                f"- {r['region']}: {fmt(r['priceLkrPerKg'], '.2f')} LKR/kg, {fmt(r['demandTons'], '.1f')} t demand, "
+                f"{fmt(r['priceChangePct'], '+.1f')}% vs previous month"
+                for r in regions
+            ]
+        return {
+            "reportCards": cards,
+            "preview": {"title": "Report Preview", "body": "\n".join(lines)},
+            "regions": regions,
+            "monthly": monthly,
+            "cubeVersion": c.version,
+        }
@@ -0,0 +1,68 @@
+"""Incremental reads of CSV files that only ever grow by appended lines."""
+
+from __future__ import annotations
+
+import io
+import os
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+
+
+class AppendOnlyCsv:
+    """Reads a CSV once, then only the complete lines appended since the previous read."""
+
+    _TAIL = 256  # Bytes before the read offset that must be unchanged for an append.
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.columns: Optional[List[str]] = None
+        self.offset = 0
+        self._tail = b""
+        self._signature: Optional[Tuple[int, int]] = None
+
+    def changed(self) -> bool:
+        return self._stat() != self._signature
+
+    def read(self) -> Tuple[bool, Optional[pd.DataFrame]]:
+        """Returns (reset, rows): the whole file when reset is True, else only the new rows."""
+        signature = self._stat()
+        if signature is None:
+            self.columns, self.offset, self._tail, self._signature = None, 0, b"", None
+            return True, None
+        with open(self.path, "rb") as f:
+            # Same size but touched means rewritten in place; a real append always grows the file.
+            appended = (
+                self.columns is not None
+                and (signature[0] > self.offset or signature == self._signature)
+                and self._unchanged_prefix(f)
+            )
+            if appended:
+                f.seek(self.offset)
+                data = f.read()
+            else:
+                data = f.read()
+                self.offset = 0
+        data = data[: data.rfind(b"\n") + 1]  # A half-written last line is picked up next time.
+        if appended:
+            rows = pd.read_csv(io.BytesIO(data), header=None, names=self.columns) if data else None
+        else:
+            rows = pd.read_csv(io.BytesIO(data))
+            self.columns = list(rows.columns)
+        self.offset += len(data)
+        with open(self.path, "rb") as f:
+            f.seek(max(0, self.offset - self._TAIL))
+            self._tail = f.read(self.offset - max(0, self.offset - self._TAIL))
+        self._signature = signature
+        return not appended, rows
+
+    def _unchanged_prefix(self, f: Any) -> bool:
+        f.seek(self.offset - len(self._tail))
+        return f.read(len(self._tail)) == self._tail
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
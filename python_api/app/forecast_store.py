@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from app.admission import AdmissionRejected
+from app.http_cache import fingerprints
+from app.model_registry import forecast_background
+from app.pricedemand_service import ForecastSeries
+
+STORE_REGIONS = ["Central", "West", "North", "South", "East"]
+STORE_HORIZONS = [int(h) for h in os.environ.get("FORECAST_STORE_HORIZONS", "7,30,90,365").split(",") if h.strip()]
+# N/P/K triples to precompute; defaults are the readings the Forecasting page cycles through.
+STORE_NPK = os.environ.get("FORECAST_STORE_NPK", "42/18/33,55/24/40,38/14/28,61/29/46")
+# Start dates as days from today: the UI asks for today, the API defaults to tomorrow.
+STORE_START_OFFSETS = [int(d) for d in os.environ.get("FORECAST_STORE_START_OFFSETS", "0,1").split(",") if d.strip()]
+REFRESH_SECONDS = float(os.environ.get("FORECAST_STORE_REFRESH_SECONDS", "21600"))
+POLL_SECONDS = float(os.environ.get("FORECAST_STORE_POLL_SECONDS", "30"))
+
+StoreKey = Tuple[str, date, float, float, float]
+
+
+def parse_npk_presets(spec: str) -> List[Tuple[float, float, float]]:
+    """Parses "42/18/33,55/24/40" into [(42.0, 18.0, 33.0), (55.0, 24.0, 40.0)]."""
+    presets = []
+    for part in spec.split(","):
+        if part.strip():
+            n, p, k = (float(v) for v in part.split("/"))
+            presets.append((n, p, k))
+    return presets
+
+
+@dataclass(frozen=True)
+class StoredForecast:
+    series: ForecastSeries
+    computed_at: float
+    duration: float
+    fingerprint: str
+
+
+class ForecastStore:
+    """Precomputed forecasts for the standard requests, refreshed in a background thread.
+
+    Only the longest standard horizon is rolled out per (region, start date,
+    N/P/K); shorter horizons are served as its prefix. The store refreshes when
+    the dataset or model files change, when the day rolls over and every
+    refresh_interval seconds. Entries computed from other artifact versions are
+    never served. Each rollout waits for the `slot` given to start() (the
+    "expensive" admission slot in the app), so refreshes queue behind
+    requests instead of competing with them.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[..., ForecastSeries] = forecast_background,
+        *,
+        regions: Optional[List[str]] = None,
+        horizons: Optional[List[int]] = None,
+        npk_presets: Optional[List[Tuple[float, float, float]]] = None,
+        start_offsets: Optional[List[int]] = None,
+        refresh_interval: float = REFRESH_SECONDS,
+        poll_interval: float = POLL_SECONDS,
+    ) -> None:
+        self.compute = compute
+        self.regions = regions or list(STORE_REGIONS)
+        self.horizon = max(horizons or STORE_HORIZONS)
+        self.npk_presets = npk_presets if npk_presets is not None else parse_npk_presets(STORE_NPK)
+        self.start_offsets = start_offsets if start_offsets is not None else list(STORE_START_OFFSETS)
+        self.refresh_interval = refresh_interval
+        self.poll_interval = poll_interval
+
+        self._entries: Dict[StoreKey, StoredForecast] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._slot: Callable[[float], ContextManager[Any]] = lambda cost: nullcontext()
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+        self._refreshing = False
+        self._last_refresh: Dict[str, Any] = {}
+        self._last_error: Optional[str] = None
+
+    # --- Serving ---
+
+    def get(
+        self,
+        region: str,
+        horizon_days: int,
+        start: date,
+        nitrogen_n: float,
+        phosphorus_p: float,
+        potassium_k: float,
+    ) -> Optional[StoredForecast]:
+        entry = None
+        if horizon_days <= self.horizon:
+            with self._lock:
+                entry = self._entries.get((region, start, nitrogen_n, phosphorus_p, potassium_k))
+            if entry is not None and entry.fingerprint != fingerprints.get("forecast"):
+                entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return StoredForecast(entry.series.head(horizon_days), entry.computed_at, entry.duration, entry.fingerprint)
+
+    # --- Refreshing ---
+
+    def start(self, slot: Optional[Callable[[float], ContextManager[Any]]] = None) -> None:
+        """Starts the refresh thread; slot(cost), if given, is held around each rollout."""
+        if slot is not None:
+            self._slot = slot
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="forecast-store", daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def request_refresh(self) -> None:
+        """Asks the background thread to recompute everything now."""
+        self._wake.set()
+
+    def keys(self, today: Optional[date] = None) -> List[StoreKey]:
+        today = today or date.today()
+        return [
+            (region, today + timedelta(days=offset), n, p, k)
+            for offset in self.start_offsets
+            for region in self.regions
+            for n, p, k in self.npk_presets
+        ]
+
+    def refresh(self, reason: str = "manual") -> None:
+        """Recomputes every key in this thread; each entry is swapped in as soon as it's ready."""
+        started = time.time()
+        fingerprint = fingerprints.get("forecast")
+        keys = self.keys()
+        failed = 0
+        with self._lock:
+            self._refreshing = True
+        try:
+            for key in keys:
+                if self._stop.is_set():
+                    break
+                try:
+                    series, duration = self._compute(key)
+                except Exception as e:
+                    failed += 1
+                    with self._lock:
+                        self._last_error = f"{key[0]} {key[1]}: {e}"
+                    continue
+                with self._lock:
+                    self._entries[key] = StoredForecast(series, time.time(), duration, fingerprint)
+        finally:
+            with self._lock:
+                # Forget start dates that are in the past now.
+                live = set(keys)
+                self._entries = {k: v for k, v in self._entries.items() if k in live}
+                self._refreshing = False
+                self.refreshes += 1
+                self.failures += failed
+                self._last_refresh = {
+                    "reason": reason,
+                    "startedAt": started,
+                    "finishedAt": time.time(),
+                    "durationSeconds": round(time.time() - started, 3),
+                    "keys": len(keys),
+                    "failed": failed,
+                    "day": date.today().isoformat(),
+                }
+
+    def _compute(self, key: StoreKey) -> Tuple[ForecastSeries, float]:
+        region, start, n, p, k = key
+        while True:
+            try:
+                with self._slot(self.horizon):
+                    t0 = time.perf_counter()
+                    series = self.compute(
+                        region=region,
+                        horizon_days=self.horizon,
+                        start_date=start,
+                        nitrogen_n=n,
+                        phosphorus_p=p,
+                        potassium_k=k,
+                    )
+                    return series, time.perf_counter() - t0
+            except AdmissionRejected as e:
+                # Requests have the queue full; come back once it has likely drained.
+                if self._stop.wait(e.retry_after):
+                    raise
+
+    def _due(self) -> Optional[str]:
+        last = self._last_refresh
+        if not last:
+            return "startup"
+        if fingerprints.changed("forecast"):
+            return "artifacts changed"
+        if last["day"] != date.today().isoformat():
+            return "new day"
+        if self.refresh_interval > 0 and time.time() - last["finishedAt"] >= self.refresh_interval:
+            return "schedule"
+        return None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            reason = "requested" if self._wake.is_set() else self._due()
+            self._wake.clear()
+            if reason is not None:
+                self.refresh(reason)
+            self._wake.wait(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.values())
+            return {
+                "entries": len(entries),
+                "horizon": self.horizon,
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshing": self._refreshing,
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "lastRefresh": dict(self._last_refresh) or None,
+                "lastError": self._last_error,
+                "oldestComputedAt": min((e.computed_at for e in entries), default=None),
+                "maxAgeSeconds": round(now - min(e.computed_at for e in entries), 3) if entries else None,
+                "meanComputeSeconds": round(sum(e.duration for e in entries) / len(entries), 3) if entries else None,
+            }
+
+
+forecast_store = ForecastStore()
@@ -0,0 +1,170 @@
+"""ETag / Cache-Control support for endpoints whose output only depends on
+their inputs plus the dataset and model files on disk.
+
+The files are hashed once (at startup or on first use) into one fingerprint
+per artifact group; an ETag is a hash of that fingerprint and the normalized
+request parameters, so a matching If-None-Match is answered with 304 before
+any model runs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.model_loader import MASTER_DATA
+from app.model_registry import registry
+from app.pricedemand_service import price_demand_dataset_path
+
+CACHE_MAX_AGE_SECONDS = int(os.environ.get("HTTP_CACHE_MAX_AGE_SECONDS", "60"))
+
+
+def _files(paths: Iterable[str]) -> List[str]:
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in names)
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def stat_signature(paths: Iterable[str]) -> Tuple[Tuple[str, int, int], ...]:
+    """(path, size, mtime) of every file: a cheap way to notice that files changed."""
+    signature = []
+    for path in _files(paths):
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            signature.append((path, -1, -1))
+    return tuple(signature)
+
+
+def hash_files(paths: Iterable[str]) -> str:
+    """Content hash of the given files (directories are walked; missing files count too)."""
+    h = hashlib.blake2b(digest_size=16)
+    for path in _files(paths):
+        h.update(os.path.abspath(path).encode("utf-8") + b"\0")
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            h.update(b"<missing>")
+    return h.hexdigest()
+
+
+# group -> files deciding the responses of that group's endpoints (for the active model version)
+ARTIFACT_GROUPS: Dict[str, Callable[[], List[str]]] = {
+    "forecast": lambda: [price_demand_dataset_path(), *asdict(registry.active().price_demand_artifacts).values()],
+    "recommendation": lambda: [
+        MASTER_DATA,
+        registry.active().path("fertilizer_models"),
+        registry.active().path("yield_models"),
+    ],
+}
+
+
+class ArtifactFingerprints:
+    """Per-group artifact fingerprints, computed once and reused until refresh()."""
+
+    def __init__(self, groups: Dict[str, Callable[[], List[str]]]) -> None:
+        self.groups = groups
+        self._values: Dict[str, str] = {}
+        self._signatures: Dict[str, Tuple[Tuple[str, int, int], ...]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, group: str) -> str:
+        value = self._values.get(group)
+        if value is None:
+            with self._lock:
+                value = self._values.get(group)
+                if value is None:
+                    paths = self.groups[group]()
+                    self._signatures[group] = stat_signature(paths)
+                    value = self._values[group] = hash_files(paths)
+        return value
+
+    def changed(self, group: str) -> bool:
+        """Stats the group's files; if any changed since hashing, forgets the fingerprint."""
+        signature = stat_signature(self.groups[group]())
+        with self._lock:
+            if group not in self._values or self._signatures.get(group) == signature:
+                return False
+            self._values.pop(group, None)
+            return True
+
+    def advance(self, group: str, path: str, appended: bytes) -> None:
+        """Folds bytes just appended to one of the group's files into its fingerprint.
+
+        The new value hashes the old one with the appended bytes instead of
+        re-reading every file (it differs from what a fresh hash would give,
+        which only matters in that ETags change once more after a restart).
+        If any other file of the group changed too, the fingerprint is forgotten.
+        """
+        signature = stat_signature(self.groups[group]())
+        target = os.path.abspath(path)
+        with self._lock:
+            old = self._values.get(group)
+            if old is None:
+                return
+            before = [entry for entry in self._signatures.get(group, ()) if os.path.abspath(entry[0]) != target]
+            after = [entry for entry in signature if os.path.abspath(entry[0]) != target]
+            if before != after:
+                self._values.pop(group, None)
+                return
+            h = hashlib.blake2b(old.encode("utf-8") + b"\0", digest_size=16)
+            h.update(appended)
+            self._values[group] = h.hexdigest()
+            self._signatures[group] = signature
+
+    def refresh(self, group: Optional[str] = None) -> None:
+        """Forgets a group's fingerprint (all groups if None) after its files changed."""
+        with self._lock:
+            if group is None:
+                self._values.clear()
+            else:
+                self._values.pop(group, None)
+
+    def snapshot(self) -> Dict[str, str]:
+        return {group: self.get(group) for group in self.groups}
+
+
+fingerprints = ArtifactFingerprints(ARTIFACT_GROUPS)
+
+
+def etag_for(group: str, params: Dict[str, Any]) -> str:
+    key = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(f"{fingerprints.get(group)}|{key}".encode("utf-8"), digest_size=16).hexdigest()
+    # Weak: bodies may differ in metadata (e.g. the age of the NPK sample) but not in results.
+    return f'W/"{digest}"'
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": f"private, max-age={CACHE_MAX_AGE_SECONDS}"}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [_opaque(tag.strip()) for tag in header.split(",")]
+    return "*" in candidates or _opaque(etag) in candidates
+
+
+def _opaque(tag: str) -> str:
+    # Weak comparison (RFC 9110): W/"x" matches "x".
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
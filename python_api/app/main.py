@@ -1,19 +1,134 @@
-from fastapi import Body, FastAPI
-from pydantic import BaseModel
-from app.predictor import predict_top3
-from app.serial_reader import read_sensor_once
-from fastapi.responses import StreamingResponse, HTMLResponse
-from app.streamer import stream_generator
+from fastapi import Body, Depends, FastAPI, Query, Request
+from pydantic import BaseModel, Field
+from app.predictor import default_quantities, predict_top3, yield_response_curves
+from app.model_loader import master_data
+from app.serial_reader import read_sensor_latest
+from app.serial_manager import add_reading_listener, manager_metrics, stop_all_managers
+from app.sensor_history import history as sensor_history, query_history
+from app.sensor_log import sensor_log
+from app.recommendation_history import recommendation_history
+from fastapi.responses import JSONResponse, StreamingResponse, HTMLResponse
+from app.streamer import live_metrics, stream_generator
 from fastapi import HTTPException
 
-from api.schemas import ForecastRequest, HealthResponse
-from app.pricedemand_service import forecast_price_and_demand
-from app.npk_serial_reader import read_npk_once, stream_npk, stream_serial_raw
+from api.schemas import ForecastBandsRequest, ForecastRequest, HealthResponse, PriceDemandIngestRequest
+from app.model_registry import forecast_active, forecast_bands_active, registry as model_registry
+from app.fast_json import FastJSONResponse
+from app.http_cache import cache_headers, etag_for, fingerprints, is_not_modified, not_modified
+from app.single_flight import SingleFlight
+from app.forecast_store import forecast_store
+from app.price_demand_history import price_demand_history
+from app.admission import LIMITERS, AdmissionRejected, admission_metrics, admit, thread_slot
+from app.analytics import cube as analytics_cube, optimization as optimization_view, overview as overview_view, reports as reports_view
+from app.profiling import PROFILING_TOKEN, ProfilingMiddleware, profile_store, profiling_enabled
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from app.npk_serial_reader import NPK_BAUDRATE, NPK_PORT, npk_hub, sample_npk, stream_npk, stream_serial_raw
+import asyncio
+import hmac
 import os
+import time
+from datetime import date, timedelta
+from functools import partial
+from typing import List, Optional
 
 
 app = FastAPI(title="Paddy Fertilizer Recommendation API")
 
+# Routes that change server state are off unless their token is set, and then need it in X-Admin-Token.
+INGEST_TOKEN = os.environ.get("INGEST_TOKEN", "").strip()
+MODELS_ADMIN_TOKEN = os.environ.get("MODELS_ADMIN_TOKEN", "").strip()
+
+
+def require_token(token: str, setting: str):
+    """Dependency: 404 while `setting` is unset, 403 unless X-Admin-Token matches it."""
+
+    def check(request: Request):
+        if not token:
+            raise HTTPException(status_code=404, detail=f"Disabled (set {setting} to enable)")
+        if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), token.encode()):
+            raise HTTPException(status_code=403, detail="Admin token required (X-Admin-Token header)")
+
+    return check
+
+
+# Only installed when PROFILE_PATHS or PROFILING_TOKEN is set (see app.profiling).
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
+# Every complete reading from any serial port lands in the in-memory history.
+add_reading_listener(sensor_history.record)
+
+# Identical forecasts requested at the same time share one model rollout.
+forecast_flights = SingleFlight()
+
+
+def _on_model_swap(version):
+    # Cached ETags and materialized forecasts belong to the previous artifacts.
+    fingerprints.refresh()
+    forecast_store.request_refresh()
+
+
+model_registry.add_swap_listener(_on_model_swap)
+
+
+@app.exception_handler(AdmissionRejected)
+async def _reject_overload(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.on_event("startup")
+def _start_npk_sampler():
+    # Keep a warm N/P/K sample for forecasts; the reader retries quietly if no sensor is attached.
+    if os.environ.get("NPK_SAMPLER_ENABLED", "1") != "0":
+        npk_hub(NPK_PORT, NPK_BAUDRATE)
+
+
+@app.on_event("startup")
+def _start_sensor_log():
+    if os.environ.get("SENSOR_LOG_ENABLED", "1") != "0":
+        sensor_log.start()
+        add_reading_listener(sensor_log.record)
+
+
+@app.on_event("startup")
+def _start_recommendation_history():
+    if os.environ.get("RECOMMENDATION_HISTORY_ENABLED", "1") != "0":
+        recommendation_history.start()
+
+
+@app.on_event("startup")
+def _fingerprint_artifacts():
+    # Hash datasets and model files once so ETags never touch the disk per request.
+    fingerprints.snapshot()
+
+
+@app.on_event("startup")
+async def _start_forecast_store():
+    # Precompute the standard forecasts in the background; requests fall back to a rollout meanwhile.
+    # Each rollout holds an "expensive" slot, queued behind requests by its horizon like theirs.
+    if os.environ.get("FORECAST_STORE_ENABLED", "1") != "0":
+        forecast_store.start(slot=partial(thread_slot, "expensive", asyncio.get_running_loop()))
+
+
+@app.on_event("startup")
+def _build_analytics_cube():
+    # One pass over both datasets; afterwards only appended rows are read (see app.analytics).
+    analytics_cube.refresh()
+
+
+@app.on_event("shutdown")
+def _release_serial_ports():
+    stop_all_managers()
+    sensor_log.close()
+    recommendation_history.close()
+    forecast_store.stop()
+
+
 # ✅ Manual JSON input request
 class PredictionRequest(BaseModel):
     soil_temp: float
@@ -23,44 +138,68 @@ class PredictionRequest(BaseModel):
     growth_stage: str
     purpose: str
 
+# One curve per fertilizer in the master data (or this many when it's missing).
+MAX_CURVE_FERTILIZERS = len(master_data.fertilizers) if master_data is not None else 64
+
+# Yield-vs-quantity curves for one sensor state
+class YieldCurveRequest(PredictionRequest):
+    # Default: every fertilizer the models know; repeats are dropped.
+    fertilizers: Optional[List[str]] = Field(default=None, min_length=1, max_length=MAX_CURVE_FERTILIZERS)
+    quantity_min: Optional[float] = None  # Default: the master data's quantity range.
+    quantity_max: Optional[float] = None
+    steps: int = Field(default=25, ge=2, le=200)
+
 # ✅ Live request (only stage + purpose)
 class LivePredictionRequest(BaseModel):
     growth_stage: str
     purpose: str
 
 
-@app.get("/")
+@app.get("/", dependencies=[Depends(admit("cheap"))])
 def home():
     return {"message": "✅ API is running! Go to /docs for testing."}
 
 
-@app.get("/api/health", response_model=HealthResponse)
+@app.get("/api/health", response_model=HealthResponse, dependencies=[Depends(admit("cheap"))])
 def health():
     return HealthResponse(status="ok")
 
 
-@app.post("/api/forecasting")
-def forecasting(
-    req: ForecastRequest = Body(
-        ...,
-        examples={
-            "default": {
-                "summary": "Example request",
-                "value": {"region": "North", "horizonDays": 7},
-            }
-        },
-    )
-):
+@app.get("/api/overview", dependencies=[Depends(admit("cheap"))])
+def overview():
+    return overview_view()
+
+
+@app.get("/api/optimization", dependencies=[Depends(admit("cheap"))])
+def optimization():
+    return optimization_view()
+
+
+@app.get("/api/reports", dependencies=[Depends(admit("cheap"))])
+def reports():
+    return reports_view()
+
+
+@app.get("/api/analytics/metrics", dependencies=[Depends(admit("cheap"))])
+def analytics_metrics():
+    return analytics_cube.stats()
+
+
+async def _resolve_npk(req: ForecastRequest):
+    """(N, P, K, npkSample): the request's N/P/K, or the NPK sensor's latest reading."""
     nitrogen_n = req.nitrogenN
     phosphorus_p = req.phosphorusP
     potassium_k = req.potassiumK
 
-    # If UI didn't provide NPK, try reading once from the sensor.
+    npk_sample = None
+
+    # If UI didn't provide NPK, use the background sampler's latest reading.
     if nitrogen_n is None or phosphorus_p is None or potassium_k is None:
-        port = os.environ.get("NPK_PORT", "COM7")
-        baudrate = int(os.environ.get("NPK_BAUDRATE", "115200"))
+        port = NPK_PORT
+        baudrate = NPK_BAUDRATE
         try:
-            reading = read_npk_once(port=port, baudrate=baudrate, timeout=1.0, max_wait_seconds=5.0)
+            npk_sample = await run_in_threadpool(sample_npk, port=port, baudrate=baudrate)
+            reading = npk_sample["reading"]
             nitrogen_n = float(reading["nitrogenN"])
             phosphorus_p = float(reading["phosphorusP"])
             potassium_k = float(reading["potassiumK"])
@@ -74,15 +213,63 @@ def forecasting(
                 ),
             )
 
+    return nitrogen_n, phosphorus_p, potassium_k, npk_sample
+
+
+@app.post("/api/forecasting")
+async def forecasting(
+    request: Request,
+    req: ForecastRequest = Body(
+        ...,
+        examples={
+            "default": {
+                "summary": "Example request",
+                "value": {"region": "North", "horizonDays": 7},
+            }
+        },
+    ),
+    format: str = Query(
+        default="rows",
+        pattern="^(rows|columnar)$",
+        description="rows: [{date, price}] lists. columnar: start + stepDays + price/demand arrays.",
+    ),
+):
+    nitrogen_n, phosphorus_p, potassium_k, npk_sample = await _resolve_npk(req)
+
+    filters = {
+        "region": req.region,
+        "horizonDays": req.horizonDays,
+        "startDate": (req.startDate.isoformat() if req.startDate else None),
+        "nitrogenN": nitrogen_n,
+        "phosphorusP": phosphorus_p,
+        "potassiumK": potassium_k,
+    }
+    # Without a startDate the forecast starts tomorrow, so the key has to move with the day.
+    start = req.startDate or (date.today() + timedelta(days=1))
+    etag = etag_for("forecast", {**filters, "startDate": start.isoformat(), "format": format})
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    key = (req.region, req.horizonDays, start, nitrogen_n, phosphorus_p, potassium_k)
+
+    async def rollout():
+        # Only the request that actually computes takes an expensive slot; shorter horizons go first.
+        async with LIMITERS["expensive"].slot(cost=req.horizonDays):
+            return await run_in_threadpool(
+                forecast_active,
+                region=req.region,
+                horizon_days=req.horizonDays,
+                start_date=start,
+                nitrogen_n=nitrogen_n,
+                phosphorus_p=phosphorus_p,
+                potassium_k=potassium_k,
+            )
+
+    stored = forecast_store.get(req.region, req.horizonDays, start, nitrogen_n, phosphorus_p, potassium_k)
     try:
-        price_forecast, demand_forecast = forecast_price_and_demand(
-            region=req.region,
-            horizon_days=req.horizonDays,
-            start_date=req.startDate,
-            nitrogen_n=nitrogen_n,
-            phosphorus_p=phosphorus_p,
-            potassium_k=potassium_k,
-        )
+        series = stored.series if stored is not None else await forecast_flights.do(key, rollout)
+    except AdmissionRejected:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except FileNotFoundError as e:
@@ -90,33 +277,180 @@ def forecasting(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Forecasting failed: {e}")
 
-    return {
-        "filters": {
-            "region": req.region,
-            "horizonDays": req.horizonDays,
-            "startDate": (req.startDate.isoformat() if req.startDate else None),
-            "nitrogenN": nitrogen_n,
-            "phosphorusP": phosphorus_p,
-            "potassiumK": potassium_k,
-        },
+    if format == "columnar":
+        # Arrays go straight from NumPy to the encoder, bypassing jsonable_encoder.
+        return FastJSONResponse({
+            "filters": filters,
+            "npkSample": npk_sample,
+            "format": "columnar",
+            **series.to_columnar(),
+            "sentiment": None,
+        }, headers=cache_headers(etag))
+
+    price_forecast, demand_forecast = series.to_rows()
+    return FastJSONResponse({
+        "filters": filters,
+        "npkSample": npk_sample,
         "priceForecast": price_forecast,
         "demandForecast": demand_forecast,
         "sentiment": None,
+    }, headers=cache_headers(etag))
+
+
+@app.post("/api/forecasting/bands")
+async def forecasting_bands(
+    request: Request,
+    req: ForecastBandsRequest,
+    format: str = Query(default="rows", pattern="^(rows|columnar)$"),
+):
+    """Monte Carlo percentile bands for price and demand (see pricedemand_service.forecast_bands)."""
+    nitrogen_n, phosphorus_p, potassium_k, npk_sample = await _resolve_npk(req)
+
+    start = req.startDate or (date.today() + timedelta(days=1))
+    filters = {
+        **req.model_dump(mode="json"),
+        "startDate": start.isoformat(),
+        "nitrogenN": nitrogen_n,
+        "phosphorusP": phosphorus_p,
+        "potassiumK": potassium_k,
     }
+    etag = etag_for("forecast", {**filters, "mode": "bands", "format": format})
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def rollout():
+        async with LIMITERS["expensive"].slot(cost=req.horizonDays):
+            return await run_in_threadpool(
+                forecast_bands_active,
+                region=req.region,
+                horizon_days=req.horizonDays,
+                start_date=start,
+                nitrogen_n=nitrogen_n,
+                phosphorus_p=phosphorus_p,
+                potassium_k=potassium_k,
+                samples=req.samples,
+                percentiles=tuple(req.percentiles),
+                noise=req.noise,
+                npk_sigma=req.npkSigma,
+                seed=req.seed,
+            )
 
+    try:
+        bands = await forecast_flights.do(("bands", etag), rollout)
+    except AdmissionRejected:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecasting failed: {e}")
+
+    payload = {"filters": filters, "npkSample": npk_sample, "samples": bands.samples, "percentiles": list(bands.percentiles)}
+    if format == "columnar":
+        return FastJSONResponse({**payload, "format": "columnar", **bands.to_columnar()}, headers=cache_headers(etag))
+    price_bands, demand_bands = bands.to_rows()
+    return FastJSONResponse({**payload, "priceBands": price_bands, "demandBands": demand_bands}, headers=cache_headers(etag))
+
+
+@app.get("/api/forecasting/metrics", dependencies=[Depends(admit("cheap"))])
+def forecasting_metrics():
+    """Rollouts run vs. shared, and the materialized store's hits and refresh timings."""
+    return {"singleFlight": forecast_flights.stats(), "store": forecast_store.stats()}
+
+
+@app.post(
+    "/api/forecasting/refresh",
+    dependencies=[Depends(require_token(MODELS_ADMIN_TOKEN, "MODELS_ADMIN_TOKEN")), Depends(admit("cheap"))],
+)
+def forecasting_refresh():
+    """Recomputes the materialized forecasts in the background (e.g. after retraining)."""
+    if not forecast_store.running:
+        raise HTTPException(status_code=409, detail="Forecast store is not running (FORECAST_STORE_ENABLED=0)")
+    fingerprints.refresh("forecast")
+    forecast_store.request_refresh()
+    return {"status": "scheduled"}
 
-@app.get("/api/npk")
-def npk(port: str = "COM7", baudrate: int = 115200):
-    """Optional helper endpoint to read one NPK sample from the serial sensor."""
+
+@app.post(
+    "/api/forecasting/ingest",
+    dependencies=[Depends(require_token(INGEST_TOKEN, "INGEST_TOKEN")), Depends(admit("medium"))],
+)
+def forecasting_ingest(req: PriceDemandIngestRequest):
+    """Appends new daily rows to the price/demand dataset (see app.price_demand_history).
+
+    Disabled unless INGEST_TOKEN is set; `python -m app.price_demand_history` is the default way in.
+    """
     try:
-        reading = read_npk_once(port=port, baudrate=baudrate)
-        return {"source": "serial", "port": port, "baudrate": baudrate, "reading": reading}
+        result = price_demand_history.ingest(req.rows, artifacts=model_registry.active().price_demand_artifacts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Only forecasts read this file: move their ETags on without re-hashing, and re-materialize them.
+    # The analytics cube folds the appended rows in on its next read.
+    fingerprints.advance("forecast", price_demand_history.path, result.appended)
+    forecast_store.request_refresh()
+    return {**result.as_dict(), "history": price_demand_history.describe()}
+
+
+@app.get("/api/forecasting/history", dependencies=[Depends(admit("cheap"))])
+def forecasting_history():
+    """Size and last day of the price/demand history, and the cached tail's counters."""
+    return price_demand_history.describe()
+
+
+@app.get("/api/models", dependencies=[Depends(admit("cheap"))])
+def models_status():
+    """Model versions: active, draining, candidate, warm-up state and per-version latency."""
+    return model_registry.status()
+
+
+@app.post(
+    "/api/models/activate",
+    dependencies=[Depends(require_token(MODELS_ADMIN_TOKEN, "MODELS_ADMIN_TOKEN")), Depends(admit("cheap"))],
+)
+def models_activate(version: str):
+    """Warms `version` in the background, then swaps it in between requests."""
+    try:
+        model_registry.activate(version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "warming", "version": version}
+
+
+@app.post(
+    "/api/models/candidate",
+    dependencies=[Depends(require_token(MODELS_ADMIN_TOKEN, "MODELS_ADMIN_TOKEN")), Depends(admit("cheap"))],
+)
+def models_candidate(version: Optional[str] = None, percent: float = Query(default=10.0, ge=0, le=100)):
+    """Shadows `percent` % of calls with `version` for latency comparison; no version clears it."""
+    try:
+        model_registry.set_candidate(version, percent)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "warming" if version else "cleared", "version": version, "percent": percent}
+
+
+@app.get("/api/scheduler/metrics", dependencies=[Depends(admit("cheap"))])
+def scheduler_metrics():
+    """Concurrency, queue depth, rejections and queue-wait percentiles per endpoint class."""
+    return {"limiters": admission_metrics()}
+
+
+@app.get("/api/npk", dependencies=[Depends(admit("medium"))])
+def npk(port: str = NPK_PORT, baudrate: int = NPK_BAUDRATE, max_age: float = 5.0):
+    """Optional helper endpoint returning the latest NPK sample from the serial sensor."""
+    try:
+        sample = sample_npk(port=port, baudrate=baudrate, max_age=max_age, wait=5.0)
+        return {"source": "serial", "port": port, "baudrate": baudrate, **sample}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read NPK sensor: {e}")
 
 
 @app.get("/api/npk/stream")
-def npk_stream(port: str = "COM7", baudrate: int = 115200, interval: float = 0.25):
+async def npk_stream(port: str = NPK_PORT, baudrate: int = NPK_BAUDRATE, interval: float = 0.25):
     """Streams NPK readings continuously using Server-Sent Events (SSE)."""
     try:
         return StreamingResponse(
@@ -128,20 +462,106 @@ def npk_stream(port: str = "COM7", baudrate: int = 115200, interval: float = 0.2
 
 
 @app.get("/api/npk/raw-stream")
-def npk_raw_stream(port: str = "COM7", baudrate: int = 115200, interval: float = 0.1):
-    """Streams raw serial lines continuously using Server-Sent Events (SSE)."""
+async def npk_raw_stream(
+    port: str = NPK_PORT,
+    baudrate: int = NPK_BAUDRATE,
+    interval: float = 0.1,
+    batch: bool = False,
+    hex: bool = True,
+    max_batch: int = Query(default=256, ge=1, le=10000),
+):
+    """Streams raw serial lines continuously using Server-Sent Events (SSE).
+
+    batch=true sends "batch" events holding every line received within `interval`
+    seconds (or max_batch lines); hex=false leaves out rawHex.
+    """
     try:
         return StreamingResponse(
-            stream_serial_raw(port=port, baudrate=baudrate, interval=interval),
+            stream_serial_raw(
+                port=port,
+                baudrate=baudrate,
+                interval=interval,
+                batch=batch,
+                include_hex=hex,
+                max_batch=max_batch,
+            ),
             media_type="text/event-stream",
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to stream raw serial data: {e}")
 
 
+@app.get("/api/serial/metrics", dependencies=[Depends(admit("cheap"))])
+def serial_metrics():
+    """Per-port reader state and subscriber counts for the shared serial hubs."""
+    return {"ports": manager_metrics(), "liveRecommendations": live_metrics()}
+
+
+@app.get("/api/sensors/history", dependencies=[Depends(admit("cheap"))])
+def sensors_history(
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    buckets: int = Query(default=120, ge=1, le=5000),
+    fields: Optional[str] = None,
+):
+    """Min/max/mean buckets of recorded sensor readings (epoch seconds; default: last hour)."""
+    try:
+        return query_history(
+            start=start,
+            end=end,
+            buckets=buckets,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/sensors/log", dependencies=[Depends(admit("cheap"))])
+def sensors_log(
+    start: float,
+    end: Optional[float] = None,
+    port: Optional[str] = None,
+    limit: int = Query(default=10000, ge=1, le=100000),
+):
+    """Raw readings persisted by the sensor log for [start, end) (epoch seconds)."""
+    try:
+        readings = sensor_log.query(start, end if end is not None else time.time(), port=port, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"count": len(readings), "readings": readings, "log": sensor_log.stats()}
+
+
+@app.get("/api/fertilizer/history", dependencies=[Depends(admit("cheap"))])
+def fertilizer_history(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    growth_stage: Optional[str] = None,
+    fertilizer: Optional[str] = None,
+):
+    """Recorded recommendations, newest first; pass nextCursor back as cursor for the next page."""
+    try:
+        page = recommendation_history.page(
+            limit=limit,
+            cursor=cursor,
+            start=start,
+            end=end,
+            growth_stage=growth_stage,
+            fertilizer=fertilizer,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**page, "log": recommendation_history.stats()}
+
+
 # ✅ Mode 1: Manual JSON prediction
-@app.post("/predict")
-def predict_manual(req: PredictionRequest):
+@app.post("/predict", dependencies=[Depends(admit("medium"))])
+def predict_manual(req: PredictionRequest, request: Request):
+    etag = etag_for("recommendation", req.model_dump())
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
     sensor_data = {
         "soil_temp": req.soil_temp,
         "soil_moisture": req.soil_moisture,
@@ -149,21 +569,56 @@ def predict_manual(req: PredictionRequest):
         "air_humidity": req.air_humidity
     }
 
-    results = predict_top3(sensor_data, req.growth_stage, req.purpose)
+    results = predict_top3(sensor_data, req.growth_stage, req.purpose, source="manual")
 
-    return {
+    return FastJSONResponse({
         "mode": "manual",
         "sensor_data": sensor_data,
         "predictions": results
+    }, headers=cache_headers(etag))
+
+
+@app.post("/api/fertilizer/yield-curve", dependencies=[Depends(admit("medium"))])
+def yield_curve(req: YieldCurveRequest, request: Request):
+    """Predicted yield over a quantity grid for each fertilizer, plus each one's best quantity."""
+    etag = etag_for("recommendation", req.model_dump())
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    sensor_data = {
+        "soil_temp": req.soil_temp,
+        "soil_moisture": req.soil_moisture,
+        "air_temp": req.air_temp,
+        "air_humidity": req.air_humidity
     }
+    quantities = default_quantities(req.steps)
+    if req.quantity_min is not None or req.quantity_max is not None:
+        low = req.quantity_min if req.quantity_min is not None else float(quantities[0])
+        high = req.quantity_max if req.quantity_max is not None else float(quantities[-1])
+        if high <= low:
+            raise HTTPException(status_code=400, detail="quantity_max must be greater than quantity_min")
+        quantities = [round(low + (high - low) * i / (req.steps - 1), 2) for i in range(req.steps)]
+
+    try:
+        result = yield_response_curves(sensor_data, req.growth_stage, req.purpose, req.fertilizers, quantities)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({
+        "sensor_data": sensor_data,
+        **result,
+        "gridPoints": len(result["curves"]) * len(result["quantities"]),
+    }, headers=cache_headers(etag))
 
 
 # Mode 2: Live ESP32 prediction
-@app.post("/predict-live")
+@app.post("/predict-live", dependencies=[Depends(admit("medium"))])
 def predict_live(req: LivePredictionRequest):
-    sensor_data = read_sensor_once()
+    try:
+        sensor_data = read_sensor_latest()
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=f"Live sensor reading unavailable: {e}")
 
-    results = predict_top3(sensor_data, req.growth_stage, req.purpose)
+    results = predict_top3(sensor_data, req.growth_stage, req.purpose, source="live")
 
     return {
         "mode": "live",
@@ -172,12 +627,40 @@ def predict_live(req: LivePredictionRequest):
     }
 
 @app.get("/stream-live")
-def stream_live(growth_stage: str, purpose: str):
+async def stream_live(growth_stage: str, purpose: str, max_age: Optional[float] = None):
     return StreamingResponse(
-        stream_generator(growth_stage, purpose),
+        stream_generator(growth_stage, purpose, max_age=max_age),
         media_type="text/event-stream"
     )
 
+def _check_profile_access(request: Request):
+    # Profiles carry paths and query strings, so they are only served with a token, even with PROFILE_PATHS.
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Stored profiles are only served when PROFILING_TOKEN is set")
+    token = request.headers.get("x-profile", request.query_params.get("token")) or ""
+    if not hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Profiling token required (X-Profile header or ?token=)")
+
+
+@app.get("/debug/profiles", dependencies=[Depends(_check_profile_access)])
+def debug_profiles():
+    """Stored request profiles, newest first."""
+    return {"profiles": profile_store.list()}
+
+
+@app.get("/debug/profiles/{profile_id}", dependencies=[Depends(_check_profile_access)])
+def debug_profile(profile_id: str):
+    """One profile in collapsed-stack format (flamegraph.pl, speedscope)."""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}'")
+    with open(path, encoding="utf-8") as f:
+        return PlainTextResponse(
+            f.read(),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+        )
+
+
 @app.get("/stream-page")
 def stream_page():
     html_content = """
@@ -224,6 +707,8 @@ def stream_page():
 
         <script>
             let eventSource;
+            let sensorData = {};
+            let predictions = [];
 
             function startStream() {
                 const stage = document.getElementById("stage").value;
@@ -235,24 +720,37 @@ def stream_page():
 
                 eventSource.onmessage = function(event) {
                     const data = JSON.parse(event.data);
-
-                    document.getElementById("sensor").textContent =
-                        JSON.stringify(data.sensor_data, null, 2);
-
-                    const tbody = document.querySelector("#predTable tbody");
-                    tbody.innerHTML = "";
-
-                    data.predictions.forEach(p => {
-                        const row = `<tr>
-                            <td>${p.Rank}</td>
-                            <td>${p["Recommended Fertilizer"]}</td>
-                            <td>${p["Quantity (kg/acre)"]}</td>
-                            <td>${p["Predicted Yield (ton/ha)"]}</td>
-                            <td>${p["Confidence (%)"]}</td>
-                        </tr>`;
-                        tbody.innerHTML += row;
-                    });
+                    sensorData = data.sensor_data;
+                    predictions = data.predictions;
+                    render();
                 };
+
+                // Only the inputs and ranks that changed since the previous result.
+                eventSource.addEventListener("delta", function(event) {
+                    const data = JSON.parse(event.data);
+                    Object.assign(sensorData, data.sensor_data);
+                    (data.predictions || []).forEach(p => { predictions[p.Rank - 1] = p; });
+                    render();
+                });
+            }
+
+            function render() {
+                document.getElementById("sensor").textContent =
+                    JSON.stringify(sensorData, null, 2);
+
+                const tbody = document.querySelector("#predTable tbody");
+                tbody.innerHTML = "";
+
+                predictions.forEach(p => {
+                    const row = `<tr>
+                        <td>${p.Rank}</td>
+                        <td>${p["Recommended Fertilizer"]}</td>
+                        <td>${p["Quantity (kg/acre)"]}</td>
+                        <td>${p["Predicted Yield (ton/ha)"]}</td>
+                        <td>${p["Confidence (%)"]}</td>
+                    </tr>`;
+                    tbody.innerHTML += row;
+                });
             }
         </script>
     </body>
@@ -355,7 +853,7 @@ def npk_page():
                 stopStream();
                 setStatus('connecting...');
 
-                const url = `/api/npk/raw-stream?port=${encodeURIComponent(port)}&baudrate=${encodeURIComponent(baudrate)}&interval=${encodeURIComponent(interval)}`;
+                const url = `/api/npk/raw-stream?port=${encodeURIComponent(port)}&baudrate=${encodeURIComponent(baudrate)}&interval=${encodeURIComponent(interval)}&batch=true`;
                 eventSource = new EventSource(url);
 
                 eventSource.onopen = () => setStatus('connected');
@@ -380,6 +878,31 @@ def npk_page():
                     appendLog(`[ERROR] ${new Date().toISOString()} ${event.data}`);
                 });
 
+                eventSource.addEventListener('batch', (event) => {
+                    let payload;
+                    try {
+                        payload = JSON.parse(event.data);
+                    } catch {
+                        appendLog(`[DATA] ${new Date().toISOString()} ${event.data}`);
+                        return;
+                    }
+
+                    const entries = payload.lines.map((line) =>
+                        `Timestamp : ${new Date(line.t * 1000).toISOString()}\n` +
+                        `Raw Hex   : ${line.rawHex || ''}\n` +
+                        `Decoded   : ${line.decoded || ''}\n` +
+                        `---`
+                    );
+                    appendLog(entries.reverse().join("\n"));
+
+                    if (payload.npk) {
+                        if (payload.npk.nitrogenN !== undefined) document.getElementById('nVal').textContent = payload.npk.nitrogenN;
+                        if (payload.npk.phosphorusP !== undefined) document.getElementById('pVal').textContent = payload.npk.phosphorusP;
+                        if (payload.npk.potassiumK !== undefined) document.getElementById('kVal').textContent = payload.npk.potassiumK;
+                        document.getElementById('npkTs').textContent = new Date().toISOString();
+                    }
+                });
+
                 eventSource.onmessage = (event) => {
                     let payload;
                     try {
@@ -0,0 +1,119 @@
+"""Compact, read-only view of Dataset.csv (the fertilizer master data).
+
+The CSV is only used for lookups, so it is held with categorical strings,
+float32 numerics and a parsed Date column, and the per-fertilizer values
+predict_top3 needs are computed once at load time.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = ["Paddy_Growth_Stage", "Recommended_Fertilizer", "Purpose", "Sustainability_Note"]
+NUMERIC_COLUMNS = [
+    "Soil_Temperature (°C)",
+    "Soil_Moisture (%)",
+    "Air_Temperature (°C)",
+    "Air_Humidity (%)",
+    "Quantity_kg_per_acre",
+    "Predicted_Yield_ton_per_ha",
+    "Cost_LKR_per_ha",
+]
+
+
+@dataclass(frozen=True)
+class FertilizerInfo:
+    name: str
+    # First row of the fertilizer in file order (what predict_top3 has always reported), full precision.
+    quantity: float
+    note: str
+    rows: int
+    mean_quantity: float
+    mean_yield: float
+    mean_cost: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "fertilizer": self.name,
+            "quantityKgPerAcre": self.quantity,
+            "sustainabilityNote": self.note,
+            "rows": self.rows,
+            "meanQuantityKgPerAcre": round(self.mean_quantity, 3),
+            "meanYieldTonPerHa": round(self.mean_yield, 3),
+            "meanCostLkrPerHa": round(self.mean_cost, 3),
+        }
+
+
+class MasterData:
+    def __init__(self, frame: pd.DataFrame, fertilizers: Dict[str, FertilizerInfo], path: Optional[str] = None) -> None:
+        self.frame = frame
+        self.fertilizers = fertilizers
+        self.path = path
+
+    @classmethod
+    def from_frame(cls, raw: pd.DataFrame, path: Optional[str] = None) -> "MasterData":
+        fertilizers: Dict[str, FertilizerInfo] = {}
+        if "Recommended_Fertilizer" in raw.columns:
+            grouped = raw.groupby("Recommended_Fertilizer", sort=False, observed=True)
+            # Each fertilizer's first row as is (GroupBy.first() would skip its missing cells).
+            first = raw.drop_duplicates("Recommended_Fertilizer", keep="first").set_index("Recommended_Fertilizer")
+            size = grouped.size()
+            means = grouped[["Quantity_kg_per_acre", "Predicted_Yield_ton_per_ha", "Cost_LKR_per_ha"]].mean()
+            for name in first.index:
+                fertilizers[str(name)] = FertilizerInfo(
+                    name=str(name),
+                    quantity=float(first.at[name, "Quantity_kg_per_acre"]),
+                    note=str(first.at[name, "Sustainability_Note"]),
+                    rows=int(size[name]),
+                    mean_quantity=float(means.at[name, "Quantity_kg_per_acre"]),
+                    mean_yield=float(means.at[name, "Predicted_Yield_ton_per_ha"]),
+                    mean_cost=float(means.at[name, "Cost_LKR_per_ha"]),
+                )
+
+        frame = raw.copy()
+        for col in CATEGORY_COLUMNS:
+            if col in frame.columns:
+                frame[col] = frame[col].astype("category")
+        for col in NUMERIC_COLUMNS:
+            if col in frame.columns:
+                frame[col] = frame[col].astype(np.float32)
+        if "Date" in frame.columns:
+            frame["Date"] = pd.to_datetime(frame["Date"], format="%d/%m/%Y", errors="coerce")
+        return cls(frame, fertilizers, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MasterData":
+        # Numerics are parsed as float64 so the per-fertilizer values keep full precision.
+        return cls.from_frame(pd.read_csv(path, dtype={c: "category" for c in CATEGORY_COLUMNS}), path)
+
+    def fertilizer(self, name: str) -> FertilizerInfo:
+        try:
+            return self.fertilizers[name]
+        except KeyError:
+            raise ValueError(f"Fertilizer '{name}' is not in the master data") from None
+
+    def categories(self, column: str) -> List[str]:
+        return [str(c) for c in self.frame[column].cat.categories]
+
+    def memory_bytes(self) -> int:
+        return int(self.frame.memory_usage(deep=True).sum())
+
+    def describe(self) -> Dict[str, Any]:
+        dates = self.frame["Date"] if "Date" in self.frame.columns else None
+        return {
+            "path": self.path,
+            "rows": len(self.frame),
+            "memoryBytes": self.memory_bytes(),
+            "fertilizers": len(self.fertilizers),
+            "firstDate": dates.min().date().isoformat() if dates is not None and dates.notna().any() else None,
+            "lastDate": dates.max().date().isoformat() if dates is not None and dates.notna().any() else None,
+        }
+
+
+def load_master_data(path: str) -> Optional[MasterData]:
+    return MasterData.load(path) if os.path.exists(path) else None
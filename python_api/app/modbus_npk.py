@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import os
+import struct
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import serial
+
+from app.serial_manager import LineParser, SerialConnectionManager, SerialSnapshot
+
+# Register layout of the common RS-485 soil NPK probes (mg/kg, holding registers).
+DEFAULT_REGISTER_MAP: Dict[str, int] = {
+    "nitrogenN": 0x001E,
+    "phosphorusP": 0x001F,
+    "potassiumK": 0x0020,
+}
+
+READ_HOLDING_REGISTERS = 0x03
+READ_INPUT_REGISTERS = 0x04
+
+
+class ModbusError(Exception):
+    pass
+
+
+def _crc_table() -> Tuple[int, ...]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data: bytes) -> int:
+    """Modbus RTU CRC-16 (poly 0xA001, init 0xFFFF)."""
+    crc = 0xFFFF
+    for b in data:
+        crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ b) & 0xFF]
+    return crc
+
+
+def build_read_request(slave_id: int, start: int, count: int, function: int = READ_HOLDING_REGISTERS) -> bytes:
+    pdu = struct.pack(">BBHH", slave_id, function, start, count)
+    return pdu + struct.pack("<H", crc16(pdu))
+
+
+def parse_read_response(frame: bytes, slave_id: int, count: int, function: int = READ_HOLDING_REGISTERS) -> List[int]:
+    """Validates a read-registers response and returns the register values."""
+    if len(frame) < 5:
+        raise ModbusError(f"Short frame ({len(frame)} bytes)")
+    if struct.unpack("<H", frame[-2:])[0] != crc16(frame[:-2]):
+        raise ModbusError("CRC mismatch")
+    if frame[0] != slave_id:
+        raise ModbusError(f"Response from slave {frame[0]}, expected {slave_id}")
+    if frame[1] == function | 0x80:
+        raise ModbusError(f"Slave {slave_id} exception code {frame[2]}")
+    if frame[1] != function:
+        raise ModbusError(f"Unexpected function 0x{frame[1]:02x}")
+    if frame[2] != 2 * count or len(frame) != 5 + 2 * count:
+        raise ModbusError(f"Expected {count} registers, got {frame[2]} bytes")
+    return list(struct.unpack(f">{count}H", frame[3:-2]))
+
+
+def parse_register_map(spec: str) -> Dict[str, int]:
+    """Parses "nitrogenN=0x1E,phosphorusP=0x1F,potassiumK=0x20"."""
+    registers: Dict[str, int] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        key, _, addr = part.partition("=")
+        registers[key.strip()] = int(addr.strip(), 0)
+    return registers
+
+
+@dataclass
+class ModbusSensor:
+    slave_id: int
+    register_map: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_REGISTER_MAP))
+    function: int = READ_HOLDING_REGISTERS
+    scale: float = 1.0
+
+    @property
+    def name(self) -> str:
+        return f"slave-{self.slave_id}"
+
+    def span(self) -> Tuple[int, int]:
+        """(start, count) covering every mapped register in a single request."""
+        start = min(self.register_map.values())
+        return start, max(self.register_map.values()) - start + 1
+
+
+@dataclass
+class _PollStats:
+    polls: int = 0
+    ok: int = 0
+    timeouts: int = 0
+    crc_errors: int = 0
+    exceptions: int = 0
+    last_latency_ms: Optional[float] = None
+    recent_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    def as_dict(self) -> Dict[str, Any]:
+        recent = sorted(self.recent_ms)
+        return {
+            "polls": self.polls,
+            "ok": self.ok,
+            "timeouts": self.timeouts,
+            "crcErrors": self.crc_errors,
+            "exceptions": self.exceptions,
+            "lastLatencyMs": self.last_latency_ms,
+            "meanLatencyMs": round(sum(recent) / len(recent), 3) if recent else None,
+            "p95LatencyMs": round(recent[int(0.95 * (len(recent) - 1))], 3) if recent else None,
+        }
+
+
+class ModbusNpkPoller(SerialConnectionManager):
+    """Polls Modbus RTU NPK probes on one RS-485 bus in round-robin order.
+
+    Plugs into the same hub API as the text reader: every successful poll is
+    published as a "reading" event (with a "sensor" field) and becomes the
+    cached snapshot, and request/response frames are published as "line" events
+    for the raw monitor.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        baudrate: int,
+        parse_line: LineParser,
+        required: Iterable[str],
+        *,
+        sensors: Optional[List[ModbusSensor]] = None,
+        poll_interval: float = 1.0,
+        response_timeout: float = 0.5,
+        **kwargs: Any,
+    ) -> None:
+        kwargs.setdefault("reset_delay", 0.0)
+        kwargs.setdefault("timeout", response_timeout)
+        super().__init__(port, baudrate, parse_line, required, **kwargs)
+        self.sensors = sensors or [ModbusSensor(slave_id=1)]
+        self.poll_interval = poll_interval
+        self._stats: Dict[str, _PollStats] = {s.name: _PollStats() for s in self.sensors}
+        self._latest_by_sensor: Dict[str, SerialSnapshot] = {}
+
+    def latest_for(self, sensor_name: str) -> Optional[SerialSnapshot]:
+        with self._cond:
+            return self._latest_by_sensor.get(sensor_name)
+
+    def status(self) -> Dict[str, Any]:
+        status = super().status()
+        with self._cond:
+            status["modbus"] = {name: stats.as_dict() for name, stats in self._stats.items()}
+        return status
+
+    def _read_until_error(self, ser: serial.Serial) -> None:
+        # One cycle polls every sensor once; cycles start every poll_interval.
+        next_cycle = time.perf_counter()
+        while not self._stop.is_set():
+            for sensor in self.sensors:
+                if self._stop.is_set():
+                    return
+                self._poll(ser, sensor)
+
+            next_cycle += self.poll_interval
+            delay = next_cycle - time.perf_counter()
+            if delay <= 0:
+                next_cycle = time.perf_counter()  # Bus is saturated; don't try to catch up.
+            elif self._stop.wait(delay):
+                return
+
+    def _poll(self, ser: serial.Serial, sensor: ModbusSensor) -> None:
+        start, count = sensor.span()
+        request = build_read_request(sensor.slave_id, start, count, sensor.function)
+        stats = self._stats[sensor.name]
+
+        ser.reset_input_buffer()
+        sent = time.perf_counter()
+        ser.write(request)
+        header = ser.read(3)
+        body = b""
+        if len(header) == 3:
+            # Exception responses carry one code byte + CRC; normal ones byte_count + CRC.
+            body = ser.read(2 if header[1] & 0x80 else header[2] + 2)
+        latency_ms = (time.perf_counter() - sent) * 1000.0
+        frame = header + body
+        now = time.time()
+
+        with self._cond:
+            stats.polls += 1
+            self._lines += 1
+        self._publish({"type": "line", "raw": frame, "line": f"{sensor.name} {frame.hex()}", "parsed": None, "timestamp": now})
+
+        try:
+            if len(header) < 3 or len(body) < (2 if header[1] & 0x80 else header[2] + 2):
+                raise TimeoutError(f"{sensor.name} did not answer within {self.timeout}s")
+            registers = parse_read_response(frame, sensor.slave_id, count, sensor.function)
+        except TimeoutError:
+            with self._cond:
+                stats.timeouts += 1
+            return
+        except ModbusError as e:
+            with self._cond:
+                if "CRC" in str(e):
+                    stats.crc_errors += 1
+                else:
+                    stats.exceptions += 1
+                self._last_error = str(e)
+            return
+
+        values = {key: registers[addr - start] * sensor.scale for key, addr in sensor.register_map.items()}
+        snap = SerialSnapshot(values=values, timestamp=now, started_at=now - latency_ms / 1000.0)
+        with self._cond:
+            stats.ok += 1
+            stats.last_latency_ms = round(latency_ms, 3)
+            stats.recent_ms.append(latency_ms)
+            self._latest_by_sensor[sensor.name] = snap
+        self._emit_reading(snap, sensor=sensor.name)
+
+
+def sensors_from_env() -> List[ModbusSensor]:
+    """Builds the bus layout from NPK_MODBUS_SLAVES / NPK_MODBUS_REGISTERS / NPK_MODBUS_FUNCTION."""
+    slaves = [int(s, 0) for s in os.environ.get("NPK_MODBUS_SLAVES", "1").split(",") if s.strip()]
+    registers_spec = os.environ.get("NPK_MODBUS_REGISTERS", "").strip()
+    registers = parse_register_map(registers_spec) if registers_spec else dict(DEFAULT_REGISTER_MAP)
+    function = int(os.environ.get("NPK_MODBUS_FUNCTION", str(READ_HOLDING_REGISTERS)), 0)
+    scale = float(os.environ.get("NPK_MODBUS_SCALE", "1"))
+    return [ModbusSensor(slave_id=s, register_map=dict(registers), function=function, scale=scale) for s in slaves]
@@ -1,6 +1,7 @@
 import os
 import joblib
-import pandas as pd
+
+from app.master_data import load_master_data
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODEL_DIR = os.path.join(BASE_DIR, "models")
@@ -12,11 +13,27 @@ def _try_load(path: str):
 		return None
 
 
-clf = _try_load(os.path.join(MODEL_DIR, "fertilizer_models/fertilizer_model.pkl"))
-reg = _try_load(os.path.join(MODEL_DIR, "yield_models/yield_model.pkl"))
-scaler = _try_load(os.path.join(MODEL_DIR, "yield_models/scaler.pkl"))
-encoders = _try_load(os.path.join(MODEL_DIR, "fertilizer_models/label_encoders.pkl"))
-feature_names = _try_load(os.path.join(MODEL_DIR, "fertilizer_models/feature_names.pkl"))
+def load_recommendation_models(fertilizer_dir: str, yield_dir: str) -> dict:
+	"""Loads the fertilizer classifier, yield regressor and their preprocessing (None if missing)."""
+	return {
+		"clf": _try_load(os.path.join(fertilizer_dir, "fertilizer_model.pkl")),
+		"reg": _try_load(os.path.join(yield_dir, "yield_model.pkl")),
+		"scaler": _try_load(os.path.join(yield_dir, "scaler.pkl")),
+		"encoders": _try_load(os.path.join(fertilizer_dir, "label_encoders.pkl")),
+		"feature_names": _try_load(os.path.join(fertilizer_dir, "feature_names.pkl")),
+	}
+
 
 MASTER_DATA = os.path.join(BASE_DIR, "Dataset.csv")
-df_master = pd.read_csv(MASTER_DATA) if os.path.exists(MASTER_DATA) else None
+# Compact view (categorical strings, float32, parsed Date) plus per-fertilizer lookups; see app.master_data.
+master_data = load_master_data(MASTER_DATA)
+df_master = master_data.frame if master_data is not None else None
+
+
+def __getattr__(name):
+	# clf, reg, scaler, encoders and feature_names follow the registry's active model version.
+	if name in ("clf", "reg", "scaler", "encoders", "feature_names"):
+		from app.model_registry import registry
+
+		return getattr(registry.active(), name)
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
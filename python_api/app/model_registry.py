@@ -0,0 +1,375 @@
+"""Versioned model artifacts with background warm-up and atomic hot swap.
+
+The artifacts under python_api/models/ are the "baseline" version; every
+directory under python_api/models/versions/<name>/ is another version with
+the same layout (fertilizer_models/, yield_models/, PriceDemandModels/).
+A subdirectory a version doesn't ship is taken from the baseline, so a
+version can replace just the yield model.
+
+Requests lease the active version for their whole duration. activate() loads
+and warms the new version off the request path and then swaps the pointer;
+requests already holding the old version finish on it, and it is dropped
+once its last lease ends. A candidate version can shadow a percentage of
+traffic: it runs the same call in the background and only its latency (and
+whether it agreed) is recorded.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.model_loader import MODEL_DIR, load_recommendation_models
+from app.pricedemand_service import (
+    ForecastBands,
+    ForecastSeries,
+    PriceDemandArtifacts,
+    PriceDemandModels,
+    default_artifacts,
+    forecast_bands,
+    forecast_series,
+)
+
+VERSIONS_DIR = os.path.join(MODEL_DIR, "versions")
+BASELINE = "baseline"
+MODEL_VERSION = os.environ.get("MODEL_VERSION", BASELINE).strip() or BASELINE
+
+
+class ModelVersion:
+    """One loaded set of artifacts plus the number of requests using it."""
+
+    def __init__(self, name: str, root: str) -> None:
+        self.name = name
+        self.root = root
+        self.created_at = time.time()
+        self.warm_seconds: Optional[float] = None
+        self.in_flight = 0
+
+        models = load_recommendation_models(self.path("fertilizer_models"), self.path("yield_models"))
+        self.clf = models["clf"]
+        self.reg = models["reg"]
+        self.scaler = models["scaler"]
+        self.encoders = models["encoders"]
+        self.feature_names = models["feature_names"]
+
+        self._price_demand: Optional[PriceDemandModels] = None
+        self._price_demand_lock = threading.Lock()
+
+    def path(self, subdir: str) -> str:
+        own = os.path.join(self.root, subdir)
+        return own if os.path.isdir(own) else os.path.join(MODEL_DIR, subdir)
+
+    def artifact_paths(self) -> List[str]:
+        return [self.path(d) for d in ("fertilizer_models", "yield_models", "PriceDemandModels")]
+
+    @property
+    def price_demand_artifacts(self) -> PriceDemandArtifacts:
+        return default_artifacts(self.path("PriceDemandModels"))
+
+    def price_demand(self) -> PriceDemandModels:
+        """LSTM/XGB artifacts, loaded on first use (TensorFlow is only imported then)."""
+        if self._price_demand is None:
+            with self._price_demand_lock:
+                if self._price_demand is None:
+                    self._price_demand = PriceDemandModels.load(self.price_demand_artifacts)
+        return self._price_demand
+
+    def warm(self) -> Dict[str, Optional[str]]:
+        """Loads everything lazy and runs one prediction per model; returns load errors."""
+        started = time.perf_counter()
+        errors: Dict[str, Optional[str]] = {"recommendation": None, "forecast": None}
+        if self.clf is None or self.reg is None or self.encoders is None:
+            errors["recommendation"] = "fertilizer/yield artifacts missing"
+        else:
+            try:
+                from app.predictor import predict_top3_with
+
+                predict_top3_with(
+                    self,
+                    {"soil_temp": 25.0, "soil_moisture": 50.0, "air_temp": 28.0, "air_humidity": 70.0},
+                    self.encoders["Paddy_Growth_Stage"].classes_[0],
+                    self.encoders["Purpose"].classes_[0],
+                )
+            except Exception as e:
+                errors["recommendation"] = str(e)
+        try:
+            models = self.price_demand()
+            window = np.zeros((1, models.window_size, len(models.feature_cols_lstm)), dtype=np.float32)
+            models.lstm.predict(window, verbose=0)
+        except Exception as e:
+            errors["forecast"] = str(e)
+        self.warm_seconds = round(time.perf_counter() - started, 3)
+        return errors
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "root": self.root,
+            "createdAt": self.created_at,
+            "warmSeconds": self.warm_seconds,
+            "inFlight": self.in_flight,
+            "recommendationLoaded": self.clf is not None and self.reg is not None,
+            "forecastLoaded": self._price_demand is not None,
+        }
+
+
+class _Latency:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.mismatches = 0
+        self.recent_ms: Deque[float] = deque(maxlen=512)
+
+    def as_dict(self) -> Dict[str, Any]:
+        recent = sorted(self.recent_ms)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mismatches": self.mismatches,
+            "meanMs": round(sum(recent) / len(recent), 3) if recent else None,
+            "p95Ms": round(recent[int(0.95 * (len(recent) - 1))], 3) if recent else None,
+        }
+
+
+def _same_result(a: Any, b: Any) -> bool:
+    if isinstance(a, ForecastSeries) and isinstance(b, ForecastSeries):
+        return a.start == b.start and np.allclose(a.price, b.price) and np.allclose(a.demand, b.demand)
+    if isinstance(a, ForecastBands) and isinstance(b, ForecastBands):
+        return a.start == b.start and np.allclose(a.price, b.price) and np.allclose(a.demand, b.demand)
+    return a == b
+
+
+class ModelRegistry:
+    def __init__(self, versions_dir: str = VERSIONS_DIR, initial: str = MODEL_VERSION) -> None:
+        self.versions_dir = versions_dir
+        self._lock = threading.RLock()
+        self._active = self._load(initial)
+        self._draining: List[ModelVersion] = []
+        self._candidate: Optional[ModelVersion] = None
+        self._candidate_percent = 0.0
+        self._latency: Dict[Tuple[str, str, str], _Latency] = {}
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-shadow")
+        self._shadow_backlog = 0
+        self._swap_listeners: List[Callable[[ModelVersion], None]] = []
+        self._last_swap: Optional[Dict[str, Any]] = None
+        self._warming: Dict[str, str] = {}
+
+    # --- Versions ---
+
+    def versions(self) -> List[str]:
+        names = [BASELINE]
+        if os.path.isdir(self.versions_dir):
+            names += sorted(d for d in os.listdir(self.versions_dir) if os.path.isdir(os.path.join(self.versions_dir, d)))
+        return names
+
+    def _root(self, name: str) -> str:
+        if name == BASELINE:
+            return MODEL_DIR
+        if name not in self.versions():
+            raise ValueError(f"Unknown model version '{name}'. Available: {', '.join(self.versions())}")
+        return os.path.join(self.versions_dir, name)
+
+    def _load(self, name: str) -> ModelVersion:
+        return ModelVersion(name, self._root(name))
+
+    def active(self) -> ModelVersion:
+        return self._active
+
+    def add_swap_listener(self, listener: Callable[[ModelVersion], None]) -> None:
+        self._swap_listeners.append(listener)
+
+    # --- Leasing ---
+
+    @contextmanager
+    def lease(self, version: Optional[ModelVersion] = None) -> Iterator[ModelVersion]:
+        with self._lock:
+            version = version or self._active
+            version.in_flight += 1
+        try:
+            yield version
+        finally:
+            with self._lock:
+                version.in_flight -= 1
+                if version.in_flight == 0 and version in self._draining:
+                    self._draining.remove(version)  # Last request on a retired version is done.
+
+    def run(self, kind: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Calls fn(version, *args, **kwargs) on the active version, maybe shadowed by the candidate."""
+        return self.run_versioned(kind, fn, *args, **kwargs)[0]
+
+    def run_versioned(self, kind: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, ModelVersion]:
+        """run(), plus the version that produced the result (the active one may change right after)."""
+        with self.lease() as version:
+            result = self._timed(kind, "active", version, fn, args, kwargs)
+
+        with self._lock:
+            candidate = self._candidate
+            shadow = (
+                candidate is not None
+                and candidate is not version
+                and random.random() * 100.0 < self._candidate_percent
+                and self._shadow_backlog < 8
+            )
+            if shadow:
+                self._shadow_backlog += 1
+        if shadow:
+            self._shadow_pool.submit(self._shadow, kind, candidate, fn, args, kwargs, result)
+        return result, version
+
+    def _timed(self, kind: str, role: str, version: ModelVersion, fn: Callable[..., Any], args: Tuple, kwargs: Dict) -> Any:
+        stats = self._stats(kind, role, version.name)
+        started = time.perf_counter()
+        try:
+            return fn(version, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                stats.errors += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with self._lock:
+                stats.calls += 1
+                stats.recent_ms.append(elapsed_ms)
+
+    def _shadow(self, kind: str, candidate: ModelVersion, fn: Callable[..., Any], args: Tuple, kwargs: Dict, expected: Any) -> None:
+        try:
+            with self.lease(candidate):
+                result = self._timed(kind, "shadow", candidate, fn, args, kwargs)
+            if not _same_result(result, expected):
+                with self._lock:
+                    self._stats(kind, "shadow", candidate.name).mismatches += 1
+        except Exception:
+            pass  # Counted in _timed; a broken candidate must never affect live traffic.
+        finally:
+            with self._lock:
+                self._shadow_backlog -= 1
+
+    def _stats(self, kind: str, role: str, name: str) -> _Latency:
+        key = (kind, role, name)
+        with self._lock:
+            stats = self._latency.get(key)
+            if stats is None:
+                stats = self._latency[key] = _Latency()
+            return stats
+
+    # --- Rollout ---
+
+    def activate(self, name: str, *, wait: bool = False) -> None:
+        """Warms `name` in a background thread and then makes it the active version."""
+        self._root(name)  # Fail fast on unknown names.
+        thread = threading.Thread(target=self._warm_and_swap, args=(name,), name=f"model-warm-{name}", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+
+    def set_candidate(self, name: Optional[str], percent: float = 0.0, *, wait: bool = False) -> None:
+        """Shadows `percent` % of calls with version `name` (None clears the candidate)."""
+        if name is None:
+            with self._lock:
+                self._candidate = None
+                self._candidate_percent = 0.0
+            return
+        self._root(name)
+        percent = min(100.0, max(0.0, float(percent)))
+
+        def warm() -> None:
+            with self._lock:
+                self._warming[name] = "warming"
+            try:
+                version = self._load(name)
+                errors = version.warm()
+            except Exception as e:
+                with self._lock:
+                    self._warming[name] = f"failed: {e}"
+                return
+            with self._lock:
+                self._warming.pop(name, None)
+                self._candidate = version
+                self._candidate_percent = percent
+                self._last_swap = {"candidate": name, "errors": errors, "at": time.time()}
+
+        thread = threading.Thread(target=warm, name=f"model-candidate-{name}", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+
+    def _warm_and_swap(self, name: str) -> None:
+        with self._lock:
+            self._warming[name] = "warming"
+        started = time.time()
+        try:
+            version = self._load(name)
+            errors = version.warm()
+            if all(errors.values()):
+                raise RuntimeError(f"Version '{name}' could not serve any model: {errors}")
+        except Exception as e:
+            with self._lock:
+                self._warming[name] = f"failed: {e}"
+            return
+
+        with self._lock:
+            self._warming.pop(name, None)
+            old, self._active = self._active, version
+            if old.in_flight:
+                self._draining.append(old)
+            if self._candidate is not None and self._candidate.name == name:
+                self._candidate = None
+                self._candidate_percent = 0.0
+            self._last_swap = {"from": old.name, "to": name, "errors": errors, "startedAt": started, "swappedAt": time.time()}
+
+        for listener in self._swap_listeners:
+            listener(version)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "available": self.versions(),
+                "active": self._active.describe(),
+                "draining": [v.describe() for v in self._draining],
+                "candidate": (
+                    {**self._candidate.describe(), "percent": self._candidate_percent}
+                    if self._candidate is not None
+                    else None
+                ),
+                "warming": dict(self._warming),
+                "lastSwap": self._last_swap,
+                "latency": [
+                    {"kind": kind, "role": role, "version": name, **stats.as_dict()}
+                    for (kind, role, name), stats in sorted(self._latency.items())
+                ],
+            }
+
+
+registry = ModelRegistry()
+
+
+def _forecast_with(version: ModelVersion, **kwargs: Any) -> ForecastSeries:
+    return forecast_series(models=version.price_demand(), **kwargs)
+
+
+def forecast_active(**kwargs: Any) -> ForecastSeries:
+    """forecast_series() on the active version's in-memory price/demand models."""
+    return registry.run("forecast", _forecast_with, **kwargs)
+
+
+def forecast_background(**kwargs: Any) -> ForecastSeries:
+    """forecast_active() for background work: leased, but kept out of the latency stats and shadow runs."""
+    with registry.lease() as version:
+        return _forecast_with(version, **kwargs)
+
+
+def _bands_with(version: ModelVersion, **kwargs: Any) -> ForecastBands:
+    return forecast_bands(models=version.price_demand(), **kwargs)
+
+
+def forecast_bands_active(**kwargs: Any) -> ForecastBands:
+    """forecast_bands() on the active version's in-memory price/demand models."""
+    return registry.run("forecast_bands", _bands_with, **kwargs)
@@ -1,12 +1,41 @@
 from __future__ import annotations
 
 import json
+import os
 import time
-from typing import Dict, Iterator, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import serial
 from serial.serialutil import SerialException
 
+from app.serial_manager import RESET_DELAY_SECONDS, SerialConnectionManager, SerialSnapshot, get_manager
+from app.serial_parser import SerialLineParser
+
+NPK_PORT = os.environ.get("NPK_PORT", "COM7")
+# "text": microcontroller prints "Nitrogen: 42" lines; "modbus": poll the probes directly (app.modbus_npk).
+NPK_MODE = os.environ.get("NPK_MODE", "text").strip().lower()
+NPK_BAUDRATE = int(os.environ.get("NPK_BAUDRATE", "115200"))
+# Ports the HTTP routes may open a reader on: NPK_PORT plus NPK_EXTRA_PORTS (comma-separated).
+# Readers live until shutdown, so arbitrary client-supplied names are refused.
+NPK_ALLOWED_PORTS = frozenset(
+    [NPK_PORT] + [p.strip() for p in os.environ.get("NPK_EXTRA_PORTS", "").split(",") if p.strip()]
+)
+
+# Cached samples older than this are not used for forecasts.
+NPK_MAX_AGE_SECONDS = float(os.environ.get("NPK_MAX_AGE_SECONDS", "30"))
+# Bounded wait for a fresh sample when the cache is stale or empty.
+NPK_FALLBACK_WAIT_SECONDS = float(os.environ.get("NPK_FALLBACK_WAIT_SECONDS", "1.5"))
+# Quality thresholds: sensor range in mg/kg and the longest plausible spread of one N/P/K frame.
+NPK_MAX_VALUE = float(os.environ.get("NPK_MAX_VALUE", "1999"))
+NPK_MAX_SPREAD_SECONDS = float(os.environ.get("NPK_MAX_SPREAD_SECONDS", "5"))
+
+NPK_KEYS = {
+    "Nitrogen": "nitrogenN",
+    "Phosphorus": "phosphorusP",
+    "Potassium": "potassiumK",
+}
+NPK_FIELDS = frozenset(NPK_KEYS.values())
+
 
 def read_npk_once(
     port: str = "COM7",
@@ -21,11 +50,9 @@ def read_npk_once(
     "Nitrogen: 42".
     """
 
-    required = {
-        "Nitrogen": "nitrogenN",
-        "Phosphorus": "phosphorusP",
-        "Potassium": "potassiumK",
-    }
+    required = NPK_KEYS
+    wanted = NPK_FIELDS
+    parser = SerialLineParser()
 
     values: Dict[str, float] = {}
 
@@ -33,7 +60,7 @@ def read_npk_once(
         ser = serial.Serial(port, baudrate, timeout=timeout)
     except SerialException as e:
         raise RuntimeError(f"Cannot open serial port {port} @ {baudrate}: {e}") from e
-    time.sleep(2)
+    time.sleep(RESET_DELAY_SECONDS)
 
     try:
         started = time.time()
@@ -42,20 +69,17 @@ def read_npk_once(
                 if (time.time() - started) >= max_wait_seconds:
                     raise TimeoutError(
                         "Timed out waiting for full NPK reading from serial. "
-                        f"Have: {values}. Expected keys: {list(required.values())}"
+                        f"Have: {values}. Expected keys: {list(required.values())}. "
+                        f"Malformed lines: {parser.malformed}"
                     )
 
             raw = ser.readline()
             if not raw:
                 continue
 
-            line = raw.decode(errors="ignore").strip()
-            for key, out_key in required.items():
-                if key in line and ":" in line:
-                    try:
-                        values[out_key] = float(line.split(":", 1)[1].strip())
-                    except Exception:
-                        pass
+            parsed = parser.parse(raw)
+            if parsed is not None and parsed[0] in wanted:
+                values[parsed[0]] = parsed[1]
 
             if len(values) == len(required):
                 return values
@@ -66,155 +90,234 @@ def read_npk_once(
             pass
 
 
-def stream_npk(
+def npk_hub(port: str = "COM7", baudrate: int = 115200, timeout: float = 1.0) -> SerialConnectionManager:
+    """Returns the shared reader for an NPK port (see app.serial_manager).
+
+    Raises RuntimeError for a port outside NPK_ALLOWED_PORTS.
+    """
+    if port not in NPK_ALLOWED_PORTS:
+        raise RuntimeError(f"Serial port {port} is not an NPK port (allowed: {', '.join(sorted(NPK_ALLOWED_PORTS))})")
+    if NPK_MODE == "modbus":
+        from app.modbus_npk import ModbusNpkPoller, sensors_from_env
+
+        return get_manager(
+            port,
+            baudrate,
+            SerialLineParser(),
+            NPK_KEYS.values(),
+            manager_cls=ModbusNpkPoller,
+            sensors=sensors_from_env(),
+            poll_interval=float(os.environ.get("NPK_MODBUS_POLL_INTERVAL", "1.0")),
+            response_timeout=float(os.environ.get("NPK_MODBUS_TIMEOUT", "0.5")),
+        )
+    return get_manager(port, baudrate, SerialLineParser(), NPK_KEYS.values(), timeout=timeout)
+
+
+def npk_quality(snap: SerialSnapshot) -> Dict[str, bool]:
+    values = list(snap.values.values())
+    spread = snap.timestamp - snap.started_at if snap.started_at is not None else 0.0
+    return {
+        "complete": len(values) == len(NPK_KEYS),
+        "inRange": all(0.0 <= v <= NPK_MAX_VALUE for v in values),
+        "nonZero": any(v != 0.0 for v in values),
+        "coherent": spread <= NPK_MAX_SPREAD_SECONDS,
+    }
+
+
+def npk_usable(snap: SerialSnapshot) -> bool:
+    """True when every quality flag holds; other snapshots never reach a forecast."""
+    return all(npk_quality(snap).values())
+
+
+def sample_npk(
+    port: str = NPK_PORT,
+    baudrate: int = NPK_BAUDRATE,
+    *,
+    max_age: float = NPK_MAX_AGE_SECONDS,
+    wait: float = NPK_FALLBACK_WAIT_SECONDS,
+) -> Dict[str, Any]:
+    """Returns the most recent complete N/P/K triple that passes the quality checks.
+
+    The cached sample is used when younger than max_age and usable (see
+    npk_quality); otherwise this waits at most `wait` seconds for the sampler
+    to deliver one that is (TimeoutError if not).
+    """
+
+    hub = npk_hub(port, baudrate)
+    snap = hub.latest(max_age=max_age, accept=npk_usable)
+    cached = snap is not None
+    if snap is None:
+        snap = hub.wait_for_reading(max_age=max_age, timeout=wait, accept=npk_usable)
+
+    return {
+        "reading": dict(snap.values),
+        "timestamp": snap.timestamp,
+        "ageSeconds": round(snap.age(), 3),
+        "quality": npk_quality(snap),
+        "cached": cached,
+    }
+
+
+def _sse(event: Optional[str], data: Dict[str, Any]) -> str:
+    if event:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def _status_event(status: Dict[str, Any]) -> str:
+    if status.get("connected"):
+        return _sse("ready", {"status": "connected", "port": status["port"], "baudrate": status["baudrate"]})
+    return _sse("error", {"error": status.get("error") or "disconnected", "port": status["port"], "baudrate": status["baudrate"]})
+
+
+async def stream_npk(
     port: str = "COM7",
     baudrate: int = 115200,
     timeout: float = 1.0,
     interval: float = 0.25,
     heartbeat_interval: float = 1.0,
-) -> Iterator[str]:
-    """Continuously reads NPK values from serial and yields SSE events.
+    queue_size: int = 64,
+) -> AsyncIterator[str]:
+    """Continuously yields NPK readings from the port's shared reader as SSE events.
 
-    Emits one event each time a full set of N/P/K values is observed.
+    Emits one event per full set of N/P/K values, at most once per interval. The
+    generator awaits data arrival on the event loop, so an idle client holds no
+    thread and a disconnect cancels it at the pending await.
     """
 
-    required = {
-        "Nitrogen": "nitrogenN",
-        "Phosphorus": "phosphorusP",
-        "Potassium": "potassiumK",
-    }
-
-    values: Dict[str, float] = {}
-    last_emit_at: Optional[float] = None
-    last_heartbeat_at: Optional[float] = None
-
-    ser = None
     try:
-        try:
-            ser = serial.Serial(port, baudrate, timeout=timeout)
-        except SerialException as e:
-            yield f"event: error\ndata: {json.dumps({'error': str(e), 'port': port, 'baudrate': baudrate})}\n\n"
-            return
+        hub = npk_hub(port, baudrate, timeout)
+    except RuntimeError as e:
+        yield _sse("error", {"error": str(e), "port": port, "baudrate": baudrate})
+        return
 
-        time.sleep(2)
+    wait = heartbeat_interval if heartbeat_interval and heartbeat_interval > 0 else None
+    last_emit_at: Optional[float] = None
 
-        yield f"event: ready\ndata: {json.dumps({'status': 'connected', 'port': port, 'baudrate': baudrate})}\n\n"
-        last_heartbeat_at = time.time()
+    with hub.subscribe(maxsize=queue_size, kinds=("reading", "status")) as sub:
+        if hub.status()["connected"]:
+            yield _sse("ready", {"status": "connected", "port": port, "baudrate": baudrate})
 
         while True:
-            raw = ser.readline() if ser else b""
-            if raw:
-                line = raw.decode(errors="ignore").strip()
-                for key, out_key in required.items():
-                    if key in line and ":" in line:
-                        try:
-                            values[out_key] = float(line.split(":", 1)[1].strip())
-                        except Exception:
-                            pass
-
+            event = await sub.aget(timeout=wait)
             now = time.time()
-            if (
-                heartbeat_interval is not None
-                and heartbeat_interval > 0
-                and (last_heartbeat_at is None or (now - last_heartbeat_at) >= heartbeat_interval)
-            ):
-                yield f"event: heartbeat\ndata: {json.dumps({'status': 'waiting', 'port': port, 'baudrate': baudrate, 'partial': dict(values), 'timestamp': now})}\n\n"
-                last_heartbeat_at = now
+            if event is None:
+                yield _sse("heartbeat", {"status": "waiting", "port": port, "baudrate": baudrate, "partial": hub.partial(), "timestamp": now})
+                continue
 
-            if len(values) == len(required):
-                if last_emit_at is None or (now - last_emit_at) >= interval:
-                    payload = {"reading": dict(values), "timestamp": now, "port": port, "baudrate": baudrate}
-                    yield f"data: {json.dumps(payload)}\n\n"
-                    last_emit_at = now
-                    values = {}
-
-            time.sleep(interval)
-    except Exception as e:
-        yield f"event: error\ndata: {json.dumps({'error': str(e), 'port': port, 'baudrate': baudrate})}\n\n"
-        return
-    finally:
-        try:
-            if ser is not None:
-                ser.close()
-        except Exception:
-            pass
+            if event["type"] == "status":
+                yield _status_event(event)
+                continue
+
+            if last_emit_at is None or (now - last_emit_at) >= interval:
+                yield _sse(None, {"reading": event["values"], "timestamp": event["timestamp"], "port": port, "baudrate": baudrate})
+                last_emit_at = now
 
 
-def stream_serial_raw(
+async def stream_serial_raw(
     port: str = "COM7",
     baudrate: int = 115200,
     timeout: float = 1.0,
     interval: float = 0.1,
     heartbeat_interval: float = 1.0,
-) -> Iterator[str]:
-    """Continuously streams raw serial lines as SSE events.
+    queue_size: int = 1024,
+    *,
+    batch: bool = False,
+    include_hex: bool = True,
+    max_batch: int = 256,
+) -> AsyncIterator[str]:
+    """Continuously streams raw serial lines from the port's shared reader as SSE events.
 
     Mirrors the user's SerialMonitor output style: timestamp + raw bytes + decoded text.
+    By default each line is one SSE message. With batch=True, everything queued is
+    drained into one "batch" event holding an array of lines, flushed once it has
+    max_batch lines or its first line is `interval` seconds old.
     """
 
-    required = {
-        "Nitrogen": "nitrogenN",
-        "Phosphorus": "phosphorusP",
-        "Potassium": "potassiumK",
-    }
+    try:
+        hub = npk_hub(port, baudrate, timeout)
+    except RuntimeError as e:
+        yield _sse("error", {"error": str(e), "port": port, "baudrate": baudrate})
+        return
 
+    wait = heartbeat_interval if heartbeat_interval and heartbeat_interval > 0 else None
     last_npk: Dict[str, float] = {}
 
-    ser = None
-    try:
-        try:
-            ser = serial.Serial(port, baudrate, timeout=timeout)
-        except SerialException as e:
-            yield f"event: error\ndata: {json.dumps({'error': str(e), 'port': port, 'baudrate': baudrate})}\n\n"
-            return
+    with hub.subscribe(maxsize=queue_size, kinds=("line", "reading", "status")) as sub:
+        if hub.status()["connected"]:
+            yield _sse("ready", {"status": "connected", "port": port, "baudrate": baudrate})
 
-        time.sleep(2)
+        while True:
+            event = await sub.aget(timeout=wait)
+            if event is None:
+                yield _sse("heartbeat", {"status": "waiting", "port": port, "baudrate": baudrate, "timestamp": time.time()})
+                continue
 
-        yield f"event: ready\ndata: {json.dumps({'status': 'connected', 'port': port, 'baudrate': baudrate})}\n\n"
-        last_heartbeat_at: Optional[float] = time.time()
+            if not batch:
+                line = _consume_event(event, last_npk)
+                if isinstance(line, str):
+                    yield line
+                elif line is not None:
+                    yield _sse(None, {
+                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(line["t"])),
+                        "port": port,
+                        "baudrate": baudrate,
+                        "npk": dict(last_npk) if last_npk else None,
+                        "rawHex": line["rawHex"],
+                        "decoded": line["decoded"],
+                    })
+                continue
 
-        while True:
-            raw = ser.readline() if ser else b""
-            if raw:
-                try:
-                    decoded = raw.decode("utf-8").strip()
-                except UnicodeDecodeError:
-                    decoded = raw.decode(errors="ignore").strip()
-
-                # Best-effort NPK extraction from decoded text.
-                for key, out_key in required.items():
-                    if key in decoded and ":" in decoded:
-                        try:
-                            last_npk[out_key] = float(decoded.split(":", 1)[1].strip())
-                        except Exception:
-                            pass
-
-                payload = {
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            lines: List[Dict[str, Any]] = []
+            pending = [event]
+            deadline = time.time() + max(0.0, interval)
+            while True:
+                for ev in pending:
+                    line = _consume_event(ev, last_npk, include_hex=include_hex)
+                    if isinstance(line, str):
+                        yield line  # status changes are not delayed by batching
+                    elif line is not None:
+                        lines.append(line)
+                remaining = deadline - time.time()
+                if len(lines) >= max_batch or remaining <= 0:
+                    break
+                pending = sub.drain(max_batch - len(lines))
+                if not pending:
+                    nxt = await sub.aget(timeout=remaining)
+                    pending = [nxt] if nxt is not None else []
+                    if not pending:
+                        break
+
+            if lines:
+                yield _sse("batch", {
                     "port": port,
                     "baudrate": baudrate,
                     "npk": dict(last_npk) if last_npk else None,
-                    "rawHex": raw.hex(),
-                    "decoded": decoded,
-                }
-                yield f"data: {json.dumps(payload)}\n\n"
+                    "lines": lines,
+                })
 
-            now = time.time()
-            if (
-                heartbeat_interval is not None
-                and heartbeat_interval > 0
-                and (last_heartbeat_at is None or (now - last_heartbeat_at) >= heartbeat_interval)
-            ):
-                yield f"event: heartbeat\ndata: {json.dumps({'status': 'waiting', 'port': port, 'baudrate': baudrate, 'timestamp': now})}\n\n"
-                last_heartbeat_at = now
-
-            time.sleep(interval)
-    except Exception as e:
-        yield f"event: error\ndata: {json.dumps({'error': str(e), 'port': port, 'baudrate': baudrate})}\n\n"
-        return
-    finally:
-        try:
-            if ser is not None:
-                ser.close()
-        except Exception:
-            pass
+
+def _consume_event(
+    event: Dict[str, Any],
+    last_npk: Dict[str, float],
+    *,
+    include_hex: bool = True,
+) -> Any:
+    """Folds a hub event into last_npk; returns a line dict, an SSE status string, or None."""
+    kind = event["type"]
+    if kind == "status":
+        return _status_event(event)
+    if kind == "reading":
+        # Readings decoded by the hub itself (e.g. Modbus register values).
+        last_npk.update(event["values"])
+        return None
+
+    # Best-effort NPK extraction, already parsed by the hub.
+    parsed = event["parsed"]
+    if parsed is not None and parsed[0] in NPK_FIELDS:
+        last_npk[parsed[0]] = parsed[1]
+    raw = event["raw"]
+    line = {"t": event["timestamp"], "decoded": event.get("line") or raw.decode(errors="ignore").strip()}
+    if include_hex:
+        line["rawHex"] = raw.hex()
+    return line
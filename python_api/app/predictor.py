@@ -1,8 +1,35 @@
+import time
+
+import numpy as np
 import pandas as pd
-from app.model_loader import clf, reg, scaler, encoders, feature_names, df_master
+from app.model_loader import master_data
+from app.model_registry import registry
+from app.recommendation_history import recommendation_history
+
+
+def predict_top3(sensor_data, growth_stage, purpose, source="api"):
+    """Top-3 fertilizers for the active model version (see app.model_registry).
+
+    Every result is queued to the recommendation history with its inputs and latency.
+    """
+    started = time.perf_counter()
+    results, version = registry.run_versioned("recommendation", predict_top3_with, sensor_data, growth_stage, purpose)
+    recommendation_history.record(
+        source,
+        sensor_data,
+        growth_stage,
+        purpose,
+        results,
+        (time.perf_counter() - started) * 1000.0,
+        version.name,
+    )
+    return results
 
-def predict_top3(sensor_data, growth_stage, purpose):
-    if clf is None or reg is None or scaler is None or encoders is None or feature_names is None or df_master is None:
+
+def predict_top3_with(models, sensor_data, growth_stage, purpose):
+    clf, reg, scaler = models.clf, models.reg, models.scaler
+    encoders, feature_names = models.encoders, models.feature_names
+    if clf is None or reg is None or scaler is None or encoders is None or feature_names is None or master_data is None:
         raise RuntimeError(
             "Fertilizer/yield artifacts are not available. "
             "Ensure models exist under python_api/models/fertilizer_models and python_api/models/yield_models."
@@ -26,9 +53,9 @@ def predict_top3(sensor_data, growth_stage, purpose):
     for rank, fert_id in enumerate(top3, start=1):
         fert_name = encoders["Recommended_Fertilizer"].inverse_transform([fert_id])[0]
 
-        row_match = df_master[df_master["Recommended_Fertilizer"] == fert_name].iloc[0]
-        quantity = row_match["Quantity_kg_per_acre"]
-        note = row_match["Sustainability_Note"]
+        info = master_data.fertilizer(fert_name)
+        quantity = info.quantity
+        note = info.note
 
         row = base.copy()
         row["Quantity_kg_per_acre"] = quantity
@@ -49,3 +76,66 @@ def predict_top3(sensor_data, growth_stage, purpose):
         })
 
     return results
+
+
+def yield_response_curves(sensor_data, growth_stage, purpose, fertilizers=None, quantities=None):
+    """Yield vs. quantity for every fertilizer, on the active model version."""
+    return registry.run("yield_curve", yield_response_curves_with, sensor_data, growth_stage, purpose, fertilizers, quantities)
+
+
+def default_quantities(steps=25):
+    """`steps` quantities spanning the range seen in the master data."""
+    q = master_data.frame["Quantity_kg_per_acre"]
+    return np.round(np.linspace(float(q.min()), float(q.max()), steps), 2)
+
+
+def yield_response_curves_with(models, sensor_data, growth_stage, purpose, fertilizers=None, quantities=None):
+    """Predicts the whole fertilizer x quantity grid with one scaler.transform and one reg.predict.
+
+    Returns {"quantities", "curves": [{"fertilizer", "yield": [...]}], "yieldComparison"}, where
+    yieldComparison holds each fertilizer's best quantity, best first.
+    """
+    reg, scaler, encoders, feature_names = models.reg, models.scaler, models.encoders, models.feature_names
+    if reg is None or scaler is None or encoders is None or feature_names is None or master_data is None:
+        raise RuntimeError(
+            "Yield artifacts are not available. "
+            "Ensure models exist under python_api/models/fertilizer_models and python_api/models/yield_models."
+        )
+
+    fert_encoder = encoders["Recommended_Fertilizer"]
+    # The grid grows with every name, so a repeated one is only predicted once.
+    fertilizers = list(dict.fromkeys(fertilizers)) if fertilizers else list(fert_encoder.classes_)
+    fert_ids = fert_encoder.transform(fertilizers)
+    quantities = np.asarray(quantities if quantities is not None else default_quantities(), dtype=np.float64)
+    n_fert, n_qty = len(fert_ids), len(quantities)
+
+    # Row i * n_qty + j is fertilizer i at quantity j.
+    columns = {
+        "Soil_Temperature (°C)": np.full(n_fert * n_qty, sensor_data["soil_temp"], dtype=np.float64),
+        "Soil_Moisture (%)": np.full(n_fert * n_qty, sensor_data["soil_moisture"], dtype=np.float64),
+        "Air_Temperature (°C)": np.full(n_fert * n_qty, sensor_data["air_temp"], dtype=np.float64),
+        "Air_Humidity (%)": np.full(n_fert * n_qty, sensor_data["air_humidity"], dtype=np.float64),
+        "Paddy_Growth_Stage": np.full(n_fert * n_qty, encoders["Paddy_Growth_Stage"].transform([growth_stage])[0]),
+        "Purpose": np.full(n_fert * n_qty, encoders["Purpose"].transform([purpose])[0]),
+        "Recommended_Fertilizer": np.repeat(fert_ids, n_qty),
+        "Quantity_kg_per_acre": np.tile(quantities, n_fert),
+    }
+    X = pd.DataFrame(columns)[feature_names]
+    yields = np.asarray(reg.predict(scaler.transform(X)), dtype=np.float64).reshape(n_fert, n_qty)
+    best = yields.argmax(axis=1)
+
+    curves = [
+        {"fertilizer": name, "yield": np.round(yields[i], 3).tolist()}
+        for i, name in enumerate(fertilizers)
+    ]
+    comparison = [
+        {
+            "fertilizer": name,
+            "quantity": float(quantities[best[i]]),
+            "yield": round(float(yields[i, best[i]]), 3),
+            "datasetQuantity": master_data.fertilizer(name).quantity if name in master_data.fertilizers else None,
+        }
+        for i, name in enumerate(fertilizers)
+    ]
+    comparison.sort(key=lambda row: row["yield"], reverse=True)
+    return {"quantities": quantities.tolist(), "curves": curves, "yieldComparison": comparison}
@@ -0,0 +1,298 @@
+"""The recent end of the price/demand history, kept preprocessed, and append-only ingestion of new days.
+
+A forecast only reads the last few weeks of history: the LSTM seed is the
+last window_size rows and the XGB features reach back 21 rows. So the
+cleaned, forward-filled last `tail_rows` rows are held in memory and their
+scaled frames with rolling/momentum features are cached per scaler set and
+region. Rows appended to the CSV (by ingest() or by anyone else) are the only
+bytes parsed; the tail is extended and its cached frames rebuilt from it, so
+both a forecast and an ingest cost the same whatever the length of the file.
+A file rewritten in place, or an append dated before the history's last day,
+reloads everything.
+
+CLI, from python_api/:  python -m app.price_demand_history new_rows.csv [--dataset PATH] [--artifacts DIR]
+(POST /api/forecasting/ingest does the same, but only when INGEST_TOKEN is set.)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.csv_tail import AppendOnlyCsv
+from app.pricedemand_service import (
+    _DEMAND_HISTORY,
+    REGIONS,
+    PriceDemandArtifacts,
+    PriceDemandModels,
+    _featured_history,
+    _require_dataset,
+    clean_price_demand_rows,
+    default_artifacts,
+    price_demand_dataset_path,
+)
+
+# Leaves ~100 featured rows after the 21-row rolling warm-up is dropped.
+TAIL_ROWS = int(os.environ.get("PRICEDEMAND_TAIL_ROWS", "128"))
+MAX_ERRORS = 10  # Validation problems listed per rejected batch.
+_CACHED_SCALER_SETS = 4
+
+
+@dataclass(frozen=True)
+class IngestResult:
+    rows: int
+    first_date: str
+    last_date: str
+    appended: bytes  # Exactly what was written to the CSV.
+    seconds: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "firstDate": self.first_date,
+            "lastDate": self.last_date,
+            "bytes": len(self.appended),
+            "ms": round(self.seconds * 1000, 3),
+        }
+
+
+class PriceDemandHistory:
+    def __init__(self, path: Optional[str] = None, *, tail_rows: int = TAIL_ROWS) -> None:
+        self._path = path  # None: price_demand_dataset_path() at the time of use.
+        self.tail_rows = tail_rows
+        self._reader: Optional[AppendOnlyCsv] = None
+        self._raw: Optional[pd.DataFrame] = None  # Cleaned and forward-filled last tail_rows rows.
+        self._total_rows = 0
+        # (id(scalers), id(label_encoders)) -> (scalers, label_encoders, {region: (df_mm, df_std)});
+        # the objects are held so their ids can't be reused while cached.
+        self._frames: "OrderedDict[Tuple[int, int], Tuple[Any, Any, Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._loads = 0
+        self._appends = 0
+        self._ingested_rows = 0
+        self._frame_builds = 0
+        self._last_ingest: Optional[Dict[str, Any]] = None
+
+    @property
+    def path(self) -> str:
+        return self._path or price_demand_dataset_path()
+
+    # --- Reading ---
+
+    def frames(self, models: PriceDemandModels, region: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(df_mm, df_std) of the tail with the last row set to region; the caller owns the copies."""
+        with self._lock:
+            self._sync()
+            key = (id(models.scalers), id(models.label_encoders))
+            entry = self._frames.get(key)
+            if entry is None:
+                entry = self._frames[key] = (models.scalers, models.label_encoders, {})
+                while len(self._frames) > _CACHED_SCALER_SETS:
+                    self._frames.popitem(last=False)
+            self._frames.move_to_end(key)
+            by_region = entry[2]
+            if region not in by_region:
+                by_region[region] = self._build(models, region)
+                self._frame_builds += 1
+            df_mm, df_std = by_region[region]
+        return df_mm.copy(), df_std.copy()
+
+    def _build(self, models: PriceDemandModels, region: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        df_mm, df_std = _featured_history(self._raw, region, models)
+        needed = models.window_size + _DEMAND_HISTORY
+        if self._total_rows > len(self._raw) and min(len(df_mm), len(df_std)) < needed:
+            raise RuntimeError(
+                f"tail_rows={self.tail_rows} leaves {min(len(df_mm), len(df_std))} featured rows; "
+                f"window_size={models.window_size} needs {needed}. Raise PRICEDEMAND_TAIL_ROWS."
+            )
+        return df_mm, df_std
+
+    def _sync(self) -> None:
+        path = self.path
+        if self._reader is None or self._reader.path != path:
+            self._reader = AppendOnlyCsv(path)
+            self._raw = None
+        if self._raw is not None and not self._reader.changed():
+            return
+
+        _require_dataset(path)
+        reset, rows = self._reader.read()
+        if reset:
+            if rows is None:
+                _require_dataset(path)  # Deleted between the check and the read.
+            cleaned = clean_price_demand_rows(rows)
+            self._total_rows = len(cleaned)
+            self._raw = cleaned.ffill().tail(self.tail_rows).reset_index(drop=True)
+            self._loads += 1
+        elif rows is not None:
+            cleaned = clean_price_demand_rows(rows)
+            if cleaned.empty:
+                return
+            if len(self._raw) and cleaned["Date"].iloc[0] < self._raw["Date"].iloc[-1]:
+                # Dated inside the history: the full sort would reorder old rows, so start over.
+                self._reader = AppendOnlyCsv(path)
+                self._raw = None
+                self._sync()
+                return
+            # ffill over the old tail continues exactly where a full-file ffill would be.
+            merged = pd.concat([self._raw, cleaned], ignore_index=True).ffill()
+            self._raw = merged.tail(self.tail_rows).reset_index(drop=True)
+            self._total_rows += len(cleaned)
+            self._appends += 1
+        else:
+            return
+        self._frames.clear()
+
+    # --- Ingestion ---
+
+    def ingest(
+        self,
+        rows: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+        *,
+        artifacts: Optional[PriceDemandArtifacts] = None,
+    ) -> IngestResult:
+        """Validates new daily rows and appends them to the CSV; nothing is written if any row is invalid.
+
+        Rows need every column of the file, an ISO Date no earlier than the
+        last day already there, one of the trained regions, finite numbers,
+        categorical values the label encoders of `artifacts` know, and no
+        (Date, Region) that already exists.
+        """
+        t0 = time.perf_counter()
+        label_encoders = joblib.load((artifacts or default_artifacts()).label_encoders_path) or {}
+        with self._lock:
+            self._sync()
+            batch = self._validate(rows, label_encoders)
+            data = batch.to_csv(header=False, index=False, lineterminator="\n").encode("utf-8")
+            with open(self._reader.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+            with open(self._reader.path, "ab") as f:
+                f.write(data)
+            self._sync()
+            self._ingested_rows += len(batch)
+            result = IngestResult(
+                rows=len(batch),
+                first_date=str(batch["Date"].iloc[0]),
+                last_date=str(batch["Date"].iloc[-1]),
+                appended=data,
+                seconds=time.perf_counter() - t0,
+            )
+            self._last_ingest = {**result.as_dict(), "at": time.time()}
+        return result
+
+    def _validate(self, rows: Union[pd.DataFrame, Iterable[Dict[str, Any]]], label_encoders: Dict[str, Any]) -> pd.DataFrame:
+        frame = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        if frame.empty:
+            raise ValueError("No rows to ingest")
+
+        columns = list(self._reader.columns or [])
+        missing = [c for c in columns if c not in frame.columns]
+        unknown = [c for c in frame.columns if c not in columns]
+        if missing or unknown:
+            raise ValueError(
+                "Rows must have exactly the dataset columns"
+                + (f"; missing: {', '.join(missing)}" if missing else "")
+                + (f"; unknown: {', '.join(map(str, unknown))}" if unknown else "")
+            )
+        frame = frame[columns].reset_index(drop=True)
+
+        errors: List[str] = []
+        dates = pd.to_datetime(frame["Date"].astype(str), format="%Y-%m-%d", errors="coerce")
+        for i in np.flatnonzero(dates.isna().to_numpy()):
+            errors.append(f"row {i}: Date '{frame.at[i, 'Date']}' is not YYYY-MM-DD")
+        if "Region" in frame.columns:
+            for i in np.flatnonzero(~frame["Region"].isin(REGIONS).to_numpy()):
+                errors.append(f"row {i}: Region '{frame.at[i, 'Region']}' is not one of {', '.join(REGIONS)}")
+
+        numeric = [c for c in columns if c not in ("Date", "Region")]
+        values = frame[numeric].apply(pd.to_numeric, errors="coerce")
+        for col in numeric:
+            for i in np.flatnonzero(~np.isfinite(values[col].to_numpy(dtype=np.float64))):
+                errors.append(f"row {i}: {col} '{frame.at[i, col]}' is not a finite number")
+        for col, encoder in label_encoders.items():
+            if col == "Region" or col not in values.columns:
+                continue
+            # preprocess() encodes the parsed float's str(), so that is what must be a known class.
+            known = set(map(str, getattr(encoder, "classes_", [])))
+            for i, v in enumerate(values[col].tolist()):
+                if math.isfinite(v) and str(v) not in known:
+                    errors.append(f"row {i}: {col} '{v}' was not seen in training")
+
+        last = self._raw["Date"].iloc[-1] if self._raw is not None and len(self._raw) else None
+        if last is not None:
+            for i in np.flatnonzero((dates < last).to_numpy()):
+                errors.append(f"row {i}: Date {dates[i].date()} is before the last day in the history ({last.date()})")
+        if "Region" in frame.columns:
+            seen = set()
+            if last is not None:
+                on_last = self._raw[self._raw["Date"] == last]
+                seen = {(last, r) for r in on_last["Region"].astype(str)}
+            for i, (d, r) in enumerate(zip(dates, frame["Region"].astype(str))):
+                if pd.isna(d):
+                    continue
+                if (d, r) in seen:
+                    errors.append(f"row {i}: {d.date()} / {r} already exists")
+                seen.add((d, r))
+
+        if errors:
+            more = f" (+{len(errors) - MAX_ERRORS} more)" if len(errors) > MAX_ERRORS else ""
+            raise ValueError("; ".join(errors[:MAX_ERRORS]) + more)
+
+        batch = values.assign(Date=dates.dt.strftime("%Y-%m-%d"))
+        if "Region" in frame.columns:
+            batch["Region"] = frame["Region"].astype(str)
+        return batch[columns].sort_values("Date", kind="stable").reset_index(drop=True)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            raw = self._raw
+            return {
+                "path": self.path,
+                "rows": self._total_rows,
+                "tailRows": 0 if raw is None else len(raw),
+                "lastDate": None if raw is None or not len(raw) else raw["Date"].iloc[-1].date().isoformat(),
+                "loads": self._loads,
+                "appends": self._appends,
+                "ingestedRows": self._ingested_rows,
+                "frameBuilds": self._frame_builds,
+                "cachedFrames": sum(len(entry[2]) for entry in self._frames.values()),
+                "lastIngest": self._last_ingest,
+            }
+
+
+price_demand_history = PriceDemandHistory()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Append new daily rows to the price/demand dataset.")
+    parser.add_argument("rows", help="CSV with the dataset's columns (Date as YYYY-MM-DD)")
+    parser.add_argument("--dataset", default=None, help="dataset CSV (default: PRICEDEMAND_DATASET or the bundled one)")
+    parser.add_argument("--artifacts", default=None, help="PriceDemandModels directory whose label encoders validate the rows")
+    args = parser.parse_args()
+
+    history = PriceDemandHistory(args.dataset)
+    try:
+        result = history.ingest(pd.read_csv(args.rows, dtype=str), artifacts=default_artifacts(args.artifacts))
+    except ValueError as e:
+        raise SystemExit(f"rejected: {e}")
+    print(json.dumps({**result.as_dict(), "history": history.describe()}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
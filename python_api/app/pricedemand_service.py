@@ -26,8 +26,8 @@ def _models_dir() -> str:
     return os.path.join(base_dir, "models", "PriceDemandModels")
 
 
-def default_artifacts() -> PriceDemandArtifacts:
-    root = _models_dir()
+def default_artifacts(root: Optional[str] = None) -> PriceDemandArtifacts:
+    root = root or _models_dir()
     return PriceDemandArtifacts(
         # Prefer .h5 for broader TensorFlow compatibility (incl. Python 3.8).
         lstm_model_path=os.path.join(root, "lstm_price_model_final.h5"),
@@ -56,31 +56,56 @@ def _load_keras_model(path: str):
     raise FileNotFoundError(f"Keras model not found. Tried: {path} and {alt}")
 
 
+@dataclass(frozen=True)
+class PriceDemandModels:
+    """The price/demand artifacts loaded into memory, so a rollout doesn't re-read them."""
+
+    artifacts: PriceDemandArtifacts
+    lstm: Any
+    xgb: Any
+    feature_cols_lstm: List[str]
+    feature_cols_xgb: List[str]
+    scalers: Dict[str, Any]
+    label_encoders: Dict[str, Any]
+    window_size: int
+
+    @classmethod
+    def load(cls, artifacts: Optional[PriceDemandArtifacts] = None) -> "PriceDemandModels":
+        artifacts = artifacts or default_artifacts()
+        training_info = joblib.load(artifacts.training_info_path) or {}
+        return cls(
+            artifacts=artifacts,
+            lstm=_load_keras_model(artifacts.lstm_model_path),
+            xgb=joblib.load(artifacts.xgb_model_path),
+            feature_cols_lstm=list(joblib.load(artifacts.lstm_feature_cols_path)),
+            feature_cols_xgb=list(joblib.load(artifacts.xgb_feature_cols_path)),
+            scalers=joblib.load(artifacts.scalers_path) or {},
+            label_encoders=joblib.load(artifacts.label_encoders_path) or {},
+            window_size=int(training_info.get("window_size", 21)),
+        )
+
+
+# The 5 regions the models were trained on.
+REGIONS = ["Central", "West", "North", "South", "East"]
+
+
 def _safe_date(d: Optional[date]) -> date:
     if d is not None:
         return d
     return (datetime.now() + timedelta(days=1)).date()
 
 
-def load_price_demand_dataset() -> pd.DataFrame:
-    """Loads the historical dataset used to seed the forecast.
-
-    The training scripts expect a CSV with at least:
-    - Date
-    - Paddy_Price_LKR_per_kg
-    - Demand_Tons
-
-    You can override the path with env var PRICEDEMAND_DATASET.
-    """
-
+def price_demand_dataset_path() -> str:
+    """PRICEDEMAND_DATASET, or python_api/paddy_price_demand_dataset.csv."""
     env_path = os.environ.get("PRICEDEMAND_DATASET", "").strip()
     if env_path:
-        dataset_path = env_path
-    else:
-        # Conventional local location (not currently in repo).
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        dataset_path = os.path.join(base_dir, "paddy_price_demand_dataset.csv")
+        return env_path
+    # Conventional local location (not currently in repo).
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, "paddy_price_demand_dataset.csv")
+
 
+def _require_dataset(dataset_path: str) -> None:
     if not os.path.exists(dataset_path):
         raise FileNotFoundError(
             "Price/Demand dataset CSV not found. "
@@ -89,13 +114,32 @@ def load_price_demand_dataset() -> pd.DataFrame:
             f"Tried: {dataset_path}"
         )
 
-    df = pd.read_csv(dataset_path)
+
+def clean_price_demand_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Parses Date, drops rows without one and sorts by it (file order within a day)."""
     if "Date" not in df.columns:
         raise ValueError("Dataset must contain a 'Date' column")
 
+    df = df.copy()
     df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-    df = df.dropna(subset=["Date"]).sort_values("Date").reset_index(drop=True)
-    return df
+    # Stable, so the rows of one day keep their file order however long the file grows.
+    return df.dropna(subset=["Date"]).sort_values("Date", kind="stable").reset_index(drop=True)
+
+
+def load_price_demand_dataset() -> pd.DataFrame:
+    """Loads the historical dataset used to seed the forecast.
+
+    The training scripts expect a CSV with at least:
+    - Date
+    - Paddy_Price_LKR_per_kg
+    - Demand_Tons
+
+    You can override the path with env var PRICEDEMAND_DATASET.
+    """
+
+    dataset_path = price_demand_dataset_path()
+    _require_dataset(dataset_path)
+    return clean_price_demand_rows(pd.read_csv(dataset_path))
 
 
 # --- Script-compatible helpers (mirrors the user's standalone predict.py flow) ---
@@ -110,9 +154,11 @@ def preprocess(
     *,
     save_artifacts: bool = False,
     artifacts: Optional[PriceDemandArtifacts] = None,
+    models: Optional[PriceDemandModels] = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
     """Preprocess dataset like the training/inference script.
 
+    Uses the scalers/encoders of `models` when given, else loads them from `artifacts`.
     Returns (df_raw, df_mm, df_std, artifacts_dict).
     """
 
@@ -120,9 +166,13 @@ def preprocess(
         # The API uses saved artifacts from disk; writing new artifacts is out of scope.
         raise ValueError("save_artifacts=True is not supported in the API runtime")
 
-    artifacts = artifacts or default_artifacts()
-    scalers = joblib.load(artifacts.scalers_path) or {}
-    label_encoders = joblib.load(artifacts.label_encoders_path) or {}
+    if models is not None:
+        scalers = models.scalers
+        label_encoders = models.label_encoders
+    else:
+        artifacts = artifacts or default_artifacts()
+        scalers = joblib.load(artifacts.scalers_path) or {}
+        label_encoders = joblib.load(artifacts.label_encoders_path) or {}
 
     minmax = scalers.get("minmax")
     standard = scalers.get("standard")
@@ -130,7 +180,7 @@ def preprocess(
         raise RuntimeError("scalers.joblib must contain 'minmax' and 'standard' scalers")
 
     df_raw = df.copy()
-    df_raw = df_raw.sort_values("Date").reset_index(drop=True)
+    df_raw = df_raw.sort_values("Date", kind="stable").reset_index(drop=True)
     df_raw = df_raw.ffill()
 
     df_enc = _encode_categories(df_raw, label_encoders)
@@ -142,15 +192,44 @@ def preprocess(
     return df_raw, df_mm, df_std, {"scalers": scalers, "label_encoders": label_encoders}
 
 
-def predict_price_future_enhanced(
-    df_mm: pd.DataFrame,
-    lstm: Any,
-    feature_cols_lstm: List[str],
-    start_date: pd.Timestamp,
-    *,
-    n_steps: int,
-    window_size: int,
-) -> Tuple[List[float], List[pd.Timestamp]]:
+def _set_calendar_features(row: np.ndarray, col_index: Dict[str, int], dt: date) -> None:
+    """Writes dt's calendar features into row (one feature vector, or a (..., features) batch)."""
+    if "Month" in col_index:
+        row[..., col_index["Month"]] = dt.month
+    if "Quarter" in col_index:
+        row[..., col_index["Quarter"]] = (dt.month - 1) // 3 + 1
+    if "day_of_week" in col_index:
+        row[..., col_index["day_of_week"]] = dt.weekday()
+    if "day_of_year" in col_index:
+        row[..., col_index["day_of_year"]] = dt.timetuple().tm_yday
+    if "month_sin" in col_index:
+        row[..., col_index["month_sin"]] = np.sin(2 * np.pi * dt.month / 12)
+    if "month_cos" in col_index:
+        row[..., col_index["month_cos"]] = np.cos(2 * np.pi * dt.month / 12)
+    if "quarter_sin" in col_index:
+        q = (dt.month - 1) // 3 + 1
+        row[..., col_index["quarter_sin"]] = np.sin(2 * np.pi * q / 4)
+    if "quarter_cos" in col_index:
+        q = (dt.month - 1) // 3 + 1
+        row[..., col_index["quarter_cos"]] = np.cos(2 * np.pi * q / 4)
+    if "dow_sin" in col_index:
+        row[..., col_index["dow_sin"]] = np.sin(2 * np.pi * dt.weekday() / 7)
+    if "dow_cos" in col_index:
+        row[..., col_index["dow_cos"]] = np.cos(2 * np.pi * dt.weekday() / 7)
+    if "doy_sin" in col_index:
+        doy = dt.timetuple().tm_yday
+        row[..., col_index["doy_sin"]] = np.sin(2 * np.pi * doy / 365)
+    if "doy_cos" in col_index:
+        doy = dt.timetuple().tm_yday
+        row[..., col_index["doy_cos"]] = np.cos(2 * np.pi * doy / 365)
+    if "year_progress" in col_index:
+        row[..., col_index["year_progress"]] = dt.timetuple().tm_yday / 365.0
+    if "is_weekend" in col_index:
+        row[..., col_index["is_weekend"]] = 1 if dt.weekday() >= 5 else 0
+
+
+def _lstm_window(df_mm: pd.DataFrame, feature_cols_lstm: List[str], window_size: int) -> np.ndarray:
+    """The last window_size rows of the LSTM features: the seed of a price rollout."""
     # The standalone script runs feature engineering + dropna before calling this.
     df_mm = df_mm.copy()
     df_mm = _ensure_columns_zero(df_mm, list(feature_cols_lstm))
@@ -159,7 +238,19 @@ def predict_price_future_enhanced(
     seq = df_mm[list(feature_cols_lstm)].values[-window_size:]
     if seq.shape[0] != window_size:
         raise RuntimeError(f"Not enough history for window_size={window_size}. Have {seq.shape[0]} rows.")
+    return seq
+
 
+def predict_price_future_enhanced(
+    df_mm: pd.DataFrame,
+    lstm: Any,
+    feature_cols_lstm: List[str],
+    start_date: pd.Timestamp,
+    *,
+    n_steps: int,
+    window_size: int,
+) -> Tuple[List[float], List[pd.Timestamp]]:
+    seq = _lstm_window(df_mm, feature_cols_lstm, window_size)
     pred_dates = [start_date + pd.Timedelta(days=i) for i in range(n_steps)]
 
     price_preds: List[float] = []
@@ -170,39 +261,7 @@ def predict_price_future_enhanced(
         price_preds.append(pred)
 
         next_row = seq[-1].copy()
-        dt = d.to_pydatetime().date()
-        if "Month" in col_index:
-            next_row[col_index["Month"]] = dt.month
-        if "Quarter" in col_index:
-            next_row[col_index["Quarter"]] = (dt.month - 1) // 3 + 1
-        if "day_of_week" in col_index:
-            next_row[col_index["day_of_week"]] = dt.weekday()
-        if "day_of_year" in col_index:
-            next_row[col_index["day_of_year"]] = dt.timetuple().tm_yday
-        if "month_sin" in col_index:
-            next_row[col_index["month_sin"]] = np.sin(2 * np.pi * dt.month / 12)
-        if "month_cos" in col_index:
-            next_row[col_index["month_cos"]] = np.cos(2 * np.pi * dt.month / 12)
-        if "quarter_sin" in col_index:
-            q = (dt.month - 1) // 3 + 1
-            next_row[col_index["quarter_sin"]] = np.sin(2 * np.pi * q / 4)
-        if "quarter_cos" in col_index:
-            q = (dt.month - 1) // 3 + 1
-            next_row[col_index["quarter_cos"]] = np.cos(2 * np.pi * q / 4)
-        if "dow_sin" in col_index:
-            next_row[col_index["dow_sin"]] = np.sin(2 * np.pi * dt.weekday() / 7)
-        if "dow_cos" in col_index:
-            next_row[col_index["dow_cos"]] = np.cos(2 * np.pi * dt.weekday() / 7)
-        if "doy_sin" in col_index:
-            doy = dt.timetuple().tm_yday
-            next_row[col_index["doy_sin"]] = np.sin(2 * np.pi * doy / 365)
-        if "doy_cos" in col_index:
-            doy = dt.timetuple().tm_yday
-            next_row[col_index["doy_cos"]] = np.cos(2 * np.pi * doy / 365)
-        if "year_progress" in col_index:
-            next_row[col_index["year_progress"]] = dt.timetuple().tm_yday / 365.0
-        if "is_weekend" in col_index:
-            next_row[col_index["is_weekend"]] = 1 if dt.weekday() >= 5 else 0
+        _set_calendar_features(next_row, col_index, d.to_pydatetime().date())
 
         seq = np.vstack([seq[1:], next_row])
 
@@ -435,6 +494,39 @@ def _build_forecast_dates(start: date, horizon_days: int) -> List[date]:
     return [start + timedelta(days=i) for i in range(horizon_days)]
 
 
+@dataclass(frozen=True)
+class ForecastSeries:
+    """Price/demand forecast as float arrays, one value every step_days from start."""
+
+    start: date
+    price: np.ndarray
+    demand: np.ndarray
+    step_days: int = 1
+
+    def dates(self) -> np.ndarray:
+        return np.datetime64(self.start, "D") + np.arange(len(self.price)) * self.step_days
+
+    def head(self, n: int) -> "ForecastSeries":
+        """The first n steps; a rollout's prefix doesn't depend on how far it goes."""
+        return ForecastSeries(start=self.start, price=self.price[:n], demand=self.demand[:n], step_days=self.step_days)
+
+    def to_rows(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """The {date, price} / {date, demand} lists returned by /api/forecasting."""
+        days = self.dates().astype(str).tolist()
+        price_forecast = [{"date": d, "price": p} for d, p in zip(days, self.price.tolist())]
+        demand_forecast = [{"date": d, "demand": v} for d, v in zip(days, self.demand.tolist())]
+        return price_forecast, demand_forecast
+
+    def to_columnar(self) -> Dict[str, Any]:
+        """Start date + step + parallel arrays (the arrays stay NumPy for the encoder)."""
+        return {
+            "start": self.start.isoformat(),
+            "stepDays": self.step_days,
+            "price": self.price,
+            "demand": self.demand,
+        }
+
+
 def forecast_price_and_demand(
     *,
     region: str,
@@ -444,28 +536,30 @@ def forecast_price_and_demand(
     phosphorus_p: Optional[float],
     potassium_k: Optional[float],
     artifacts: Optional[PriceDemandArtifacts] = None,
+    models: Optional[PriceDemandModels] = None,
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    artifacts = artifacts or default_artifacts()
-
-    # Load artifacts (same as script)
-    lstm = _load_keras_model(artifacts.lstm_model_path)
-    xgb = joblib.load(artifacts.xgb_model_path)
-    feature_cols_lstm = joblib.load(artifacts.lstm_feature_cols_path)
-    feature_cols_xgb = joblib.load(artifacts.xgb_feature_cols_path)
-    training_info = joblib.load(artifacts.training_info_path) or {}
-    window_size = int(training_info.get("window_size", 21))
-
-    # Enforce the 5 trained regions (user requirement)
-    allowed_regions = ["Central", "West", "North", "South", "East"]
-    if region not in allowed_regions:
-        raise ValueError(f"Unsupported region '{region}'. Allowed: {', '.join(allowed_regions)}")
-
-    # Load dataset + preprocess (same as script)
-    df = load_dataset()
+    return forecast_series(
+        region=region,
+        horizon_days=horizon_days,
+        start_date=start_date,
+        nitrogen_n=nitrogen_n,
+        phosphorus_p=phosphorus_p,
+        potassium_k=potassium_k,
+        artifacts=artifacts,
+        models=models,
+    ).to_rows()
+
+
+def _featured_history(df: pd.DataFrame, region: str, models: PriceDemandModels) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Scaled (minmax, standard) copies of a cleaned history with rolling/momentum features, NaN rows dropped.
+
+    The last row's Region is set to the requested one first (as the standalone script does).
+    """
+    df = df.copy()
     if "Region" in df.columns:
         df.loc[df.index[-1], "Region"] = region
 
-    df_raw, df_mm, df_std, _ = preprocess(df, save_artifacts=False, artifacts=artifacts)
+    df_raw, df_mm, df_std, _ = preprocess(df, save_artifacts=False, models=models)
 
     # Feature engineering + dropna (matches the standalone script)
     df_mm = add_rolling_and_seasonal(df_mm)
@@ -475,6 +569,26 @@ def forecast_price_and_demand(
     df_std = add_rolling_and_seasonal(df_std)
     df_std = add_price_momentum(df_std)
     df_std = df_std.dropna().reset_index(drop=True)
+    return df_mm, df_std
+
+
+def _forecast_frames(
+    region: str,
+    nitrogen_n: Optional[float],
+    phosphorus_p: Optional[float],
+    potassium_k: Optional[float],
+    models: PriceDemandModels,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(df_mm, df_std): the history with features, as the LSTM and XGB rollouts start from it."""
+    # Enforce the 5 trained regions (user requirement)
+    if region not in REGIONS:
+        raise ValueError(f"Unsupported region '{region}'. Allowed: {', '.join(REGIONS)}")
+
+    # The preprocessed, featured and dropna'd end of the history, cached until the dataset changes.
+    # (Imported here: app.price_demand_history builds on this module.)
+    from app.price_demand_history import price_demand_history
+
+    df_mm, df_std = price_demand_history.frames(models, region)
 
     # Inject sensor values into df_mm ONLY (matches the standalone script)
     if all(c in df_mm.columns for c in ["Nitrogen_N", "Phosphorus_P", "Potassium_K"]):
@@ -485,6 +599,30 @@ def forecast_price_and_demand(
                 float(potassium_k),
             ]
 
+    return df_mm, df_std
+
+
+def forecast_series(
+    *,
+    region: str,
+    horizon_days: int,
+    start_date: Optional[date],
+    nitrogen_n: Optional[float],
+    phosphorus_p: Optional[float],
+    potassium_k: Optional[float],
+    artifacts: Optional[PriceDemandArtifacts] = None,
+    models: Optional[PriceDemandModels] = None,
+) -> ForecastSeries:
+    # Load artifacts (same as script) unless the caller holds them in memory.
+    models = models or PriceDemandModels.load(artifacts)
+    lstm = models.lstm
+    xgb = models.xgb
+    feature_cols_lstm = models.feature_cols_lstm
+    feature_cols_xgb = models.feature_cols_xgb
+    window_size = models.window_size
+
+    df_mm, df_std = _forecast_frames(region, nitrogen_n, phosphorus_p, potassium_k, models)
+
     start_ts = pd.Timestamp(_safe_date(start_date))
     price_preds, pred_dates = predict_price_future_enhanced(
         df_mm,
@@ -503,13 +641,231 @@ def forecast_price_and_demand(
         pred_dates,
     )
 
-    price_forecast = [
-        {"date": pd.Timestamp(d).date().isoformat(), "price": float(p)}
-        for d, p in zip(pred_dates, price_preds)
-    ]
-    demand_forecast = [
-        {"date": pd.Timestamp(d).date().isoformat(), "demand": float(v)}
-        for d, v in zip(pred_dates, demand_preds)
-    ]
+    return ForecastSeries(
+        start=start_ts.date(),
+        price=np.asarray(price_preds, dtype=np.float64),
+        demand=np.asarray(demand_preds, dtype=np.float64),
+    )
+
+
+# --- Monte Carlo uncertainty bands ---
+
+# Features set from the forecast date, never perturbed.
+CALENDAR_FEATURES = (
+    "Month", "Quarter", "day_of_week", "day_of_year", "month_sin", "month_cos", "quarter_sin",
+    "quarter_cos", "dow_sin", "dow_cos", "doy_sin", "doy_cos", "year_progress", "is_weekend",
+)
+NPK_FEATURES = ("Nitrogen_N", "Phosphorus_P", "Potassium_K")
+# Longest look-back of the XGB history features (lag 21, 21-day rolling mean).
+_DEMAND_HISTORY = 22
+
+
+@dataclass(frozen=True)
+class ForecastBands:
+    """Per-day percentiles of K sampled price/demand paths."""
+
+    start: date
+    samples: int
+    percentiles: Tuple[float, ...]
+    price: np.ndarray  # (len(percentiles), days)
+    demand: np.ndarray
+    price_mean: np.ndarray
+    demand_mean: np.ndarray
+    step_days: int = 1
+
+    def dates(self) -> np.ndarray:
+        return np.datetime64(self.start, "D") + np.arange(self.price.shape[1]) * self.step_days
+
+    def _keys(self) -> List[str]:
+        return [f"p{p:g}" for p in self.percentiles]
+
+    def to_rows(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """[{date, mean, p5, ..., p95}] for price and for demand."""
+        days = self.dates().astype(str).tolist()
+        keys = self._keys()
+
+        def rows(bands: np.ndarray, mean: np.ndarray) -> List[Dict[str, Any]]:
+            columns = dict(zip(keys, bands.tolist()))
+            means = mean.tolist()
+            return [{"date": d, "mean": means[i], **{k: v[i] for k, v in columns.items()}} for i, d in enumerate(days)]
+
+        return rows(self.price, self.price_mean), rows(self.demand, self.demand_mean)
+
+    def to_columnar(self) -> Dict[str, Any]:
+        return {
+            "start": self.start.isoformat(),
+            "stepDays": self.step_days,
+            "price": {"mean": self.price_mean, **dict(zip(self._keys(), self.price))},
+            "demand": {"mean": self.demand_mean, **dict(zip(self._keys(), self.demand))},
+        }
+
+
+def sample_seed_windows(
+    seq: np.ndarray,
+    feature_cols_lstm: List[str],
+    samples: int,
+    rng: np.random.Generator,
+    *,
+    noise: float = 1.0,
+    npk_sigma: float = 0.1,
+) -> np.ndarray:
+    """K perturbed copies of the LSTM seed window, shape (samples, window, features).
+
+    Each non-calendar feature gets Gaussian noise scaled by its day-to-day
+    variability inside the window; N/P/K of the last row (the sensor reading)
+    are scaled by 1 + N(0, npk_sigma) instead.
+    """
+    seqs = np.repeat(seq[None, :, :].astype(np.float64), samples, axis=0)
+    col_index = {c: i for i, c in enumerate(feature_cols_lstm)}
+    free = [i for c, i in col_index.items() if c not in CALENDAR_FEATURES and c not in NPK_FEATURES]
+    if free and noise > 0 and len(seq) > 1:
+        scale = np.diff(seq[:, free], axis=0).std(axis=0) * noise
+        seqs[:, :, free] += rng.standard_normal((samples, seq.shape[0], len(free))) * scale
+    npk = [col_index[c] for c in NPK_FEATURES if c in col_index]
+    if npk and npk_sigma > 0:
+        seqs[:, -1, npk] *= 1.0 + rng.standard_normal((samples, len(npk))) * npk_sigma
+    return seqs
+
+
+def predict_price_paths(
+    seqs: np.ndarray,
+    lstm: Any,
+    feature_cols_lstm: List[str],
+    pred_dates: List[pd.Timestamp],
+) -> np.ndarray:
+    """predict_price_future_enhanced for K seed windows at once: one LSTM batch per day."""
+    samples = seqs.shape[0]
+    col_index = {c: idx for idx, c in enumerate(feature_cols_lstm)}
+    out = np.empty((samples, len(pred_dates)), dtype=np.float64)
+    for i, d in enumerate(pred_dates):
+        out[:, i] = np.asarray(lstm.predict(seqs, verbose=0, batch_size=samples)).reshape(samples, -1)[:, 0]
+        next_rows = seqs[:, -1, :].copy()
+        _set_calendar_features(next_rows, col_index, d.to_pydatetime().date())
+        seqs = np.concatenate([seqs[:, 1:, :], next_rows[:, None, :]], axis=1)
+    return out
+
+
+def predict_demand_paths(
+    df_std: pd.DataFrame,
+    xgb: Any,
+    feature_cols_xgb: List[str],
+    price_paths: np.ndarray,
+    pred_dates: List[pd.Timestamp],
+) -> np.ndarray:
+    """predict_demand_future_enhanced for K price paths at once: one XGB matrix per day.
+
+    Instead of re-deriving every feature over the whole history each day, only
+    the new row's lags, rolling stats and momentum are computed from the last
+    few days of each path; all other features are the last observed row's.
+    """
+    samples, n_steps = price_paths.shape
+    cols = list(feature_cols_xgb)
+    col_index = {c: i for i, c in enumerate(cols)}
+
+    hist = _fill_numeric(_ensure_columns_zero(df_std.copy(), cols))
+    template = hist[cols].iloc[-1].to_numpy(dtype=np.float64)
+
+    demand_col = df_std["Demand_Tons"].dropna() if "Demand_Tons" in df_std.columns else pd.Series(dtype=float)
+    last_demand = np.full(samples, float(demand_col.iloc[-1]) if len(demand_col) else 0.0)
+    demand = np.repeat(_tail_values(df_std, "Demand_Tons")[None, :], samples, axis=0)
+    price = np.repeat(_tail_values(df_std, "Paddy_Price_LKR_per_kg")[None, :], samples, axis=0)
+
+    out = np.empty((samples, n_steps), dtype=np.float64)
+    for i, dt in enumerate(pred_dates):
+        # The day's row carries the previous prediction as its demand, like the scalar loop.
+        demand = np.concatenate([demand[:, 1:], last_demand[:, None]], axis=1)
+        price = np.concatenate([price[:, 1:], price_paths[:, i : i + 1]], axis=1)
+
+        X = np.repeat(template[None, :], samples, axis=0)
+        _set_history_features(X, col_index, demand, price)
+        _set_calendar_features(X, col_index, dt.to_pydatetime().date())
+
+        last_demand = np.asarray(xgb.predict(pd.DataFrame(X, columns=cols)), dtype=np.float64).reshape(samples)
+        out[:, i] = last_demand
+    return out
+
+
+def _tail_values(df: pd.DataFrame, col: str) -> np.ndarray:
+    """The last _DEMAND_HISTORY values of col (zeros if it's missing)."""
+    if col not in df.columns:
+        return np.zeros(_DEMAND_HISTORY)
+    values = df[col].to_numpy(dtype=np.float64)[-_DEMAND_HISTORY:]
+    return np.concatenate([np.full(_DEMAND_HISTORY - len(values), values[0] if len(values) else 0.0), values])
+
 
-    return price_forecast, demand_forecast
+def _set_history_features(X: np.ndarray, col_index: Dict[str, int], demand: np.ndarray, price: np.ndarray) -> None:
+    """The demand/price-derived features of add_lag_features, add_rolling_and_seasonal and
+    add_price_momentum, for the last day of each (K, days) history."""
+
+    def put(name: str, values: np.ndarray) -> None:
+        if name in col_index:
+            X[:, col_index[name]] = values
+
+    put("Demand_Tons", demand[:, -1])
+    put("Paddy_Price_LKR_per_kg", price[:, -1])
+    for lag in range(1, 22):
+        put(f"Demand_Tons_lag{lag}", demand[:, -1 - lag])
+    for window in (3, 7, 14, 21):
+        put(f"Demand_roll{window}_mean", demand[:, -window:].mean(axis=1))
+        put(f"Price_roll{window}_mean", price[:, -window:].mean(axis=1))
+    put("Demand_roll7_std", demand[:, -7:].std(axis=1, ddof=1))
+    put("Price_roll7_std", price[:, -7:].std(axis=1, ddof=1))
+    put("price_volatility_7", price[:, -7:].std(axis=1, ddof=1))
+    for k in (1, 3, 7):
+        put(f"price_diff_{k}", price[:, -1] - price[:, -1 - k])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k in (3, 7):
+            put(f"price_momentum_{k}", price[:, -1] / price[:, -1 - k] - 1.0)
+
+
+def forecast_bands(
+    *,
+    region: str,
+    horizon_days: int,
+    start_date: Optional[date],
+    nitrogen_n: Optional[float],
+    phosphorus_p: Optional[float],
+    potassium_k: Optional[float],
+    samples: int = 200,
+    percentiles: Tuple[float, ...] = (5, 25, 50, 75, 95),
+    noise: float = 1.0,
+    npk_sigma: float = 0.1,
+    seed: int = 0,
+    artifacts: Optional[PriceDemandArtifacts] = None,
+    models: Optional[PriceDemandModels] = None,
+) -> ForecastBands:
+    """Percentile bands from `samples` rollouts with perturbed seed windows and N/P/K.
+
+    All paths go through each LSTM step as one batch and each XGB step as one
+    matrix, so the model calls per day stay at two whatever `samples` is.
+    The same seed gives the same bands.
+    """
+    models = models or PriceDemandModels.load(artifacts)
+    feature_cols_lstm = list(models.feature_cols_lstm)
+    df_mm, df_std = _forecast_frames(region, nitrogen_n, phosphorus_p, potassium_k, models)
+
+    start_ts = pd.Timestamp(_safe_date(start_date))
+    pred_dates = [start_ts + pd.Timedelta(days=i) for i in range(int(horizon_days))]
+    rng = np.random.default_rng(seed)
+
+    seqs = sample_seed_windows(
+        _lstm_window(df_mm, feature_cols_lstm, models.window_size),
+        feature_cols_lstm,
+        samples,
+        rng,
+        noise=noise,
+        npk_sigma=npk_sigma,
+    )
+    price_paths = predict_price_paths(seqs, models.lstm, feature_cols_lstm, pred_dates)
+    demand_paths = predict_demand_paths(df_std, models.xgb, list(models.feature_cols_xgb), price_paths, pred_dates)
+
+    q = np.asarray(percentiles, dtype=np.float64)
+    return ForecastBands(
+        start=start_ts.date(),
+        samples=samples,
+        percentiles=tuple(float(p) for p in percentiles),
+        price=np.percentile(price_paths, q, axis=0),
+        demand=np.percentile(demand_paths, q, axis=0),
+        price_mean=price_paths.mean(axis=0),
+        demand_mean=demand_paths.mean(axis=0),
+    )
@@ -0,0 +1,208 @@
+"""Opt-in per-request sampling profiler.
+
+Profiling is off unless one of these is set:
+- PROFILE_PATHS=/api/forecasting,/predict profiles every request to those paths;
+- PROFILING_TOKEN=<secret> profiles any request sent with "X-Profile: <secret>".
+
+When neither is set ProfilingMiddleware isn't installed at all, so there is
+no per-request cost. While a profiled request runs, a background thread
+samples (sys._current_frames() every PROFILE_INTERVAL_MS) the event loop
+thread and the busy threadpool workers, where sync endpoints and
+run_in_threadpool work execute; background threads (serial readers, the
+forecast store, log writers) are left out. Requests served at the same
+time share those threads, so their samples can show up too. The stacks are
+written in the collapsed "frame;frame;frame count" format that flamegraph.pl
+and speedscope read, into a ring of at most PROFILE_MAX_FILES files.
+Stored profiles (they include query strings) are only served with PROFILING_TOKEN.
+"""
+
+from __future__ import annotations
+
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "").strip() or os.path.join(_BASE_DIR, "data", "profiles")
+PROFILE_PATHS = [p.strip() for p in os.environ.get("PROFILE_PATHS", "").split(",") if p.strip()]
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN", "").strip()
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+
+# Leaf frames in these files are threads parked on a lock, queue or selector.
+_IDLE_FILES = {"threading.py", "selectors.py", "queue.py", "thread.py", "serialposix.py", "serialwin32.py"}
+# anyio names the threadpool threads behind run_in_threadpool / sync endpoints this way.
+_WORKER_THREAD_NAME = "AnyIO worker thread"
+
+
+def profiling_enabled() -> bool:
+    return bool(PROFILE_PATHS or PROFILING_TOKEN)
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    """Samples the stacks of busy threads (those `include(ident, name)` accepts; all by default)."""
+
+    def __init__(
+        self,
+        interval: float = PROFILE_INTERVAL_MS / 1000.0,
+        *,
+        include: Optional[Callable[[int, str], bool]] = None,
+    ) -> None:
+        self.interval = interval
+        self.include = include
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                if self.include is not None and not self.include(ident, names.get(ident, "")):
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class ProfileStore:
+    """Bounded on-disk ring of collapsed-stack profiles with a JSON sidecar each."""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES) -> None:
+        self.directory = directory
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id() -> str:
+        return f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profile_id: str, sampler: StackSampler, meta: Dict[str, Any]) -> None:
+        meta = {**meta, "id": profile_id, "samples": sampler.samples, "intervalMs": sampler.interval * 1000.0}
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(profile_id, ".folded"), "w", encoding="utf-8") as f:
+                f.write(sampler.collapsed())
+            with open(self._path(profile_id, ".json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            for old in self._ids()[: -self.max_files]:
+                for ext in (".folded", ".json"):
+                    try:
+                        os.remove(self._path(old, ext))
+                    except OSError:
+                        pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(self._path(profile_id, ".json"), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if profile_id not in self._ids():
+            return None  # Also rejects anything that isn't a plain profile id.
+        return self._path(profile_id, ".folded")
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f[: -len(".folded")] for f in os.listdir(self.directory) if f.endswith(".folded"))
+
+    def _path(self, profile_id: str, ext: str) -> str:
+        return os.path.join(self.directory, profile_id + ext)
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles the requests selected by PROFILE_PATHS / X-Profile."""
+
+    def __init__(self, app: Any, store: ProfileStore = profile_store) -> None:
+        self.app = app
+        self.store = store
+
+    def _wanted(self, scope: Dict[str, Any]) -> bool:
+        if scope["type"] != "http":
+            return False
+        if any(scope["path"] == p or scope["path"].startswith(p.rstrip("/") + "/") for p in PROFILE_PATHS):
+            return True
+        if PROFILING_TOKEN:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-profile":
+                    return hmac.compare_digest(value, PROFILING_TOKEN.encode())
+        return False
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        loop_thread = threading.get_ident()
+        sampler = StackSampler(
+            include=lambda ident, name: ident == loop_thread or name.startswith(_WORKER_THREAD_NAME)
+        ).start()
+        started = time.perf_counter()
+        status: Dict[str, int] = {}
+        profile_id = self.store.new_id()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode("ascii"))]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            meta = {
+                "method": scope.get("method"),
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status.get("code"),
+                "durationMs": round(elapsed * 1000.0, 3),
+                "startedAt": time.time() - elapsed,
+            }
+            # Joining the sampler and writing files would stall every other request on the loop.
+            await run_in_threadpool(sampler.stop)
+            await run_in_threadpool(self.store.save, profile_id, sampler, meta)
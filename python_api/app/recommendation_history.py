@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECOMMENDATION_HISTORY_PATH = os.environ.get("RECOMMENDATION_HISTORY_PATH", "").strip() or os.path.join(
+    _BASE_DIR, "data", "recommendation_history.sqlite"
+)
+
+SENSOR_FIELDS = ("soil_temp", "soil_moisture", "air_temp", "air_humidity")
+_COLUMNS = (
+    ("ts", "growth_stage", "purpose", "source")
+    + SENSOR_FIELDS
+    + ("fertilizer", "predicted_yield", "confidence", "latency_ms", "model_version", "results")
+)
+_INSERT = f"INSERT INTO recommendations ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})"
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS recommendations (id INTEGER PRIMARY KEY, ts REAL NOT NULL, "
+    "growth_stage TEXT NOT NULL, purpose TEXT NOT NULL, source TEXT NOT NULL, "
+    + ", ".join(f"{f} REAL" for f in SENSOR_FIELDS)
+    + ", fertilizer TEXT, predicted_yield REAL, confidence REAL, latency_ms REAL, model_version TEXT, "
+    "results TEXT NOT NULL)",
+    # Every page is "newest first" within the filters, so each index ends in ts (and the implicit rowid).
+    "CREATE INDEX IF NOT EXISTS recommendations_ts ON recommendations (ts)",
+    "CREATE INDEX IF NOT EXISTS recommendations_stage_ts ON recommendations (growth_stage, ts)",
+    "CREATE INDEX IF NOT EXISTS recommendations_fertilizer_ts ON recommendations (fertilizer, ts)",
+    "CREATE INDEX IF NOT EXISTS recommendations_stage_fertilizer_ts ON recommendations (growth_stage, fertilizer, ts)",
+)
+
+
+def _day_start(day: date) -> float:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
+
+def encode_cursor(ts: float, row_id: int) -> str:
+    return f"{ts!r}:{row_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        ts, row_id = cursor.split(":")
+        return float(ts), int(row_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'") from None
+
+
+class RecommendationHistory:
+    """Every predict_top3 result with its inputs and latency, in one SQLite (WAL) file.
+
+    record() only enqueues; a writer thread commits batches like SensorLog
+    does. Pages are read newest first with keyset pagination on (ts, id): the
+    cursor is the last row of the previous page, so page N costs the same as
+    page 1 however many rows the table holds.
+    """
+
+    def __init__(
+        self,
+        path: str = RECOMMENDATION_HISTORY_PATH,
+        *,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 50_000,
+    ) -> None:
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: Deque[Tuple[Any, ...]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._in_flight = 0
+
+        self._written = 0
+        self._dropped = 0
+        self._batches = 0
+        self._last_error: Optional[str] = None
+
+    # --- Writing ---
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="recommendation-history-writer", daemon=True)
+            self._thread.start()
+
+    def record(
+        self,
+        source: str,
+        sensor_data: Dict[str, Any],
+        growth_stage: str,
+        purpose: str,
+        results: List[Dict[str, Any]],
+        latency_ms: float,
+        model_version: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ) -> bool:
+        """Queues one recommendation; a no-op until start(), False if the queue is full."""
+        if self._thread is None:
+            return False
+        top = results[0] if results else {}
+        row = (
+            (timestamp if timestamp is not None else time.time(), growth_stage, purpose, source)
+            + tuple(_float(sensor_data.get(f)) for f in SENSOR_FIELDS)
+            + (
+                top.get("Recommended Fertilizer"),
+                _float(top.get("Predicted Yield (ton/ha)")),
+                _float(top.get("Confidence (%)")),
+                round(latency_ms, 3),
+                model_version,
+                json.dumps(results, default=_float),
+            )
+        )
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                return False
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Blocks until everything queued so far is committed."""
+        deadline = time.time() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                with self._cond:
+                    if not self._pending and not self._closing:
+                        self._cond.wait(self.flush_interval)
+                    if not self._pending:
+                        if self._closing:
+                            return
+                        continue
+                    n = min(len(self._pending), self.batch_size)
+                    batch = [self._pending.popleft() for _ in range(n)]
+                    self._in_flight = n
+
+                try:
+                    with conn:
+                        conn.executemany(_INSERT, batch)
+                    with self._cond:
+                        self._written += n
+                        self._batches += 1
+                except sqlite3.Error as e:
+                    with self._cond:
+                        self._dropped += n
+                        self._last_error = str(e)
+                finally:
+                    with self._cond:
+                        self._in_flight = 0
+                        self._cond.notify_all()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            conn.execute(stmt)
+        return conn
+
+    # --- Reading ---
+
+    def page(
+        self,
+        *,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        growth_stage: Optional[str] = None,
+        fertilizer: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """One page, newest first. start/end are inclusive UTC days; fertilizer is the rank-1 one."""
+        where: List[str] = []
+        params: List[Any] = []
+        if growth_stage:
+            where.append("growth_stage = ?")
+            params.append(growth_stage)
+        if fertilizer:
+            where.append("fertilizer = ?")
+            params.append(fertilizer)
+        if start is not None:
+            where.append("ts >= ?")
+            params.append(_day_start(start))
+        if end is not None:
+            where.append("ts < ?")
+            params.append(_day_start(end + timedelta(days=1)))
+        if cursor:
+            where.append("(ts, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        sql = f"SELECT id, {', '.join(_COLUMNS)} FROM recommendations"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit + 1)  # One extra row tells whether there is a next page.
+
+        if not os.path.exists(self.path):
+            return {"items": [], "nextCursor": None}
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        items = [_item(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+        return {"items": items, "nextCursor": next_cursor}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "path": self.path,
+                "pending": len(self._pending),
+                "written": self._written,
+                "dropped": self._dropped,
+                "batches": self._batches,
+                "lastError": self._last_error,
+            }
+
+
+def _float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _item(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    rec = dict(zip(("id",) + _COLUMNS, row))
+    return {
+        "id": rec["id"],
+        "timestamp": rec["ts"],
+        "source": rec["source"],
+        "growthStage": rec["growth_stage"],
+        "purpose": rec["purpose"],
+        "sensorData": {f: rec[f] for f in SENSOR_FIELDS if rec[f] is not None},
+        "fertilizer": rec["fertilizer"],
+        "predictedYield": rec["predicted_yield"],
+        "confidence": rec["confidence"],
+        "latencyMs": rec["latency_ms"],
+        "modelVersion": rec["model_version"],
+        "predictions": json.loads(rec["results"]),
+    }
+
+
+recommendation_history = RecommendationHistory()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.serial_manager import SerialSnapshot
+
+# Columns kept per reading. ESP32 and NPK readings each fill their own subset;
+# the rest of the row stays NaN.
+FIELDS: Tuple[str, ...] = (
+    "nitrogenN",
+    "phosphorusP",
+    "potassiumK",
+    "soil_temp",
+    "air_temp",
+    "soil_moisture",
+    "air_humidity",
+)
+
+HISTORY_CAPACITY = int(os.environ.get("SENSOR_HISTORY_CAPACITY", "172800"))
+
+
+class SensorHistory:
+    """Fixed-capacity ring buffer of sensor readings stored as NumPy columns.
+
+    Appends overwrite the oldest row once full. Readers get chronologically
+    ordered copies and aggregate them with vectorized reductions.
+    """
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY, fields: Sequence[str] = FIELDS) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self.fields = tuple(fields)
+        self._index = {name: i for i, name in enumerate(self.fields)}
+        self._ts = np.zeros(self.capacity, dtype=np.float64)
+        self._values = np.full((self.capacity, len(self.fields)), np.nan, dtype=np.float32)
+        self._head = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: Dict[str, float]) -> None:
+        with self._lock:
+            i = self._head
+            if self._size:
+                # Callers stamp readings before taking the lock, so two of them can
+                # arrive out of order; window() relies on the ring staying sorted.
+                timestamp = max(timestamp, self._ts[i - 1])
+            self._ts[i] = timestamp
+            row = self._values[i]
+            row.fill(np.nan)
+            for name, value in values.items():
+                col = self._index.get(name)
+                if col is not None:
+                    row[col] = value
+            self._head = (i + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def record(self, port: str, snap: SerialSnapshot) -> None:
+        """ReadingListener adapter for app.serial_manager."""
+        self.append(snap.timestamp, snap.values)
+
+    def window(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (timestamps, values) copies for start <= t < end in time order."""
+        with self._lock:
+            if self._size < self.capacity:
+                segments = [(0, self._size)]
+            else:
+                # Oldest rows start at head; each of the two segments is sorted.
+                segments = [(self._head, self.capacity), (0, self._head)]
+            ts_parts, value_parts = [], []
+            for a, b in segments:
+                lo, hi = np.searchsorted(self._ts[a:b], [start, end], side="left")
+                ts_parts.append(self._ts[a + lo : a + hi])
+                value_parts.append(self._values[a + lo : a + hi])
+            return np.concatenate(ts_parts), np.concatenate(value_parts)
+
+    def downsample(
+        self,
+        start: float,
+        end: float,
+        buckets: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """Aggregates [start, end) into equal-width buckets of min/max/mean per field.
+
+        Empty buckets are omitted; NaN (field not reported) is ignored per bucket.
+        """
+        if end <= start:
+            raise ValueError("end must be after start")
+        if buckets <= 0:
+            raise ValueError("buckets must be positive")
+        fields = list(fields) if fields else list(self.fields)
+        unknown = [f for f in fields if f not in self._index]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(self.fields)}")
+
+        width = (end - start) / buckets
+        ts, values = self.window(start, end)
+        values = values[:, [self._index[f] for f in fields]]
+
+        result: Dict[str, Any] = {
+            "start": start,
+            "end": end,
+            "bucketSeconds": width,
+            "t": [],
+            "count": [],
+            "series": {f: {"min": [], "max": [], "mean": []} for f in fields},
+        }
+        if ts.size == 0:
+            return result
+
+        bucket_ids = np.minimum(((ts - start) // width).astype(np.int64), buckets - 1)
+        # Timestamps are sorted, so each non-empty bucket is one contiguous run.
+        starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+
+        present = ~np.isnan(values)
+        counts = np.add.reduceat(present, starts, axis=0)
+        sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0, dtype=np.float64)
+        mins = np.fmin.reduceat(values, starts, axis=0)
+        maxs = np.fmax.reduceat(values, starts, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+
+        result["t"] = (start + bucket_ids[starts] * width).tolist()
+        result["count"] = np.diff(np.r_[starts, ts.size]).tolist()
+        for j, name in enumerate(fields):
+            empty = counts[:, j] == 0
+            result["series"][name] = {
+                "min": _nan_to_none(mins[:, j], empty),
+                "max": _nan_to_none(maxs[:, j], empty),
+                "mean": _nan_to_none(means[:, j], empty),
+            }
+        return result
+
+
+def _nan_to_none(col: np.ndarray, empty: np.ndarray) -> List[Optional[float]]:
+    out: List[Optional[float]] = np.round(col.astype(np.float64), 3).tolist()
+    for i in np.flatnonzero(empty):
+        out[i] = None
+    return out
+
+
+history = SensorHistory()
+
+
+def query_history(
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    buckets: int = 120,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Downsampled history with defaults suited to dashboards (last hour, 120 points)."""
+    end = time.time() if end is None else end
+    start = end - 3600.0 if start is None else start
+    return history.downsample(start, end, buckets, fields)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.sensor_history import FIELDS
+from app.serial_manager import SerialSnapshot
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENSOR_LOG_DIR = os.environ.get("SENSOR_LOG_DIR", "").strip() or os.path.join(_BASE_DIR, "data", "sensor_log")
+
+_DAY = 86400.0
+_COLUMNS = ("ts", "port") + FIELDS
+_INSERT = f"INSERT INTO readings ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})"
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS readings (ts REAL NOT NULL, port TEXT NOT NULL, "
+    + ", ".join(f"{f} REAL" for f in FIELDS)
+    + ")",
+    "CREATE INDEX IF NOT EXISTS readings_ts ON readings (ts)",
+)
+
+
+def _segment_day(ts: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+class SensorLog:
+    """Append-only sensor reading log split into one SQLite (WAL) file per UTC day.
+
+    append() only enqueues; a writer thread commits batches of up to batch_size
+    rows (or whatever arrived within flush_interval) in one transaction, so the
+    serial reader never waits on disk. Range reads seek through the ts index of
+    just the segments overlapping the range.
+    """
+
+    def __init__(
+        self,
+        directory: str = SENSOR_LOG_DIR,
+        *,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        max_pending: int = 200_000,
+    ) -> None:
+        self.directory = directory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: Deque[Tuple[Any, ...]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._in_flight = 0
+
+        self._written = 0
+        self._dropped = 0
+        self._batches = 0
+        self._last_error: Optional[str] = None
+
+    # --- Writing ---
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="sensor-log-writer", daemon=True)
+            self._thread.start()
+
+    def append(self, port: str, timestamp: float, values: Dict[str, float]) -> bool:
+        """Queues one reading; a no-op until start(), False (and counts a drop) if the queue is full."""
+        if self._thread is None:
+            return False
+        row = (timestamp, port) + tuple(values.get(f) for f in FIELDS)
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                return False
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def record(self, port: str, snap: SerialSnapshot) -> None:
+        """ReadingListener adapter for app.serial_manager."""
+        self.append(port, snap.timestamp, snap.values)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Blocks until everything queued so far is committed."""
+        deadline = time.time() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        conns: Dict[str, sqlite3.Connection] = {}
+        try:
+            while True:
+                with self._cond:
+                    if not self._pending and not self._closing:
+                        self._cond.wait(self.flush_interval)
+                    if not self._pending:
+                        if self._closing:
+                            return
+                        continue
+                    n = min(len(self._pending), self.batch_size)
+                    batch = [self._pending.popleft() for _ in range(n)]
+                    self._in_flight = n
+
+                try:
+                    self._write_batch(conns, batch)
+                    with self._cond:
+                        self._written += n
+                        self._batches += 1
+                except sqlite3.Error as e:
+                    with self._cond:
+                        self._dropped += n
+                        self._last_error = str(e)
+                finally:
+                    with self._cond:
+                        self._in_flight = 0
+                        self._cond.notify_all()
+        finally:
+            for conn in conns.values():
+                conn.close()
+
+    def _write_batch(self, conns: Dict[str, sqlite3.Connection], batch: List[Tuple[Any, ...]]) -> None:
+        by_day: Dict[str, List[Tuple[Any, ...]]] = {}
+        for row in batch:
+            by_day.setdefault(_segment_day(row[0]), []).append(row)
+
+        for day, rows in by_day.items():
+            conn = conns.get(day)
+            if conn is None:
+                # Readings arrive in time order, so older segments are finished.
+                for old_day in [d for d in conns if d < day]:
+                    conns.pop(old_day).close()
+                conn = self._open_segment(day)
+                conns[day] = conn
+            with conn:
+                conn.executemany(_INSERT, rows)
+
+    def _open_segment(self, day: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._segment_path(day), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commits don't fsync; the WAL is synced at checkpoints.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            conn.execute(stmt)
+        return conn
+
+    def _segment_path(self, day: str) -> str:
+        return os.path.join(self.directory, f"sensor-{day}.sqlite")
+
+    # --- Reading ---
+
+    def query(
+        self,
+        start: float,
+        end: float,
+        *,
+        port: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Returns readings with start <= ts < end in time order (NULL fields omitted)."""
+        if end <= start:
+            raise ValueError("end must be after start")
+
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM readings WHERE ts >= ? AND ts < ?"
+        params: List[Any] = [start, end]
+        if port:
+            sql += " AND port = ?"
+            params.append(port)
+        sql += " ORDER BY ts"
+
+        rows: List[Dict[str, Any]] = []
+        day_start = start - (start % _DAY)
+        while day_start < end:
+            path = self._segment_path(_segment_day(day_start))
+            day_start += _DAY
+            if not os.path.exists(path):
+                continue
+            remaining = None if limit is None else limit - len(rows)
+            if remaining is not None and remaining <= 0:
+                break
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                cursor = conn.execute(sql + (f" LIMIT {int(remaining)}" if remaining is not None else ""), params)
+                for rec in cursor:
+                    rows.append({k: v for k, v in zip(_COLUMNS, rec) if v is not None})
+            finally:
+                conn.close()
+        return rows
+
+    def segments(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f for f in os.listdir(self.directory) if f.startswith("sensor-") and f.endswith(".sqlite"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "directory": self.directory,
+                "pending": len(self._pending),
+                "written": self._written,
+                "dropped": self._dropped,
+                "batches": self._batches,
+                "lastError": self._last_error,
+                "segments": len(self.segments()),
+            }
+
+
+sensor_log = SensorLog()
@@ -0,0 +1,457 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Type
+
+import serial
+from serial.serialutil import SerialException
+
+# ESP32 boards reset when the port opens; virtual devices (app.serial_simulator) don't.
+RESET_DELAY_SECONDS = float(os.environ.get("SERIAL_RESET_DELAY_SECONDS", "2"))
+
+# Parses one raw serial line into (key, value), or None if the line carries no reading
+# (normally an app.serial_parser.SerialLineParser).
+LineParser = Callable[[bytes], Optional[Tuple[str, float]]]
+# Called on the reader thread with (port, snapshot) for every complete reading.
+ReadingListener = Callable[[str, "SerialSnapshot"], None]
+
+
+@dataclass(frozen=True)
+class SerialSnapshot:
+    values: Dict[str, float]
+    timestamp: float
+    # When the first value of this reading arrived; timestamp - started_at is its spread.
+    started_at: Optional[float] = None
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.timestamp
+
+
+class Subscription:
+    """Bounded per-client event queue fed by a SerialConnectionManager.
+
+    When the client falls behind, the oldest queued event is dropped so the
+    reader thread never blocks on a slow consumer. Consumers can block a thread
+    with get() or await aget(), which holds no thread while idle.
+    """
+
+    def __init__(self, manager: "SerialConnectionManager", maxsize: int, kinds: Optional[Iterable[str]]) -> None:
+        self._manager = manager
+        self._queue: Deque[Dict[str, Any]] = deque(maxlen=max(1, maxsize))
+        self._cond = threading.Condition()
+        self.kinds = frozenset(kinds) if kinds else None
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+
+        # Set while an aget() is parked on the event loop.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def wants(self, kind: str) -> bool:
+        return self.kinds is None or kind in self.kinds
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Enqueues an event; returns False if an older one had to be dropped."""
+        with self._cond:
+            overflow = len(self._queue) == self._queue.maxlen
+            if overflow:
+                self.dropped += 1
+            self._queue.append(event)
+            self._cond.notify()
+            self._wake_async()
+        return not overflow
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Returns the next event, or None if none arrives within timeout."""
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            if not self._queue:
+                return None
+            self.delivered += 1
+            return self._queue.popleft()
+
+    def drain(self, limit: int) -> List[Dict[str, Any]]:
+        """Pops up to `limit` queued events without waiting."""
+        with self._cond:
+            n = min(limit, len(self._queue))
+            events = [self._queue.popleft() for _ in range(n)]
+            self.delivered += n
+            return events
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Awaits the next event without tying up a thread; None on timeout or close."""
+        with self._cond:
+            if self._queue:
+                self.delivered += 1
+                return self._queue.popleft()
+            if self.closed:
+                return None
+            if self._wakeup is None:
+                self._wakeup = asyncio.Event()
+            self._wakeup.clear()
+            self._loop = asyncio.get_running_loop()
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._loop = None
+
+        with self._cond:
+            if not self._queue:
+                return None
+            self.delivered += 1
+            return self._queue.popleft()
+
+    def _wake_async(self) -> None:
+        # Called with self._cond held, usually from the reader thread.
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # Loop already closed; nobody is waiting any more.
+            self._loop = None
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            self._wake_async()
+        self._manager.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class SerialConnectionManager:
+    """Owns one serial port in a background thread and fans its data out to subscribers.
+
+    The port is opened once (paying the ESP32 reset delay once), lines are parsed
+    continuously, and the connection is re-opened with exponential backoff when the
+    device disappears. Callers either read the cached latest-reading snapshot or
+    subscribe to "line" (raw bytes plus parse result), "reading" and "status" events.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        baudrate: int,
+        parse_line: LineParser,
+        required: Iterable[str],
+        *,
+        timeout: float = 1.0,
+        reset_delay: float = RESET_DELAY_SECONDS,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 30.0,
+    ) -> None:
+        self.port = port
+        self.baudrate = baudrate
+        self.parse_line = parse_line
+        self.required = tuple(required)
+        self.timeout = timeout
+        self.reset_delay = reset_delay
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot: Optional[SerialSnapshot] = None
+        self._partial: Dict[str, float] = {}
+
+        # Copy-on-write so the reader iterates subscribers without holding the lock.
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._peak_subscribers = 0
+        self._published = 0
+        self._dropped = 0
+
+        self._connected = False
+        self._last_error: Optional[str] = None
+        self._reconnects = 0
+        self._lines = 0
+        self._readings = 0
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"serial-reader-{self.port}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+            self._connected = False
+            self._cond.notify_all()
+
+    def latest(
+        self,
+        max_age: Optional[float] = None,
+        accept: Optional[Callable[[SerialSnapshot], bool]] = None,
+    ) -> Optional[SerialSnapshot]:
+        """Returns the newest complete reading, or None if there is none younger than max_age (or accept rejects it)."""
+        with self._cond:
+            snap = self._snapshot
+        if snap is None:
+            return None
+        if max_age is not None and max_age > 0 and snap.age() > max_age:
+            return None
+        if accept is not None and not accept(snap):
+            return None
+        return snap
+
+    def wait_for_reading(
+        self,
+        max_age: Optional[float],
+        timeout: float,
+        accept: Optional[Callable[[SerialSnapshot], bool]] = None,
+    ) -> SerialSnapshot:
+        """Returns a fresh snapshot that accept (if given) approves, waiting up to timeout seconds for one."""
+        deadline = time.time() + max(0.0, timeout)
+        rejected = None
+        with self._cond:
+            while True:
+                snap = self._snapshot
+                if snap is not None and (max_age is None or max_age <= 0 or snap.age() <= max_age):
+                    if accept is None or accept(snap):
+                        return snap
+                    rejected = snap
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+        if rejected is not None:
+            detail = f"latest reading {dict(rejected.values)} was rejected"
+        else:
+            detail = f"last error: {self._last_error}" if self._last_error else "no complete reading yet"
+        raise TimeoutError(
+            f"No sensor reading from {self.port} within max_age={max_age}s ({detail})"
+        )
+
+    def partial(self) -> Dict[str, float]:
+        """Values seen since the last complete reading."""
+        with self._cond:
+            return dict(self._partial)
+
+    def subscribe(self, maxsize: int = 256, kinds: Optional[Iterable[str]] = None) -> Subscription:
+        sub = Subscription(self, maxsize, kinds)
+        with self._cond:
+            self._subscribers = self._subscribers + (sub,)
+            self._peak_subscribers = max(self._peak_subscribers, len(self._subscribers))
+        self.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._cond:
+            if sub in self._subscribers:
+                self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+                self._dropped += sub.dropped
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            snap = self._snapshot
+            subscribers = self._subscribers
+            return {
+                "port": self.port,
+                "baudrate": self.baudrate,
+                "connected": self._connected,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "lastError": self._last_error,
+                "reconnects": self._reconnects,
+                "lines": self._lines,
+                "readings": self._readings,
+                "lastReadingAt": snap.timestamp if snap else None,
+                "subscribers": len(subscribers),
+                "peakSubscribers": self._peak_subscribers,
+                "publishedEvents": self._published,
+                "droppedEvents": self._dropped + sum(sub.dropped for sub in subscribers),
+                "parser": self.parse_line.stats() if hasattr(self.parse_line, "stats") else None,
+            }
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        kind = event["type"]
+        delivered = 0
+        for sub in self._subscribers:
+            if sub.wants(kind):
+                sub.offer(event)
+                delivered += 1
+        if delivered:
+            with self._cond:
+                self._published += 1
+
+    def _set_connection(self, connected: bool, error: Optional[str] = None) -> None:
+        with self._cond:
+            changed = self._connected != connected or (error is not None and error != self._last_error)
+            self._connected = connected
+            if error is not None or connected:
+                self._last_error = error
+        if changed:
+            self._publish({
+                "type": "status",
+                "connected": connected,
+                "error": error,
+                "port": self.port,
+                "baudrate": self.baudrate,
+                "timestamp": time.time(),
+            })
+
+    # --- Reader thread ---
+
+    def _run(self) -> None:
+        backoff = self.backoff_initial
+        while not self._stop.is_set():
+            ser = None
+            try:
+                ser = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+                if self.reset_delay > 0 and self._stop.wait(self.reset_delay):
+                    break
+                self._set_connection(True)
+                self._read_until_error(ser)
+                backoff = self.backoff_initial
+            except (SerialException, OSError) as e:
+                self._set_connection(False, str(e))
+            finally:
+                if self._connected:
+                    self._set_connection(False)
+                if ser is not None:
+                    try:
+                        ser.close()
+                    except Exception:
+                        pass
+
+            if self._stop.wait(backoff):
+                break
+            with self._cond:
+                self._reconnects += 1
+            backoff = min(self.backoff_max, backoff * 2)
+
+    def _read_until_error(self, ser: serial.Serial) -> None:
+        started_at: Optional[float] = None
+        with self._cond:
+            self._partial = {}
+        while not self._stop.is_set():
+            raw = ser.readline()
+            if not raw:
+                continue
+
+            now = time.time()
+            parsed = self.parse_line(raw)
+            with self._cond:
+                self._lines += 1
+            self._publish({"type": "line", "raw": raw, "parsed": parsed, "timestamp": now})
+            if parsed is None:
+                continue
+
+            key, value = parsed
+            if started_at is None:
+                started_at = now
+            with self._cond:
+                self._partial[key] = value
+                if not all(k in self._partial for k in self.required):
+                    continue
+                values = {k: self._partial[k] for k in self.required}
+                self._partial = {}
+            self._emit_reading(SerialSnapshot(values=values, timestamp=now, started_at=started_at))
+            started_at = None
+
+    def _emit_reading(self, snap: SerialSnapshot, **extra: Any) -> None:
+        """Caches a complete reading and hands it to subscribers and listeners."""
+        with self._cond:
+            self._snapshot = snap
+            self._readings += 1
+            self._cond.notify_all()
+        self._publish({"type": "reading", "values": dict(snap.values), "timestamp": snap.timestamp, **extra})
+        for listener in _reading_listeners:
+            try:
+                listener(self.port, snap)
+            except Exception:
+                pass  # A broken sink must not stop the reader.
+
+
+_managers: Dict[str, SerialConnectionManager] = {}
+_managers_lock = threading.Lock()
+_reading_listeners: Tuple[ReadingListener, ...] = ()
+
+
+def add_reading_listener(listener: ReadingListener) -> None:
+    """Registers a sink (history, persistence, ...) fed by every port's readings."""
+    global _reading_listeners
+    with _managers_lock:
+        if listener not in _reading_listeners:
+            _reading_listeners = _reading_listeners + (listener,)
+
+
+def get_manager(
+    port: str,
+    baudrate: int,
+    parse_line: LineParser,
+    required: Iterable[str],
+    *,
+    manager_cls: Type[SerialConnectionManager] = SerialConnectionManager,
+    **kwargs: Any,
+) -> SerialConnectionManager:
+    """Returns the started manager owning `port`, creating it on first use.
+
+    There is one manager per port, so every stream on a port is served by a
+    single reader. Later callers must ask for the same baudrate, parser type,
+    required keys and `manager_cls` (the reader implementation, e.g.
+    app.modbus_npk.ModbusNpkPoller); a port already read for something else
+    raises RuntimeError rather than handing out readings built for other keys.
+    """
+    required = tuple(required)
+    with _managers_lock:
+        manager = _managers.get(port)
+        if manager is None:
+            manager = manager_cls(port, baudrate, parse_line, required, **kwargs)
+            _managers[port] = manager
+        elif manager.baudrate != baudrate:
+            raise RuntimeError(
+                f"Serial port {port} is already in use at {manager.baudrate} baud (requested {baudrate})"
+            )
+        elif (
+            type(manager) is not manager_cls
+            or type(manager.parse_line) is not type(parse_line)
+            or set(manager.required) != set(required)
+        ):
+            raise RuntimeError(
+                f"Serial port {port} is already in use by a {type(manager).__name__} reading "
+                f"{', '.join(manager.required)} (requested {', '.join(required)})"
+            )
+    manager.start()
+    return manager
+
+
+def manager_metrics() -> Dict[str, Dict[str, Any]]:
+    with _managers_lock:
+        managers = list(_managers.values())
+    return {m.port: m.status() for m in managers}
+
+
+def stop_all_managers() -> None:
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.stop()
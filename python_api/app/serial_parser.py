@@ -0,0 +1,67 @@
+"""Table-driven parser for the ESP32 and NPK serial text protocols.
+
+Every reader (read_sensor_once, read_npk_once and the port hubs behind the
+SSE streams) parses raw serial bytes with a SerialLineParser built from
+LINE_PATTERNS, so there is one definition of the line format.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+# keyword as printed by the firmware -> (output key, value transform)
+LINE_PATTERNS: Dict[bytes, Tuple[str, Callable[[float], float]]] = {
+    # ESP32 board (see serial_reader.REQUIRED)
+    b"DS18B20 Temperature": ("soil_temp", float),
+    b"Soil Moisture Value": ("soil_moisture", lambda raw: (raw / 4095) * 100),  # 12-bit ADC -> %
+    b"DHT11 Temperature": ("air_temp", float),
+    b"DHT11 Humidity": ("air_humidity", float),
+    # NPK microcontroller (see npk_serial_reader.NPK_KEYS)
+    b"Nitrogen": ("nitrogenN", float),
+    b"Phosphorus": ("phosphorusP", float),
+    b"Potassium": ("potassiumK", float),
+}
+
+
+def _compile(patterns: Dict[bytes, Tuple[str, Callable[[float], float]]]) -> "re.Pattern[bytes]":
+    # Longest keywords first so overlapping names can't shadow each other.
+    keywords = sorted(patterns, key=len, reverse=True)
+    alternation = b"|".join(re.escape(k) for k in keywords)
+    # keyword, anything up to ':', then an optional number (absent => malformed line).
+    return re.compile(b"(" + alternation + rb")[^:\r\n]*:\s*([-+]?\d+(?:\.\d*)?)?")
+
+
+class SerialLineParser:
+    """Parses raw serial lines into (key, value) using one compiled pattern.
+
+    Works on bytes without decoding, and counts lines that carry a known
+    keyword but no parseable value instead of silently skipping them.
+    """
+
+    def __init__(self, patterns: Optional[Dict[bytes, Tuple[str, Callable[[float], float]]]] = None) -> None:
+        self.patterns = dict(patterns or LINE_PATTERNS)
+        self._regex = _compile(self.patterns)
+        self._search = self._regex.search
+        self.lines = 0
+        self.parsed = 0
+        self.malformed = 0
+
+    def __call__(self, raw: bytes) -> Optional[Tuple[str, float]]:
+        return self.parse(raw)
+
+    def parse(self, raw: bytes) -> Optional[Tuple[str, float]]:
+        self.lines += 1
+        m = self._search(raw)
+        if m is None:
+            return None
+        number = m.group(2)
+        if number is None:
+            self.malformed += 1
+            return None
+        key, transform = self.patterns[m.group(1)]
+        self.parsed += 1
+        return key, transform(float(number))
+
+    def stats(self) -> Dict[str, int]:
+        return {"lines": self.lines, "parsed": self.parsed, "malformed": self.malformed}
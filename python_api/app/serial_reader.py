@@ -1,46 +1,55 @@
+import os
 import serial
 import time
 
-PORT = "COM3"
-BAUDRATE = 115200
+from app.serial_manager import RESET_DELAY_SECONDS, get_manager
+from app.serial_parser import SerialLineParser
 
-def read_sensor_once():
-    sensor_data = {}
+PORT = os.environ.get("SENSOR_PORT", "COM3")
+BAUDRATE = int(os.environ.get("SENSOR_BAUDRATE", "115200"))
+
+# A cached reading older than this is treated as missing.
+MAX_AGE_SECONDS = float(os.environ.get("SENSOR_MAX_AGE_SECONDS", "10"))
+# How long a request may wait for the first reading after the reader starts.
+WAIT_SECONDS = float(os.environ.get("SENSOR_WAIT_SECONDS", "5"))
+
+REQUIRED = ["soil_temp", "soil_moisture", "air_temp", "air_humidity"]
 
-    ser = serial.Serial(PORT, BAUDRATE, timeout=1)
-    time.sleep(2)  # Allow ESP32 to reset
 
-    required = ["soil_temp", "soil_moisture", "air_temp", "air_humidity"]
+def read_sensor_once(port=None, baudrate=None):
+    sensor_data = {}
+
+    ser = serial.Serial(port or PORT, baudrate or BAUDRATE, timeout=1)
+    time.sleep(RESET_DELAY_SECONDS)  # Allow ESP32 to reset
 
-    print("📡 Waiting for ESP32 sensor readings...")
+    parser = SerialLineParser()
 
     while True:
         raw = ser.readline()
         if not raw:
             continue
 
-        try:
-            line = raw.decode("utf-8").strip()
-        except:
-            continue
+        parsed = parser.parse(raw)
+        if parsed is not None and parsed[0] in REQUIRED:
+            sensor_data[parsed[0]] = parsed[1]
 
-        print("Serial:", line)
+        # If we collected all required values
+        if all(k in sensor_data for k in REQUIRED):
+            ser.close()
+            return sensor_data
 
-        # Parse lines
-        if "DS18B20 Temperature" in line:
-            sensor_data["soil_temp"] = float(line.split(":")[1].replace("°C", "").strip())
 
-        elif "Soil Moisture Value" in line:
-            raw_value = float(line.split(":")[1].strip())
-            sensor_data["soil_moisture"] = (raw_value / 4095) * 100
+def sensor_manager():
+    """Returns the background reader that owns the ESP32 port."""
+    return get_manager(PORT, BAUDRATE, SerialLineParser(), REQUIRED)
 
-        elif "DHT11 Temperature" in line:
-            sensor_data["air_temp"] = float(line.split(":")[1].replace("°C", "").strip())
 
-        elif "DHT11 Humidity" in line:
-            sensor_data["air_humidity"] = float(line.split(":")[1].replace("%", "").strip())
+def read_sensor_latest(max_age=None, wait=None):
+    """Returns the cached ESP32 reading without touching the port.
 
-        # If we collected all required values
-        if all(k in sensor_data for k in required):
-            ser.close()
-            return sensor_data
+    Raises TimeoutError if no reading younger than max_age arrives within wait seconds.
+    """
+    max_age = MAX_AGE_SECONDS if max_age is None else max_age
+    wait = WAIT_SECONDS if wait is None else wait
+    snap = sensor_manager().wait_for_reading(max_age=max_age, timeout=wait)
+    return dict(snap.values)
@@ -0,0 +1,278 @@
+"""Virtual serial devices for load and latency testing (POSIX only).
+
+A SerialSimulator opens a pseudo-terminal and writes the ESP32 or NPK text
+protocol to it, so every reader can be pointed at `simulator.port`
+(e.g. /dev/pts/3) instead of COM3/COM7:
+
+    python -m app.serial_simulator --profile npk --rate 30
+
+ModbusSlaveSimulator answers Modbus RTU register reads like RS-485 NPK probes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import errno
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def _esp32_frame(rng: random.Random, seq: int) -> List[str]:
+    return [
+        f"DS18B20 Temperature: {rng.uniform(22, 32):.2f} °C",
+        f"Soil Moisture Value: {rng.randint(900, 3500)}",
+        f"DHT11 Temperature: {rng.uniform(24, 36):.1f}°C",
+        # The last value of a frame carries the sequence number when encode_seq is on.
+        f"DHT11 Humidity: {seq}%",
+    ]
+
+
+def _npk_frame(rng: random.Random, seq: int) -> List[str]:
+    return [
+        f"Nitrogen: {rng.randint(20, 120)}",
+        f"Phosphorus: {rng.randint(5, 60)}",
+        f"Potassium: {seq}",
+    ]
+
+
+PROFILES: Dict[str, Callable[[random.Random, int], List[str]]] = {
+    "esp32": _esp32_frame,
+    "npk": _npk_frame,
+}
+
+
+@dataclass
+class SimulatorConfig:
+    profile: str = "npk"
+    line_rate: float = 20.0  # lines per second
+    jitter: float = 0.0  # +/- fraction of the line period
+    partial_rate: float = 0.0  # probability a line is cut short (frame stays incomplete)
+    split_rate: float = 0.0  # probability a line is written in two chunks
+    garbage_rate: float = 0.0  # probability of a burst of random bytes between lines
+    encode_seq: bool = True  # put the frame number in the last field (see frame_sent_at)
+    seed: int = 0
+
+
+class SerialSimulator:
+    """Emulates one ESP32/NPK device on a pty at a configurable line rate."""
+
+    def __init__(self, config: Optional[SimulatorConfig] = None) -> None:
+        self.config = config or SimulatorConfig()
+        if self.config.profile not in PROFILES:
+            raise ValueError(f"Unknown profile '{self.config.profile}'. Allowed: {', '.join(PROFILES)}")
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sent_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+        self.frames = 0
+        self.lines = 0
+        self.overruns = 0
+
+    def start(self) -> "SerialSimulator":
+        self._thread = threading.Thread(target=self._run, name=f"serial-sim-{self.port}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self) -> "SerialSimulator":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def frame_sent_at(self, seq: int) -> Optional[float]:
+        """Time the last line of frame `seq` was written (requires encode_seq)."""
+        with self._lock:
+            return self._sent_at.get(seq)
+
+    def _write(self, data: bytes) -> None:
+        try:
+            os.write(self._master, data)
+        except OSError as e:
+            # Nobody is draining the port; a real device would overrun too.
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+            self.overruns += 1
+
+    def _run(self) -> None:
+        cfg = self.config
+        rng = random.Random(cfg.seed)
+        make_frame = PROFILES[cfg.profile]
+        period = 1.0 / cfg.line_rate if cfg.line_rate > 0 else 0.0
+        next_at = time.perf_counter()
+        seq = 0
+
+        while not self._stop.is_set():
+            seq += 1
+            lines = make_frame(rng, seq % 100000 if cfg.encode_seq else rng.randint(0, 100))
+            for i, line in enumerate(lines):
+                if self._stop.is_set():
+                    return
+                data = (line + "\r\n").encode("utf-8")
+                if cfg.partial_rate and rng.random() < cfg.partial_rate:
+                    data = data[: rng.randint(1, max(1, len(data) - 3))] + b"\r\n"
+                if cfg.garbage_rate and rng.random() < cfg.garbage_rate:
+                    self._write(bytes(rng.getrandbits(8) for _ in range(rng.randint(1, 16))))
+
+                if cfg.split_rate and rng.random() < cfg.split_rate:
+                    cut = rng.randint(1, len(data) - 1)
+                    self._write(data[:cut])
+                    time.sleep(min(period / 2, 0.005) if period else 0.001)
+                    self._write(data[cut:])
+                else:
+                    self._write(data)
+                self.lines += 1
+
+                if i == len(lines) - 1 and cfg.encode_seq:
+                    with self._lock:
+                        self._sent_at[seq % 100000] = time.time()
+                        self._sent_at.pop((seq - 1000) % 100000, None)
+
+                if period:
+                    jitter = rng.uniform(-cfg.jitter, cfg.jitter) * period if cfg.jitter else 0.0
+                    next_at += period + jitter
+                    delay = next_at - time.perf_counter()
+                    if delay > 0 and self._stop.wait(delay):
+                        return
+            self.frames += 1
+
+
+class ModbusSlaveSimulator:
+    """Answers Modbus RTU read-register requests for one or more slave ids on a pty."""
+
+    def __init__(
+        self,
+        registers: Optional[Dict[int, int]] = None,
+        *,
+        slave_ids: Tuple[int, ...] = (1,),
+        response_delay: float = 0.0,
+        drop_rate: float = 0.0,
+        corrupt_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        from app.modbus_npk import DEFAULT_REGISTER_MAP
+
+        self.registers = registers or {addr: 40 + i * 10 for i, addr in enumerate(DEFAULT_REGISTER_MAP.values())}
+        self.slave_ids = slave_ids
+        self.response_delay = response_delay
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self._rng = random.Random(seed)
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+
+    def start(self) -> "ModbusSlaveSimulator":
+        self._thread = threading.Thread(target=self._run, name=f"modbus-sim-{self.port}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self) -> "ModbusSlaveSimulator":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        from app.modbus_npk import crc16
+
+        buf = b""
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                buf = b""  # Inter-frame silence: drop any partial request.
+                continue
+            try:
+                buf += os.read(self._master, 256)
+            except OSError:
+                return
+            while len(buf) >= 8:
+                frame, buf = buf[:8], buf[8:]
+                slave_id, function, start, count = struct.unpack(">BBHH", frame[:6])
+                if struct.unpack("<H", frame[6:])[0] != crc16(frame[:6]) or slave_id not in self.slave_ids:
+                    continue
+                self.requests += 1
+                if self.drop_rate and self._rng.random() < self.drop_rate:
+                    continue
+                values = [self.registers.get(start + i, 0) for i in range(count)]
+                pdu = struct.pack(f">BBB{count}H", slave_id, function, 2 * count, *values)
+                crc = crc16(pdu)
+                if self.corrupt_rate and self._rng.random() < self.corrupt_rate:
+                    crc ^= 0xFFFF
+                if self.response_delay:
+                    time.sleep(self.response_delay)
+                os.write(self._master, pdu + struct.pack("<H", crc))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a virtual ESP32/NPK serial device on a pty")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="npk")
+    parser.add_argument("--rate", type=float, default=20.0, help="lines per second")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--partial-rate", type=float, default=0.0)
+    parser.add_argument("--split-rate", type=float, default=0.0)
+    parser.add_argument("--garbage-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    sim = SerialSimulator(
+        SimulatorConfig(
+            profile=args.profile,
+            line_rate=args.rate,
+            jitter=args.jitter,
+            partial_rate=args.partial_rate,
+            split_rate=args.split_rate,
+            garbage_rate=args.garbage_rate,
+            encode_seq=False,
+        )
+    ).start()
+    print(f"Simulating {args.profile} on {sim.port} (Ctrl+C to stop)")
+    env = "NPK_PORT" if args.profile == "npk" else "SENSOR_PORT"
+    print(f"Point the API at it with: {env}={sim.port} SERIAL_RESET_DELAY_SECONDS=0")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
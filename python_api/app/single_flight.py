@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one computation.
+
+    The first caller starts the computation as its own task; callers that
+    arrive while it runs await the same task. A caller that disconnects only
+    stops waiting, the computation keeps going for the others. Nothing is
+    cached once the task finishes.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.calls = 0
+        self.computations = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.peak_waiters = 0
+        # Callers awaiting each task right now; keyed by task, as a key can start a new flight
+        # before the last waiters of its previous one have woken up.
+        self._waiters: Dict["asyncio.Task[Any]", int] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.computations += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        else:
+            self.coalesced += 1
+
+        self._waiters[task] += 1
+        self.peak_waiters = max(self.peak_waiters, self._waiters[task])
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task in self._waiters:
+                self._waiters[task] -= 1
+
+    def _done(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self._waiters.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "computations": self.computations,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "inFlight": len(self._inflight),
+            "waiters": sum(self._waiters.values()),
+            "peakWaiters": self.peak_waiters,
+        }
@@ -1,31 +1,238 @@
+import asyncio
 import json
+import os
 import time
-from app.serial_reader import read_sensor_once
+from starlette.concurrency import run_in_threadpool
+from app.serial_reader import MAX_AGE_SECONDS, REQUIRED, sensor_manager
 from app.predictor import predict_top3
 
+# Minimum change of an input (in its own unit) before the recommendation is re-scored.
+DEFAULT_DEADBANDS = {
+    "soil_temp": 0.2,
+    "soil_moisture": 0.5,
+    "air_temp": 0.2,
+    "air_humidity": 1.0,
+}
+# Seconds without a new result before clients get an "unchanged" heartbeat.
+HEARTBEAT_SECONDS = float(os.environ.get("LIVE_HEARTBEAT_SECONDS", "10"))
 
-def stream_generator(growth_stage, purpose, interval=2):
-    """
-    Generates live prediction results continuously every interval seconds.
+
+def _deadbands_from_env():
+    """Parses LIVE_DEADBANDS="soil_temp=0.2,air_humidity=1" over the defaults."""
+    deadbands = dict(DEFAULT_DEADBANDS)
+    for part in os.environ.get("LIVE_DEADBANDS", "").split(","):
+        key, _, value = part.partition("=")
+        if key.strip() and value.strip():
+            deadbands[key.strip()] = float(value)
+    return deadbands
+
+
+DEADBANDS = _deadbands_from_env()
+
+
+def _sse(event, data):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def moved_inputs(previous, current, deadbands=None):
+    """Returns the inputs of `current` that moved past their deadband since `previous`."""
+    deadbands = DEADBANDS if deadbands is None else deadbands
+    return {
+        k: current[k]
+        for k in REQUIRED
+        if k in current and (k not in previous or abs(current[k] - previous[k]) > deadbands.get(k, 0.0))
+    }
+
+
+class LiveRecommendationChannel:
+    """One shared live recommendation for a (growth stage, purpose) pair.
+
+    A single task follows the ESP32 hub and re-runs predict_top3 only when an
+    input moves past its deadband (compared with the inputs of the last
+    scoring, so slow drift still adds up). Each result gets a version number
+    and its SSE frames are encoded once; every client of the channel just
+    picks up the frame for the version it has not seen yet.
     """
-    while True:
+
+    def __init__(self, growth_stage, purpose, *, interval=2, max_age=None, deadbands=None):
+        self.key = (growth_stage, purpose, interval, max_age)
+        self.growth_stage = growth_stage
+        self.purpose = purpose
+        self.interval = interval
+        self.max_age = MAX_AGE_SECONDS if max_age is None else max_age
+        self.deadbands = DEADBANDS if deadbands is None else deadbands
+
+        self.version = 0
+        self.clients = 0
+        self.readings = 0
+        self.rescored = 0
+        self.skipped = 0
+
+        self._scored_inputs = None
+        self._predictions = None
+        self._error = None
+        self._full_frame = None
+        self._delta_frame = None
+        self._changed = asyncio.Event()
+        self._task = None
+
+    # --- Clients ---
+
+    def join(self):
+        self.clients += 1
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def leave(self):
+        self.clients -= 1
+        if self.clients <= 0 and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def frame_for(self, seen):
+        """The frame that brings a client from version `seen` to the current one."""
+        if seen == self.version - 1 and self._delta_frame is not None:
+            return self._delta_frame
+        return self._full_frame
+
+    async def wait_for_change(self, seen, timeout):
+        """Waits until the version moves past `seen`; False on timeout."""
+        if self.version != seen:
+            return True
         try:
-            sensor_data = read_sensor_once()
-            predictions = predict_top3(sensor_data, growth_stage, purpose)
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def stats(self):
+        return {
+            "growthStage": self.growth_stage,
+            "purpose": self.purpose,
+            "clients": self.clients,
+            "version": self.version,
+            "readings": self.readings,
+            "rescored": self.rescored,
+            "skipped": self.skipped,
+            "error": self._error,
+        }
 
-            payload = {
-                "sensor_data": sensor_data,
-                "predictions": predictions,
-                "timestamp": time.time(),
-            }
+    # --- Scoring ---
 
-            # SSE format: "data: ....\n\n"
-            yield f"data: {json.dumps(payload)}\n\n"
+    def _publish(self, full_frame, delta_frame=None):
+        self.version += 1
+        self._full_frame = full_frame
+        self._delta_frame = delta_frame
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _publish_error(self, message):
+        if message == self._error:
+            return
+        self._error = message
+        self._scored_inputs = None
+        self._predictions = None
+        self._publish(_sse("error", {"error": message, "timestamp": time.time(), "version": self.version + 1}))
+
+    async def _score(self, values):
+        moved = moved_inputs(self._scored_inputs, values, self.deadbands) if self._scored_inputs else None
+        if moved is not None and not moved:
+            self.skipped += 1
+            return
+
+        try:
+            predictions = await run_in_threadpool(predict_top3, values, self.growth_stage, self.purpose, "stream")
         except Exception as e:
-            # Don't crash the server if the serial port isn't available.
-            payload = {"error": str(e), "timestamp": time.time()}
-            yield f"event: error\ndata: {json.dumps(payload)}\n\n"
-            time.sleep(interval)
-            continue
+            # Don't crash the stream if the models aren't available.
+            self._publish_error(str(e))
+            return
+        self.rescored += 1
+
+        now = time.time()
+        version = self.version + 1
+        full = {"sensor_data": values, "predictions": predictions, "timestamp": now, "version": version}
+
+        delta_frame = None
+        if moved is not None and self._predictions is not None:
+            delta = {"version": version, "timestamp": now, "sensor_data": moved}
+            changed = [p for p, old in zip(predictions, self._predictions) if p != old]
+            if changed:
+                delta["predictions"] = changed
+            delta_frame = _sse("delta", delta)
+
+        self._error = None
+        self._scored_inputs = dict(values)
+        self._predictions = predictions
+        self._publish(_sse(None, full), delta_frame)
+
+    async def _run(self):
+        hub = sensor_manager()
+        with hub.subscribe(maxsize=4, kinds=("reading",)) as sub:
+            snap = hub.latest(max_age=self.max_age)
+            if snap is not None:
+                values = dict(snap.values)
+            else:
+                # Give a reader that was just started up to max_age for its first reading.
+                first = await sub.aget(timeout=self.max_age if self.max_age and self.max_age > 0 else None)
+                values = dict(first["values"]) if first is not None else None
+
+            while True:
+                if values is None:
+                    self._publish_error(f"No sensor reading from {hub.port} within {self.max_age}s")
+                else:
+                    self.readings += 1
+                    await self._score(values)
+
+                # Coalesce readings that arrive within the interval into the newest one.
+                scored_at = time.time()
+                wait = max(self.interval, self.max_age) if self.max_age and self.max_age > 0 else None
+                event = await sub.aget(timeout=wait)
+                while event is not None:
+                    remaining = self.interval - (time.time() - scored_at)
+                    if remaining <= 0:
+                        break
+                    newer = await sub.aget(timeout=remaining)
+                    if newer is None:
+                        break
+                    event = newer
+                values = dict(event["values"]) if event is not None else None
+
+
+_channels = {}
+
+
+def live_metrics():
+    return [channel.stats() for channel in _channels.values()]
+
+
+async def stream_generator(growth_stage, purpose, interval=2, max_age=None, heartbeat=None):
+    """
+    Generates live prediction results from the shared ESP32 reader.
+
+    Clients with the same growth stage and purpose share one channel, so the
+    model runs once per input change however many are connected. The first
+    message is the full result; after that a "delta" event carries only the
+    inputs and ranks that changed, and an "unchanged" heartbeat is sent when
+    nothing moved past the deadband for `heartbeat` seconds.
+    """
+    key = (growth_stage, purpose, interval, max_age)
+    channel = _channels.get(key)
+    if channel is None:
+        channel = _channels[key] = LiveRecommendationChannel(growth_stage, purpose, interval=interval, max_age=max_age)
+    heartbeat = HEARTBEAT_SECONDS if heartbeat is None else heartbeat
 
-        time.sleep(interval)
+    channel.join()
+    try:
+        seen = 0
+        while True:
+            if await channel.wait_for_change(seen, heartbeat):
+                frame = channel.frame_for(seen)
+                seen = channel.version
+                yield frame
+            else:
+                yield _sse("unchanged", {"version": seen, "timestamp": time.time()})
+    finally:
+        channel.leave()
+        if channel.clients <= 0 and _channels.get(key) is channel:
+            del _channels[key]
@@ -0,0 +1,88 @@
+"""Cost of Monte Carlo forecast bands vs. number of sample paths K.
+
+Run from python_api/:  python -m benchmarks.forecast_bands_bench [--samples 1,10,100,1000] [--horizon 30] [--stub]
+
+Uses the real LSTM/XGB models when TensorFlow and xgboost are installed,
+otherwise (or with --stub) the NumPy stand-ins from benchmarks.stub_models.
+The history preprocessing is done once and reported separately; each K row
+times the batched rollout only, next to K one-path rollouts extrapolated
+from a single scalar rollout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.pricedemand_service import (
+    PriceDemandModels,
+    _forecast_frames,
+    _lstm_window,
+    predict_demand_future_enhanced,
+    predict_demand_paths,
+    predict_price_future_enhanced,
+    predict_price_paths,
+    sample_seed_windows,
+)
+from benchmarks.stub_models import stub_price_demand_models
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", default="1,10,50,100,500,1000")
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--region", default="North")
+    parser.add_argument("--stub", action="store_true", help="use the NumPy stand-in models")
+    args = parser.parse_args()
+
+    models = None
+    if not args.stub:
+        try:
+            models = PriceDemandModels.load()
+            kind = "real"
+        except Exception as e:
+            print(f"real models unavailable ({type(e).__name__}: {e}); using stubs")
+    if models is None:
+        models = stub_price_demand_models()
+        kind = "stub"
+
+    lstm_cols = list(models.feature_cols_lstm)
+    xgb_cols = list(models.feature_cols_xgb)
+
+    t0 = time.perf_counter()
+    df_mm, df_std = _forecast_frames(args.region, 42.0, 18.0, 33.0, models)
+    prep = time.perf_counter() - t0
+
+    start = pd.Timestamp(date.today() + timedelta(days=1))
+    dates = [start + pd.Timedelta(days=i) for i in range(args.horizon)]
+
+    t0 = time.perf_counter()
+    prices, _ = predict_price_future_enhanced(df_mm, models.lstm, lstm_cols, start, n_steps=args.horizon, window_size=models.window_size)
+    predict_demand_future_enhanced(df_std, models.xgb, xgb_cols, prices, dates)
+    scalar = time.perf_counter() - t0
+
+    print(f"models           : {kind}, horizon {args.horizon} days, region {args.region}")
+    print(f"history prep     : {prep * 1000:.1f} ms (cached until the dataset changes)")
+    print(f"one scalar path  : {scalar * 1000:.1f} ms")
+    print(f"{'K':>6} {'batched ms':>11} {'ms/path':>9} {'K scalar ms':>12} {'speed-up':>9}")
+
+    seed = _lstm_window(df_mm, lstm_cols, models.window_size)
+    for k in (int(v) for v in args.samples.split(",") if v.strip()):
+        rng = np.random.default_rng(0)
+        t0 = time.perf_counter()
+        seqs = sample_seed_windows(seed, lstm_cols, k, rng)
+        price_paths = predict_price_paths(seqs, models.lstm, lstm_cols, dates)
+        predict_demand_paths(df_std, models.xgb, xgb_cols, price_paths, dates)
+        batched = time.perf_counter() - t0
+        print(
+            f"{k:>6} {batched * 1000:>11.1f} {batched * 1000 / k:>9.3f} "
+            f"{scalar * k * 1000:>12.0f} {scalar * k / batched:>8.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
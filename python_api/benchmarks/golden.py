@@ -0,0 +1,469 @@
+"""Golden-output parity and latency checks for the recommendation and forecasting paths.
+
+Run from python_api/:  python -m benchmarks.golden [--engine NAME | module:attr ...] [--record] [--no-timing]
+
+benchmarks/golden_outputs.json holds the reference outputs of four stages:
+
+    preprocess  cleaned, scaled and featured history (the rows the rollouts read)
+    price       predict_price_future_enhanced
+    demand      predict_demand_future_enhanced, fed the reference prices
+    top3        predict_top3_with
+
+The cases are fixed: a synthetic price/demand CSV from a seeded generator, the
+real scalers/encoders/feature lists and the stub models of
+benchmarks.stub_models, so everything runs offline without TensorFlow or
+xgboost. Each engine runs every case, and each stage gets its inputs from the
+reference engine, so every stage is judged on its own. A stage passes when:
+- its outputs match the golden ones within the stage's tolerance;
+- its best-of-N time is within the latency budget;
+- where the engine declares a minimum speed-up, it beats the reference
+  engine's time in the same run by at least that factor.
+Without --engine every built-in engine is checked. An alternative
+implementation is an Engine with the stages it replaces; the stages it
+leaves out are skipped. --record rewrites the golden file from the reference
+engine; do it only when the results are meant to change.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.price_demand_history import PriceDemandHistory
+from app.pricedemand_service import (
+    _DEMAND_HISTORY,
+    REGIONS,
+    PriceDemandModels,
+    _ensure_columns_zero,
+    _featured_history,
+    _lstm_window,
+    clean_price_demand_rows,
+    predict_demand_future_enhanced,
+    predict_demand_paths,
+    predict_price_future_enhanced,
+    predict_price_paths,
+)
+from app.predictor import predict_top3_with
+from benchmarks.stub_models import stub_price_demand_models, stub_recommendation_models
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_outputs.json")
+
+# Changing any of these changes the cases: re-record.
+CONFIG = {
+    "seed": 0,
+    "syntheticDays": 400,
+    "syntheticStart": "2024-01-01",
+    "horizonDays": 30,
+    # region, N, P, K (None: no sensor reading injected)
+    "forecastCases": [["North", 42.0, 18.0, 33.0], ["East", None, None, None], ["Central", 510.0, 6.5, 9.0]],
+    "top3Cases": 40,
+}
+
+
+@dataclass(frozen=True)
+class Tolerance:
+    rtol: float
+    atol: float
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    tolerance: Tolerance
+    budget_ms: float  # Best-of-N time for all of the stage's cases, stub models.
+
+
+STAGES: Dict[str, Stage] = {
+    "preprocess": Stage("preprocess", Tolerance(rtol=1e-9, atol=1e-9), budget_ms=1500.0),
+    # The LSTM stub returns float32, like the real model.
+    "price": Stage("price", Tolerance(rtol=1e-6, atol=1e-4), budget_ms=500.0),
+    "demand": Stage("demand", Tolerance(rtol=1e-9, atol=1e-7), budget_ms=20_000.0),
+    # Yield and confidence are rounded to 2 decimals; names and ranks must match exactly.
+    "top3": Stage("top3", Tolerance(rtol=0.0, atol=0.01), budget_ms=1500.0),
+}
+
+
+@dataclass(frozen=True)
+class Engine:
+    """One implementation of some or all stages.
+
+    preprocess(dataset_path, region, models) -> (df_mm, df_std)
+    price(df_mm, models, start, horizon_days) -> prices
+    demand(df_std, models, prices, dates) -> demand
+    top3(models, sensor_data, growth_stage, purpose) -> predict_top3 rows
+    """
+
+    name: str
+    preprocess: Optional[Callable[..., Tuple[pd.DataFrame, pd.DataFrame]]] = None
+    price: Optional[Callable[..., Sequence[float]]] = None
+    demand: Optional[Callable[..., Sequence[float]]] = None
+    top3: Optional[Callable[..., List[Dict[str, Any]]]] = None
+    tolerances: Dict[str, Tolerance] = field(default_factory=dict)
+    budgets_ms: Dict[str, float] = field(default_factory=dict)
+    min_speedup: Dict[str, float] = field(default_factory=dict)
+
+    def stage(self, name: str) -> Optional[Callable[..., Any]]:
+        return getattr(self, name)
+
+
+# --- Built-in engines ---
+
+
+def _full_preprocess(dataset_path: str, region: str, models: PriceDemandModels) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """The whole file through the chain, as load_dataset() + _featured_history()."""
+    return _featured_history(clean_price_demand_rows(pd.read_csv(dataset_path)), region, models)
+
+
+def _tail_preprocess(dataset_path: str, region: str, models: PriceDemandModels) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # A fresh history each time: the cold cost (first request after start-up), not a cache hit.
+    return PriceDemandHistory(dataset_path).frames(models, region)
+
+
+def _scalar_price(df_mm: pd.DataFrame, models: PriceDemandModels, start: pd.Timestamp, horizon_days: int) -> List[float]:
+    prices, _ = predict_price_future_enhanced(
+        df_mm, models.lstm, list(models.feature_cols_lstm), start, n_steps=horizon_days, window_size=models.window_size
+    )
+    return prices
+
+
+def _scalar_demand(df_std: pd.DataFrame, models: PriceDemandModels, prices: Sequence[float], dates: List[pd.Timestamp]) -> List[float]:
+    return predict_demand_future_enhanced(df_std, models.xgb, list(models.feature_cols_xgb), list(prices), dates)
+
+
+def _batched_price(df_mm: pd.DataFrame, models: PriceDemandModels, start: pd.Timestamp, horizon_days: int) -> np.ndarray:
+    seq = _lstm_window(df_mm, list(models.feature_cols_lstm), models.window_size)
+    dates = [start + pd.Timedelta(days=i) for i in range(horizon_days)]
+    return predict_price_paths(seq[None, :, :], models.lstm, list(models.feature_cols_lstm), dates)[0]
+
+
+def _batched_demand(df_std: pd.DataFrame, models: PriceDemandModels, prices: Sequence[float], dates: List[pd.Timestamp]) -> np.ndarray:
+    return predict_demand_paths(df_std, models.xgb, list(models.feature_cols_xgb), np.asarray(prices)[None, :], dates)[0]
+
+
+REFERENCE = Engine(
+    "reference",
+    preprocess=_full_preprocess,
+    price=_scalar_price,
+    demand=_scalar_demand,
+    top3=predict_top3_with,
+)
+# What /api/forecasting serves since the history tail is cached (app.price_demand_history).
+TAIL = Engine("tail", preprocess=_tail_preprocess, budgets_ms={"preprocess": 750.0})
+# The Monte Carlo rollouts of forecast_bands with a single path.
+BATCHED = Engine(
+    "batched",
+    price=_batched_price,
+    demand=_batched_demand,
+    tolerances={"demand": Tolerance(rtol=1e-9, atol=1e-6)},
+    budgets_ms={"demand": 1000.0},
+    min_speedup={"demand": 5.0},
+)
+ENGINES: Dict[str, Engine] = {e.name: e for e in (REFERENCE, TAIL, BATCHED)}
+
+
+def resolve_engine(spec: str) -> Engine:
+    """A built-in engine name, or module:attribute naming an Engine."""
+    if spec in ENGINES:
+        return ENGINES[spec]
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise SystemExit(f"Unknown engine '{spec}'. Built-in: {', '.join(ENGINES)}; or module:attribute")
+    engine = getattr(importlib.import_module(module), attr)
+    if not isinstance(engine, Engine):
+        raise SystemExit(f"{spec} is a {type(engine).__name__}, not a benchmarks.golden.Engine")
+    return engine
+
+
+# --- Cases ---
+
+
+def write_synthetic_dataset(path: str, *, days: int, start: str, seed: int, models: PriceDemandModels) -> None:
+    """A price/demand CSV shaped like the real one, 5 regions a day, from a seeded generator."""
+    rng = np.random.default_rng(seed)
+    sentiments = [float(c) for c in models.label_encoders["News_Sentiment"].classes_]
+    dates = pd.date_range(start, periods=days, freq="D")
+    season = np.sin(2 * np.pi * dates.dayofyear.to_numpy() / 365.0)
+    rows = []
+    for i, d in enumerate(dates):
+        for region in REGIONS:
+            rows.append({
+                "Date": d.strftime("%Y-%m-%d"),
+                "Region": region,
+                "Rainfall_mm": round(float(rng.gamma(2.0, 15.0)), 2),
+                "Temperature_C": round(float(27.0 + 2.0 * season[i] + rng.normal(0, 1.5)), 2),
+                "Sentiment_Score": round(float(rng.uniform(-1, 1)), 3),
+                "News_Sentiment": sentiments[int(rng.integers(len(sentiments)))],
+                "Nitrogen_N": round(float(rng.normal(500, 30)), 1),
+                "Phosphorus_P": round(float(rng.normal(9, 3)), 1),
+                "Potassium_K": round(float(rng.normal(7, 2)), 1),
+                "Paddy_Price_LKR_per_kg": round(float(78 + 4 * season[i] + rng.normal(0, 2)), 2),
+                "Demand_Tons": round(float(320 - 10 * season[i] + rng.normal(0, 8)), 2),
+            })
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def top3_cases(models: Any, n: int, seed: int) -> List[Tuple[Dict[str, float], str, str]]:
+    rng = np.random.default_rng(seed)
+    stages = list(models.encoders["Paddy_Growth_Stage"].classes_)
+    purposes = list(models.encoders["Purpose"].classes_)
+    return [
+        (
+            {
+                "soil_temp": round(float(rng.uniform(20, 35)), 2),
+                "soil_moisture": round(float(rng.uniform(10, 90)), 2),
+                "air_temp": round(float(rng.uniform(20, 38)), 2),
+                "air_humidity": round(float(rng.uniform(40, 95)), 2),
+            },
+            str(stages[int(rng.integers(len(stages)))]),
+            str(purposes[int(rng.integers(len(purposes)))]),
+        )
+        for _ in range(n)
+    ]
+
+
+def _inject_npk(df_mm: pd.DataFrame, n: Optional[float], p: Optional[float], k: Optional[float]) -> pd.DataFrame:
+    # As _forecast_frames does for a request with a sensor reading.
+    df_mm = df_mm.copy()
+    if n is not None and p is not None and k is not None:
+        df_mm.loc[df_mm.index[-1], ["Nitrogen_N", "Phosphorus_P", "Potassium_K"]] = [float(n), float(p), float(k)]
+    return df_mm
+
+
+def _frame_digest(df: pd.DataFrame, columns: List[str], rows: int) -> List[List[float]]:
+    return _ensure_columns_zero(df, columns)[columns].to_numpy(dtype=np.float64)[-rows:].tolist()
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+# --- Comparison ---
+
+
+def _leaves(value: Any, path: str = "") -> Iterator[Tuple[str, Any]]:
+    if isinstance(value, dict):
+        yield path + "{}", sorted(value)
+        for k in sorted(value):
+            yield from _leaves(value[k], f"{path}.{k}")
+    elif isinstance(value, list):
+        yield path + "[]", len(value)
+        for i, v in enumerate(value):
+            yield from _leaves(v, f"{path}[{i}]")
+    else:
+        yield path, value
+
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def compare(expected: Any, actual: Any, tol: Tolerance) -> Tuple[bool, float, str]:
+    """(ok, max abs error, first problem); numbers within tol, everything else equal."""
+    exp, act = list(_leaves(expected)), list(_leaves(actual))
+    if [p for p, _ in exp] != [p for p, _ in act]:
+        first = next((a for a, b in zip(exp, act) if a[0] != b[0]), exp[len(act)] if len(exp) > len(act) else act[len(exp)])
+        return False, float("nan"), f"structure differs at {first[0]}"
+    want, got, where = [], [], []
+    for (path, e), (_, a) in zip(exp, act):
+        if _is_number(e) and _is_number(a):
+            want.append(e)
+            got.append(a)
+            where.append(path)
+        elif e != a:
+            return False, float("nan"), f"{path}: expected {e!r}, got {a!r}"
+    if not want:
+        return True, 0.0, ""
+    want_a, got_a = np.asarray(want, dtype=np.float64), np.asarray(got, dtype=np.float64)
+    err = np.abs(got_a - want_a)
+    bad = ~np.isclose(got_a, want_a, rtol=tol.rtol, atol=tol.atol, equal_nan=True)
+    max_err = float(np.nanmax(err)) if err.size else 0.0
+    if bad.any():
+        i = int(np.flatnonzero(bad)[0])
+        return False, max_err, f"{where[i]}: expected {want[i]!r}, got {got[i]!r} ({int(bad.sum())} values off)"
+    return True, max_err, ""
+
+
+# --- Running ---
+
+
+@dataclass
+class Context:
+    dataset_path: str
+    price_models: PriceDemandModels
+    recommendation_models: Any
+    start: pd.Timestamp
+    dates: List[pd.Timestamp]
+    forecast_cases: List[Tuple[str, Optional[float], Optional[float], Optional[float]]]
+    top3_cases: List[Tuple[Dict[str, float], str, str]]
+    # Reference outputs feeding the later stages, filled by the reference engine's run.
+    frames: List[Tuple[pd.DataFrame, pd.DataFrame]] = field(default_factory=list)
+    prices: List[Sequence[float]] = field(default_factory=list)
+
+
+def _stage_calls(ctx: Context, name: str, fn: Callable[..., Any]) -> List[Callable[[], Any]]:
+    models = ctx.price_models
+    if name == "preprocess":
+        return [lambda r=region: fn(ctx.dataset_path, r, models) for region, *_ in ctx.forecast_cases]
+    if name == "price":
+        return [
+            lambda f=_inject_npk(mm, n, p, k): fn(f, models, ctx.start, len(ctx.dates))
+            for (mm, _), (_, n, p, k) in zip(ctx.frames, ctx.forecast_cases)
+        ]
+    if name == "demand":
+        return [lambda s=std, pr=prices: fn(s, models, pr, ctx.dates) for (_, std), prices in zip(ctx.frames, ctx.prices)]
+    return [lambda c=case: fn(ctx.recommendation_models, *c) for case in ctx.top3_cases]
+
+
+def _digest(ctx: Context, name: str, raw: List[Any]) -> List[Any]:
+    if name == "preprocess":
+        rows = ctx.price_models.window_size + _DEMAND_HISTORY
+        return [
+            {
+                "mm": _frame_digest(mm, list(ctx.price_models.feature_cols_lstm), rows),
+                "std": _frame_digest(std, list(ctx.price_models.feature_cols_xgb), rows),
+            }
+            for mm, std in raw
+        ]
+    return _jsonable(raw)
+
+
+def run_stage(ctx: Context, engine: Engine, name: str, repeat: int) -> Tuple[List[Any], List[Any], float]:
+    """(raw outputs, digested outputs, best wall time in ms over repeat runs of all cases)."""
+    calls = _stage_calls(ctx, name, engine.stage(name))
+    best, raw = float("inf"), []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        raw = [call() for call in calls]
+        best = min(best, (time.perf_counter() - t0) * 1000.0)
+    return raw, _digest(ctx, name, raw), best
+
+
+def build_context() -> Tuple[Context, tempfile.TemporaryDirectory]:
+    price_models = stub_price_demand_models()
+    rec_models = stub_recommendation_models()
+    tmp = tempfile.TemporaryDirectory(prefix="golden-")
+    path = os.path.join(tmp.name, "price_demand.csv")
+    write_synthetic_dataset(
+        path, days=CONFIG["syntheticDays"], start=CONFIG["syntheticStart"], seed=CONFIG["seed"], models=price_models
+    )
+    last = date.fromisoformat(CONFIG["syntheticStart"]) + timedelta(days=CONFIG["syntheticDays"] - 1)
+    start = pd.Timestamp(last + timedelta(days=1))
+    ctx = Context(
+        dataset_path=path,
+        price_models=price_models,
+        recommendation_models=rec_models,
+        start=start,
+        dates=[start + pd.Timedelta(days=i) for i in range(CONFIG["horizonDays"])],
+        forecast_cases=[tuple(c) for c in CONFIG["forecastCases"]],
+        top3_cases=top3_cases(rec_models, CONFIG["top3Cases"], CONFIG["seed"]),
+    )
+    return ctx, tmp
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", action="append", default=None, help="built-in name or module:attribute (repeatable)")
+    parser.add_argument("--record", action="store_true", help="rewrite the golden outputs from the reference engine")
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the best counts")
+    parser.add_argument("--no-timing", action="store_true", help="check outputs only, no budgets or speed-ups")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every latency budget (slow machines)")
+    args = parser.parse_args()
+
+    engines = [resolve_engine(spec) for spec in (args.engine or list(ENGINES))]
+    if args.record:
+        engines = [REFERENCE]
+    elif REFERENCE not in engines:
+        engines.insert(0, REFERENCE)  # It feeds the other engines' inputs and speed-ups.
+    else:
+        engines.sort(key=lambda e: e is not REFERENCE)
+
+    ctx, tmp = build_context()
+    try:
+        golden: Optional[Dict[str, Any]] = None
+        if not args.record:
+            if not os.path.exists(args.golden):
+                raise SystemExit(f"No golden outputs at {args.golden}; run with --record first")
+            with open(args.golden, encoding="utf-8") as f:
+                golden = json.load(f)
+            if golden.get("config") != _jsonable(CONFIG):
+                raise SystemExit("The golden outputs were recorded for other cases (CONFIG changed); re-record them")
+
+        recorded: Dict[str, List[Any]] = {}
+        reference_ms: Dict[str, float] = {}
+        failures = 0
+        print(f"{'engine':<12} {'stage':<11} {'max |err|':>10} {'ms':>9} {'budget':>8} {'speed-up':>9}  result")
+        for engine in engines:
+            for name, stage in STAGES.items():
+                if engine.stage(name) is None:
+                    continue
+                raw, outputs, ms = run_stage(ctx, engine, name, args.repeat)
+                if engine is REFERENCE:
+                    reference_ms[name] = ms
+                    recorded[name] = outputs
+                    if name == "preprocess":
+                        ctx.frames = raw
+                    elif name == "price":
+                        ctx.prices = raw
+                if args.record:
+                    print(f"{engine.name:<12} {name:<11} {'':>10} {ms:>9.1f} {'':>8} {'':>9}  recorded")
+                    continue
+
+                problems: List[str] = []
+                ok, max_err, problem = compare(golden["stages"][name], outputs, engine.tolerances.get(name, stage.tolerance))
+                if not ok:
+                    problems.append(problem)
+                budget = engine.budgets_ms.get(name, stage.budget_ms) * args.budget_scale
+                speedup = reference_ms[name] / ms if ms > 0 else float("inf")
+                if not args.no_timing:
+                    if ms > budget:
+                        problems.append(f"{ms:.1f} ms is over the {budget:.0f} ms budget")
+                    wanted = engine.min_speedup.get(name)
+                    if wanted is not None and speedup < wanted:
+                        problems.append(f"{speedup:.1f}x is under the required {wanted:g}x")
+                failures += bool(problems)
+                shown = "" if engine is REFERENCE else f"{speedup:>8.1f}x"
+                print(
+                    f"{engine.name:<12} {name:<11} {max_err:>10.2e} {ms:>9.1f} {budget:>8.0f} {shown:>9}  "
+                    + ("FAIL: " + "; ".join(problems) if problems else "ok")
+                )
+
+        if args.record:
+            with open(args.golden, "w", encoding="utf-8") as f:
+                json.dump({"config": _jsonable(CONFIG), "stages": recorded}, f, separators=(",", ":"))
+                f.write("\n")
+            print(f"wrote {args.golden}")
+            return
+    finally:
+        tmp.cleanup()
+
+    if failures:
+        print(f"{failures} stage(s) failed")
+        sys.exit(1)
+    print("all stages match the golden outputs")
+
+
+if __name__ == "__main__":
+    # Run the importable copy, so engines defined elsewhere share its Engine class.
+    from benchmarks.golden import main as golden_main
+
+    golden_main()
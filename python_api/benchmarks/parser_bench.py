@@ -0,0 +1,91 @@
+"""Lines/sec of app.serial_parser against the previous decode/`in`/split parsing.
+
+Run from python_api/:  python -m benchmarks.parser_bench [--lines 500000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.serial_parser import SerialLineParser
+
+
+def _sample_lines(n: int, seed: int = 0) -> List[bytes]:
+    rng = random.Random(seed)
+    templates = [
+        lambda: f"DS18B20 Temperature: {rng.uniform(20, 35):.2f} °C",
+        lambda: f"Soil Moisture Value: {rng.randint(0, 4095)}",
+        lambda: f"DHT11 Temperature: {rng.uniform(20, 38):.1f}°C",
+        lambda: f"DHT11 Humidity: {rng.uniform(30, 95):.1f}%",
+        lambda: f"Nitrogen: {rng.randint(0, 200)}",
+        lambda: f"Phosphorus: {rng.randint(0, 80)}",
+        lambda: f"Potassium: {rng.randint(0, 120)}",
+        lambda: "Reading sensors...",
+        lambda: "Nitrogen: --",
+    ]
+    return [(rng.choice(templates)() + "\r\n").encode("utf-8") for _ in range(n)]
+
+
+_LEGACY_KEYS: Dict[str, str] = {
+    "DS18B20 Temperature": "soil_temp",
+    "Soil Moisture Value": "soil_moisture",
+    "DHT11 Temperature": "air_temp",
+    "DHT11 Humidity": "air_humidity",
+    "Nitrogen": "nitrogenN",
+    "Phosphorus": "phosphorusP",
+    "Potassium": "potassiumK",
+}
+
+
+def _legacy_parse(raw: bytes) -> Optional[Tuple[str, float]]:
+    # What each reader used to do: decode, test every keyword with `in`, split, strip units.
+    line = raw.decode(errors="ignore").strip()
+    for key, out_key in _LEGACY_KEYS.items():
+        if key in line and ":" in line:
+            try:
+                value = float(line.split(":", 1)[1].replace("°C", "").replace("%", "").strip())
+            except Exception:
+                return None
+            if out_key == "soil_moisture":
+                value = (value / 4095) * 100
+            return out_key, value
+    return None
+
+
+def _bench(fn, lines: List[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for raw in lines:
+            fn(raw)
+        best = min(best, time.perf_counter() - started)
+    return len(lines) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = _sample_lines(args.lines)
+    table = SerialLineParser()
+
+    mismatches = sum(
+        1
+        for raw in lines
+        if (_legacy_parse(raw) or (None, None))[0] != (table.parse(raw) or (None, None))[0]
+    )
+    legacy_rate = _bench(_legacy_parse, lines, args.repeat)
+    table_rate = _bench(table.parse, lines, args.repeat)
+
+    print(f"legacy parsing : {legacy_rate:,.0f} lines/s")
+    print(f"SerialLineParser: {table_rate:,.0f} lines/s ({table_rate / legacy_rate:.2f}x)")
+    print(f"key mismatches : {mismatches}; malformed counted: {table.malformed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Throughput benchmark for app.sensor_log.
+
+Run from python_api/:  python -m benchmarks.sensor_log_bench [--readings 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+
+from app.sensor_log import SensorLog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readings", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=10.0, help="simulated readings per second of sensor time")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    t0 = time.time() - args.readings / args.rate
+    with tempfile.TemporaryDirectory() as tmp:
+        log = SensorLog(tmp, batch_size=args.batch_size, max_pending=args.readings)
+        log.start()
+
+        started = time.perf_counter()
+        for i in range(args.readings):
+            ts = t0 + i / args.rate
+            if i % 2:
+                values = {"nitrogenN": rng.uniform(0, 200), "phosphorusP": rng.uniform(0, 80), "potassiumK": rng.uniform(0, 120)}
+            else:
+                values = {"soil_temp": rng.uniform(20, 35), "soil_moisture": rng.uniform(10, 90), "air_temp": rng.uniform(20, 38), "air_humidity": rng.uniform(40, 95)}
+            log.append("SIM", ts, values)
+        enqueued = time.perf_counter() - started
+        log.flush(timeout=600)
+        total = time.perf_counter() - started
+
+        span = args.readings / args.rate
+        queries = []
+        for _ in range(20):
+            start = t0 + rng.uniform(0, span - 600)
+            q0 = time.perf_counter()
+            rows = log.query(start, start + 600)
+            queries.append((time.perf_counter() - q0, len(rows)))
+        log.close()
+        stats = log.stats()
+
+    print(f"readings         : {args.readings} across {stats['segments']} daily segment(s)")
+    print(f"append (enqueue) : {args.readings / enqueued:,.0f} readings/s")
+    print(f"sustained commit : {args.readings / total:,.0f} readings/s ({stats['batches']} batches)")
+    avg_q = sum(q for q, _ in queries) / len(queries)
+    avg_rows = sum(n for _, n in queries) / len(queries)
+    print(f"10-min range read: {avg_q * 1000:.2f} ms avg ({avg_rows:.0f} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""End-to-end latency and SSE throughput against a virtual NPK device.
+
+Run from python_api/ (POSIX only):
+    python -m benchmarks.serial_load --clients 200 --rate 300 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+from app.npk_serial_reader import NPK_KEYS, read_npk_once, stream_npk, stream_serial_raw
+from app.serial_manager import get_manager, stop_all_managers
+from app.serial_parser import SerialLineParser
+from app.serial_simulator import SerialSimulator, SimulatorConfig
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def _reading_client(sim: SerialSimulator, duration: float, latencies: List[float]) -> int:
+    events = 0
+    gen = stream_npk(sim.port, interval=0, heartbeat_interval=1.0)
+    deadline = time.time() + duration
+    try:
+        async for chunk in gen:
+            now = time.time()
+            if chunk.startswith("data: "):
+                events += 1
+                seq = int(json.loads(chunk[6:])["reading"]["potassiumK"])
+                sent = sim.frame_sent_at(seq)
+                if sent is not None:
+                    latencies.append(now - sent)
+            if now >= deadline:
+                break
+    finally:
+        await gen.aclose()
+    return events
+
+
+async def _raw_client(sim: SerialSimulator, duration: float) -> int:
+    events = 0
+    gen = stream_serial_raw(sim.port, heartbeat_interval=1.0)
+    deadline = time.time() + duration
+    try:
+        async for chunk in gen:
+            if chunk.startswith("data: "):
+                events += 1
+            if time.time() >= deadline:
+                break
+    finally:
+        await gen.aclose()
+    return events
+
+
+async def _run_clients(sim: SerialSimulator, args: argparse.Namespace) -> None:
+    latencies: List[float] = []
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *[_reading_client(sim, args.duration, latencies) for _ in range(args.clients)],
+        *[_raw_client(sim, args.duration) for _ in range(args.raw_clients)],
+    )
+    elapsed = time.perf_counter() - started
+    reading_events = sum(results[: args.clients])
+    raw_events = sum(results[args.clients :])
+
+    print(f"reading clients  : {args.clients}, raw clients: {args.raw_clients}, {elapsed:.1f}s")
+    print(f"reading events   : {reading_events / elapsed:,.0f}/s total")
+    print(f"raw line events  : {raw_events / elapsed:,.0f}/s total")
+    if latencies:
+        print(
+            "reading latency  : "
+            f"p50={_percentile(latencies, 50) * 1000:.2f}ms "
+            f"p95={_percentile(latencies, 95) * 1000:.2f}ms "
+            f"p99={_percentile(latencies, 99) * 1000:.2f}ms "
+            f"mean={statistics.mean(latencies) * 1000:.2f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serial load harness using app.serial_simulator")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent /api/npk/stream consumers")
+    parser.add_argument("--raw-clients", type=int, default=10, help="concurrent /api/npk/raw-stream consumers")
+    parser.add_argument("--rate", type=float, default=150.0, help="simulated lines per second")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--partial-rate", type=float, default=0.01)
+    parser.add_argument("--garbage-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    config = SimulatorConfig(
+        profile="npk",
+        line_rate=args.rate,
+        jitter=args.jitter,
+        partial_rate=args.partial_rate,
+        garbage_rate=args.garbage_rate,
+    )
+    with SerialSimulator(config) as sim:
+        print(f"virtual device   : {sim.port} @ {args.rate:g} lines/s")
+
+        t0 = time.perf_counter()
+        read_npk_once(sim.port, max_wait_seconds=10.0)
+        print(f"read_npk_once    : {(time.perf_counter() - t0) * 1000:.1f}ms (open + reset delay + frame)")
+
+        get_manager(sim.port, 115200, SerialLineParser(), NPK_KEYS.values(), reset_delay=0.0)
+        try:
+            asyncio.run(_run_clients(sim, args))
+        finally:
+            stop_all_managers()
+        print(f"simulator        : {sim.lines} lines, {sim.overruns} overruns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Deterministic stand-ins for the LSTM price, XGB demand, fertilizer and yield models.
+
+They take the same inputs and return the same shapes as the real models but
+are plain NumPy, so the forecasting and recommendation pipelines can be timed
+and checked on a machine without TensorFlow or xgboost. The real scalers,
+encoders and feature lists are still loaded from models/.
+"""
+
+from __future__ import annotations
+
+import os
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import joblib
+import numpy as np
+
+from app.model_loader import MODEL_DIR, load_recommendation_models
+from app.pricedemand_service import PriceDemandArtifacts, PriceDemandModels, default_artifacts
+
+
+class StubLSTM:
+    """Price = a fixed linear read-out of the window's last row and mean row."""
+
+    def __init__(self, n_features: int, *, seed: int = 0, base: float = 88.0) -> None:
+        rng = np.random.default_rng(seed)
+        self.w_last = rng.normal(0.0, 0.5, n_features)
+        self.w_mean = rng.normal(0.0, 0.5, n_features)
+        self.base = base
+        self.calls = 0
+
+    def predict(self, X: Any, verbose: int = 0, batch_size: Optional[int] = None) -> np.ndarray:
+        self.calls += 1
+        X = np.asarray(X, dtype=np.float64)
+        price = self.base + X[:, -1, :] @ self.w_last + X.mean(axis=1) @ self.w_mean
+        return price.reshape(-1, 1).astype(np.float32)
+
+
+class StubXGB:
+    """Demand = a fixed linear function of the (standardized) feature row."""
+
+    def __init__(self, n_features: int, *, seed: int = 1, base: float = 345.0) -> None:
+        rng = np.random.default_rng(seed)
+        self.w = rng.normal(0.0, 0.05, n_features)
+        self.base = base
+        self.calls = 0
+
+    def predict(self, X: Any) -> np.ndarray:
+        self.calls += 1
+        return self.base + np.asarray(X, dtype=np.float64) @ self.w * self.base / 100.0
+
+
+def stub_price_demand_models(artifacts: Optional[PriceDemandArtifacts] = None) -> PriceDemandModels:
+    """PriceDemandModels with the real preprocessing artifacts and stub LSTM/XGB."""
+    artifacts = artifacts or default_artifacts()
+    feature_cols_lstm = list(joblib.load(artifacts.lstm_feature_cols_path))
+    feature_cols_xgb = list(joblib.load(artifacts.xgb_feature_cols_path))
+    training_info = joblib.load(artifacts.training_info_path) or {}
+    return PriceDemandModels(
+        artifacts=artifacts,
+        lstm=StubLSTM(len(feature_cols_lstm)),
+        xgb=StubXGB(len(feature_cols_xgb)),
+        feature_cols_lstm=feature_cols_lstm,
+        feature_cols_xgb=feature_cols_xgb,
+        scalers=joblib.load(artifacts.scalers_path) or {},
+        label_encoders=joblib.load(artifacts.label_encoders_path) or {},
+        window_size=int(training_info.get("window_size", 21)),
+    )
+
+
+class StubClassifier:
+    """Fertilizer probabilities = softmax of a fixed linear map of the scaled features."""
+
+    def __init__(self, n_features: int, n_classes: int, *, seed: int = 2) -> None:
+        rng = np.random.default_rng(seed)
+        self.w = rng.normal(0.0, 1.0, (n_features, n_classes))
+        self.b = rng.normal(0.0, 0.5, n_classes)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        z = np.asarray(X, dtype=np.float64) @ self.w + self.b
+        z = np.exp(z - z.max(axis=1, keepdims=True))
+        return z / z.sum(axis=1, keepdims=True)
+
+
+class StubRegressor:
+    """Yield (ton/ha) = a fixed linear function of the scaled features."""
+
+    def __init__(self, n_features: int, *, seed: int = 3, base: float = 4.5) -> None:
+        self.w = np.random.default_rng(seed).normal(0.0, 0.3, n_features)
+        self.base = base
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.base + np.asarray(X, dtype=np.float64) @ self.w
+
+
+def stub_recommendation_models(model_dir: str = MODEL_DIR) -> SimpleNamespace:
+    """What predict_top3_with reads from a ModelVersion: the real scaler/encoders/feature names, stub clf/reg."""
+    models = load_recommendation_models(os.path.join(model_dir, "fertilizer_models"), os.path.join(model_dir, "yield_models"))
+    if models["scaler"] is None or models["encoders"] is None or models["feature_names"] is None:
+        raise RuntimeError(f"Recommendation scaler/encoders/feature names not found under {model_dir}")
+    n_features = len(models["feature_names"])
+    n_classes = len(models["encoders"]["Recommended_Fertilizer"].classes_)
+    return SimpleNamespace(**{**models, "clf": StubClassifier(n_features, n_classes), "reg": StubRegressor(n_features)})